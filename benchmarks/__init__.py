@@ -0,0 +1,2 @@
+# В этом модуле лежат бенчмарки стадий пайплайна на синтетических данных,
+# которые генерируются локально при запуске.
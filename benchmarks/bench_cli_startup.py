@@ -0,0 +1,76 @@
+"""
+Бенчмарк времени запуска командной строки.
+
+Запускает `python -m src` с командами, которые ничего не обрабатывают
+(`--help` и `--dry-run`), в отдельных процессах и печатает медианное время
+запуска. Для сравнения замеряется голый запуск интерпретатора и импорт
+модуля стадии, который тянет OpenCV и MediaPipe.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_cli_startup --repeats 10
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+
+def time_command(args, repeats=5):
+    """
+    Замеряет время выполнения команды в отдельном процессе.
+
+    Args:
+        args (list): Аргументы интерпретатора Python
+        repeats (int): Количество повторов замера
+
+    Returns:
+        float: Медианное время выполнения в мс
+    """
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=PROJECT_ROOT, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return 1000 * statistics.median(timings)
+
+
+def run_benchmark(repeats=5):
+    """
+    Запускает бенчмарк и печатает медианное время запуска каждой команды.
+
+    Args:
+        repeats (int): Количество повторов каждого замера
+
+    Returns:
+        dict: Медианное время запуска (в мс) для каждой команды
+    """
+    commands = {
+        "python -c pass": ["-c", "pass"],
+        "python -m src --help": ["-m", "src", "--help"],
+        "python -m src --dry-run": ["-m", "src", "--dry-run"],
+        "import stage module (cv2 + mediapipe)": [
+            "-c", "import src.Dataset.cropper.dv_dataset_cropper",
+        ],
+    }
+
+    results = {}
+    for name, args in commands.items():
+        results[name] = time_command(args, repeats=repeats)
+        print(f"[INFO] {name:<40} {results[name]:8.1f} ms")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк времени запуска командной строки")
+    parser.add_argument("--repeats", type=int, default=5, help="Количество повторов замера")
+    args = parser.parse_args()
+
+    run_benchmark(args.repeats)
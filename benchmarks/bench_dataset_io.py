@@ -0,0 +1,109 @@
+"""
+Бенчмарк чтения датасета стадий в CSV и Parquet.
+
+Генерирует синтетический датасет с колонками profile_id, image_path,
+image_index и profile_liked, сохраняет его в CSV и Parquet и сравнивает
+время чтения, размер файла и объем датафрейма в памяти для исходного
+pd.read_csv с выводом типов и для read_dataset в обоих форматах.
+
+Запуск из корня проекта (требуется pyarrow):
+    python -m benchmarks.bench_dataset_io --rows 1000000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+
+
+def generate_dataset(rows, seed=0):
+    """
+    Генерирует синтетический датасет в формате стадий пайплайна.
+
+    Args:
+        rows (int): Количество строк
+        seed (int): Зерно генератора случайных чисел
+
+    Returns:
+        pd.DataFrame: Датасет с колонками profile_id, image_path, image_index, profile_liked
+    """
+    rng = np.random.default_rng(seed)
+    image_index = rng.integers(0, 4, size=rows)
+    profile_id = np.cumsum(image_index == 0)
+    image_path = [f"photos_cropped/photo_{i}@01-01-2024_12-00-00_cropped.jpg" for i in range(rows)]
+    return pd.DataFrame({
+        "profile_id": profile_id,
+        "image_path": image_path,
+        "image_index": image_index,
+        "profile_liked": (rng.random(rows) < 0.3).astype(int),
+    })
+
+
+def best_time(func, repeats=3):
+    """
+    Возвращает лучшее время выполнения функции и ее результат.
+
+    Args:
+        func (callable): Функция без аргументов
+        repeats (int): Количество повторов
+
+    Returns:
+        tuple: (время в секундах, результат последнего вызова)
+    """
+    best = None
+    result = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run_benchmark(rows=1_000_000, repeats=3):
+    """
+    Запускает бенчмарк и печатает время чтения, размер файла и объем в памяти.
+
+    Args:
+        rows (int): Количество строк синтетического датасета
+        repeats (int): Количество повторов замера
+
+    Returns:
+        dict: Время чтения (в мс) для каждого режима
+    """
+    df = generate_dataset(rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Разные имена файлов: read_dataset выбирает последний записанный из одноименных CSV и Parquet
+        csv_path = write_dataset(df, Path(tmp_dir) / "dataset_csv.csv", "csv")
+        parquet_path = write_dataset(df, Path(tmp_dir) / "dataset_parquet.parquet", "parquet")
+
+        modes = {
+            "pd.read_csv (type inference)": (csv_path, lambda: pd.read_csv(csv_path)),
+            "read_dataset csv": (csv_path, lambda: read_dataset(csv_path)),
+            "read_dataset parquet": (parquet_path, lambda: read_dataset(parquet_path)),
+        }
+
+        results = {}
+        for name, (path, read) in modes.items():
+            elapsed, loaded = best_time(read, repeats)
+            results[name] = 1000 * elapsed
+            size_mb = path.stat().st_size / (1 << 20)
+            memory_mb = loaded.memory_usage(deep=True).sum() / (1 << 20)
+            print(f"[INFO] {name:<30} {results[name]:9.1f} ms  file {size_mb:7.1f} MB  memory {memory_mb:7.1f} MB")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк чтения датасета в CSV и Parquet")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Количество строк датасета")
+    parser.add_argument("--repeats", type=int, default=3, help="Количество повторов замера")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.repeats)
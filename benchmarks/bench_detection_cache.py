@@ -0,0 +1,145 @@
+"""
+Бенчмарк подбора порогов обрезки с кэшем детекций и без него.
+
+Для сетки параметров обрезки (min_size x score_threshold x margin)
+сравнивает:
+    - запуск детектора для каждой комбинации (как до кэша детекций):
+      время одного прохода детектора по всем фото умножается на размер сетки;
+    - один проход детектора с записью рамок в DetectionCache, после чего
+      для каждой комбинации лицо выбирается только по кэшу (select_face_box);
+    - обрезку по кэшу с вырезанием пикселей (декодирование, срез, JPEG) для
+      одной комбинации — столько стоит перезапуск стадии crop с новыми порогами.
+
+Фото берутся из папки --images или генерируются синтетически (на них лиц
+нет, поэтому детектор каждый раз делает и повторную попытку на увеличенном
+фото — худший случай для подбора порогов).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_detection_cache --images datasets/ChatExport_2024/photos
+"""
+
+import argparse
+import itertools
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.bench_image_normalizer import generate_synthetic_images
+from src.Dataset.cropper.face_cropper import detect_faces, get_crop_params, get_detection_params, select_face_box
+from src.Dataset.detector.detection_cache import DetectionCache
+from src.Dataset.detector.face_detection_engine import shutdown_face_detection_engine
+from src.Dataset.utils.stage_manifest import file_digest
+
+
+# Сетка параметров обрезки по умолчанию
+MIN_SIZES = (60, 80, 100, 120)
+SCORE_THRESHOLDS = (0.5, 0.6, 0.7, 0.8)
+MARGINS = (0.0, 0.1, 0.2)
+
+
+def prepare_images(images_dir, count, tmp_dir):
+    """
+    Возвращает пути к фото из папки или к сохраненным синтетическим фото.
+
+    Args:
+        images_dir (str or None): Папка с фото (None — синтетические фото)
+        count (int): Максимальное количество фото
+        tmp_dir (Path): Папка для синтетических фото
+
+    Returns:
+        list: Пути к фото
+    """
+    if images_dir:
+        paths = sorted(str(p) for p in Path(images_dir).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        if not paths:
+            raise FileNotFoundError(f"No photos found in: {images_dir}")
+        return paths[:count]
+
+    paths = []
+    for i, image in enumerate(generate_synthetic_images(count, size=(960, 720))):
+        path = str(tmp_dir / f"synthetic_{i}.jpg")
+        cv2.imwrite(path, image)
+        paths.append(path)
+    return paths
+
+
+def run_benchmark(images_dir=None, count=100):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        images_dir (str or None): Папка с фото (None — синтетические фото)
+        count (int): Максимальное количество фото
+
+    Returns:
+        dict: Время подбора порогов (в секундах) с детектором и по кэшу
+    """
+    grid = list(itertools.product(MIN_SIZES, SCORE_THRESHOLDS, MARGINS))
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        paths = prepare_images(images_dir, count, tmp_dir)
+        crop_params = get_crop_params()
+        cache = DetectionCache(tmp_dir / "detections", get_detection_params(crop_params))
+
+        # Прогрев детектора не входит в замер
+        detect_faces(cv2.imread(paths[0]))
+
+        # Один проход детектора по всем фото с записью рамок в кэш
+        start = time.perf_counter()
+        for path in paths:
+            image = cv2.imread(path)
+            detections = detect_faces(image, crop_params["min_detection_confidence"], crop_params["upscale_factor"])
+            cache.append(file_digest(path), detections, image.shape[:2])
+        cache.save()
+        detect_pass = time.perf_counter() - start
+
+        # Подбор порогов только по кэшу: хэши фото, чтение рамок и выбор лица
+        start = time.perf_counter()
+        cache = DetectionCache(tmp_dir / "detections", get_detection_params(crop_params))
+        entries = [cache.get(file_digest(path)) for path in paths]
+        kept = {}
+        for min_size, score_threshold, margin in grid:
+            kept[min_size, score_threshold, margin] = sum(
+                select_face_box(detections, shape, min_size, score_threshold, margin) is not None
+                for detections, shape in entries
+            )
+        sweep_select = time.perf_counter() - start
+
+        # Перезапуск обрезки с одной новой комбинацией: декодирование, срез и запись кропа
+        start = time.perf_counter()
+        for path, (detections, shape) in zip(paths, entries):
+            box = select_face_box(detections, shape, min_size=60, score_threshold=0.5, margin=0.1)
+            if box is not None:
+                x_min, y_min, x_max, y_max = box
+                cv2.imwrite(str(tmp_dir / "crop.jpg"), cv2.imread(path)[y_min:y_max, x_min:x_max])
+        recrop_pass = time.perf_counter() - start
+
+    results = {
+        "detector_sweep_s": detect_pass * len(grid),
+        "cache_sweep_s": detect_pass + sweep_select,
+        "recrop_from_cache_s": recrop_pass,
+    }
+    print(f"[INFO] {len(paths)} photos, grid of {len(grid)} crop parameter combinations")
+    print(f"[INFO] detector pass      {detect_pass:8.2f} s  ({1000 * detect_pass / len(paths):.1f} ms/photo)")
+    print(f"[INFO] sweep with detector {results['detector_sweep_s']:7.2f} s  (detector pass x {len(grid)})")
+    print(f"[INFO] sweep from cache   {sweep_select:8.3f} s  (+ one detector pass = {results['cache_sweep_s']:.2f} s)")
+    print(f"[INFO] re-crop from cache {recrop_pass:8.2f} s  (decode, slice and encode for one combination)")
+    best = max(kept.items(), key=lambda item: item[1])
+    print(f"[INFO] most faces kept: {best[1]} with min_size={best[0][0]}, "
+          f"score_threshold={best[0][1]}, margin={best[0][2]}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк подбора порогов обрезки с кэшем детекций")
+    parser.add_argument("--images", help="Папка с фото (по умолчанию синтетические фото)")
+    parser.add_argument("--count", type=int, default=100, help="Максимальное количество фото")
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.images, args.count)
+    finally:
+        shutdown_face_detection_engine()
@@ -0,0 +1,146 @@
+"""
+Бенчмарк детекции лиц на уменьшенной копии фото против полного разрешения.
+
+Сравнивает на больших фото (по умолчанию — фото из папки, увеличенные
+до 12 Мп, как снимки с телефона):
+    - прежний способ: полное декодирование, детекция на полном фото и
+      повторная детекция на полном фото, увеличенном в 2 раза;
+    - crop_face_file: декодирование уменьшенной копии (IMREAD_REDUCED_COLOR_*),
+      детекция на ней и полное декодирование только для вырезания лица.
+Печатает время на фото и совпадение рамок (IoU) между способами.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_detection_preview --images datasets/ChatExport_test/photos --megapixels 12
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.Dataset.cropper.face_cropper import (
+    UPSCALE_FACTOR, crop_face_file, detect_faces_in_file, get_crop_params, select_face_box,
+)
+from src.Dataset.detector.face_detection_engine import get_face_detection_engine, shutdown_face_detection_engine
+
+
+def crop_full_resolution(image_path, output_path, crop_params):
+    """
+    Обрезает фото прежним способом: детекция на полном фото и на полном фото, увеличенном в 2 раза.
+
+    Returns:
+        tuple or None: Рамка (x_min, y_min, x_max, y_max) или None
+    """
+    image = cv2.imread(image_path)
+    engine = get_face_detection_engine(crop_params["min_detection_confidence"])
+    detections = engine.detect([image])[0]
+    if not detections:
+        scaled = cv2.resize(image, None, fx=UPSCALE_FACTOR, fy=UPSCALE_FACTOR, interpolation=cv2.INTER_CUBIC)
+        detections = engine.detect([scaled], scale=UPSCALE_FACTOR)[0]
+
+    box = select_face_box(detections, image.shape, crop_params["min_size"], crop_params["score_threshold"])
+    if box is not None:
+        x_min, y_min, x_max, y_max = box
+        cv2.imwrite(output_path, image[y_min:y_max, x_min:x_max])
+    return box
+
+
+def box_iou(a, b):
+    """
+    Возвращает IoU двух рамок (x_min, y_min, x_max, y_max).
+    """
+    width = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    height = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    intersection = width * height
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - intersection
+    return intersection / union if union else 0.0
+
+
+def prepare_images(images_dir, count, megapixels, tmp_dir):
+    """
+    Сохраняет фото из папки, увеличенные до заданного количества мегапикселей.
+
+    Returns:
+        list: Пути к большим фото
+    """
+    paths = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not paths:
+        raise FileNotFoundError(f"No photos found in: {images_dir}")
+
+    result = []
+    for i, path in enumerate(paths[:count]):
+        image = cv2.imread(str(path))
+        if image is None:
+            continue
+        factor = np.sqrt(megapixels * 1e6 / (image.shape[0] * image.shape[1]))
+        large = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_CUBIC)
+        large_path = str(tmp_dir / f"large_{i}.jpg")
+        cv2.imwrite(large_path, large, [cv2.IMWRITE_JPEG_QUALITY, 92])
+        result.append(large_path)
+    return result
+
+
+def run_benchmark(images_dir, count=20, megapixels=12.0):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        images_dir (str): Папка с фото
+        count (int): Максимальное количество фото
+        megapixels (float): Размер больших фото в мегапикселях
+
+    Returns:
+        dict: Время на фото (в мс) для обоих способов и средний IoU рамок
+    """
+    crop_params = get_crop_params(min_size=80)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        paths = prepare_images(images_dir, count, megapixels, tmp_dir)
+        output_path = str(tmp_dir / "crop.jpg")
+
+        # Прогрев детектора не входит в замер
+        detect_faces_in_file(paths[0])
+
+        start = time.perf_counter()
+        full_boxes = [crop_full_resolution(path, output_path, crop_params) for path in paths]
+        full_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        preview_boxes = []
+        for path in paths:
+            _, detections, image_shape = crop_face_file(path, output_path, **crop_params)
+            preview_boxes.append(None if detections is None else select_face_box(
+                detections, image_shape, crop_params["min_size"], crop_params["score_threshold"],
+            ))
+        preview_time = time.perf_counter() - start
+
+    both = [(a, b) for a, b in zip(full_boxes, preview_boxes) if a is not None and b is not None]
+    agreement = sum((a is None) == (b is None) for a, b in zip(full_boxes, preview_boxes))
+    results = {
+        "full_ms": 1000 * full_time / len(paths),
+        "preview_ms": 1000 * preview_time / len(paths),
+        "mean_iou": float(np.mean([box_iou(a, b) for a, b in both])) if both else None,
+    }
+    print(f"[INFO] {len(paths)} photos of {megapixels:.0f} MP")
+    print(f"[INFO] full resolution  {results['full_ms']:8.1f} ms/photo")
+    print(f"[INFO] reduced preview  {results['preview_ms']:8.1f} ms/photo")
+    print(f"[INFO] same face/no-face decision on {agreement} of {len(paths)} photos, "
+          f"mean box IoU {results['mean_iou'] or 0:.3f} on {len(both)} faces")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк детекции лиц на уменьшенной копии фото")
+    parser.add_argument("--images", required=True, help="Папка с фото")
+    parser.add_argument("--count", type=int, default=20, help="Максимальное количество фото")
+    parser.add_argument("--megapixels", type=float, default=12.0, help="Размер больших фото в мегапикселях")
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.images, args.count, args.megapixels)
+    finally:
+        shutdown_face_detection_engine()
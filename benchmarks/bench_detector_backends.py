@@ -0,0 +1,140 @@
+"""
+Бенчмарк бэкендов детекции лиц: скорость и совпадение с эталонным бэкендом.
+
+Прогоняет фото из папки через детекцию стадии crop (уменьшенная копия фото
+и повторная попытка на увеличенной копии, см. face_cropper) для каждого
+бэкенда из DETECTOR_BACKENDS и сравнивает:
+    - время детекции на фото и пропускную способность (копии фото декодируются
+      один раз заранее и в замер не входят);
+    - долю фото, на которых выбрано лицо (с порогами стадии crop);
+    - совпадение с эталонным бэкендом: одинаковое решение лицо/нет лица,
+      полнота относительно эталона и средний IoU выбранных рамок.
+
+Папку можно брать под стадию: photos/ для фото анкет, photos_extracted/ для
+кадров из видео. Бэкенд, модель которого не найдена (например, каскад LBP
+не положен в resources/models), пропускается с предупреждением.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_detector_backends --images datasets/ChatExport_test/photos
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from benchmarks.bench_detection_preview import box_iou
+from src.Dataset.cropper.face_cropper import (
+    PREVIEW_MIN_SIDE, SCORE_THRESHOLD, detect_faces_in_file, read_detection_preview, select_face_box,
+)
+from src.Dataset.detector.face_detection_engine import (
+    DETECTOR_BACKENDS, DETECTOR_MEDIAPIPE, get_face_detection_engine, shutdown_face_detection_engine,
+)
+
+
+def run_backend(backend, paths, previews, min_size, score_threshold):
+    """
+    Находит лица на всех фото одним бэкендом.
+
+    Returns:
+        tuple: (выбранные рамки или None для каждого фото, время детекции в секундах)
+    """
+    # Загрузка модели и первый вызов не входят в замер
+    get_face_detection_engine(backend=backend)
+    detect_faces_in_file(paths[0], preview=previews[0], detector_backend=backend)
+
+    boxes = []
+    start = time.perf_counter()
+    for path, preview in zip(paths, previews):
+        detections, image_shape, _ = detect_faces_in_file(path, preview=preview, detector_backend=backend)
+        boxes.append(None if not detections else select_face_box(detections, image_shape, min_size, score_threshold))
+    return boxes, time.perf_counter() - start
+
+
+def compare_boxes(boxes, reference):
+    """
+    Сравнивает выбранные рамки с эталонными.
+
+    Returns:
+        dict: Доля одинаковых решений, полнота относительно эталона,
+              количество лиц, которых нет у эталона, и средний IoU
+    """
+    both = [(a, b) for a, b in zip(boxes, reference) if a is not None and b is not None]
+    found_reference = sum(b is not None for b in reference)
+    return {
+        "agreement": sum((a is None) == (b is None) for a, b in zip(boxes, reference)) / len(reference),
+        "recall": len(both) / found_reference if found_reference else None,
+        "extra": sum(a is not None and b is None for a, b in zip(boxes, reference)),
+        "mean_iou": sum(box_iou(a, b) for a, b in both) / len(both) if both else None,
+    }
+
+
+def run_benchmark(images_dir, count=500, backends=DETECTOR_BACKENDS, reference=DETECTOR_MEDIAPIPE, min_size=80,
+                  score_threshold=SCORE_THRESHOLD):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        images_dir (str): Папка с фото (ищутся рекурсивно)
+        count (int): Максимальное количество фото
+        backends (tuple): Сравниваемые бэкенды
+        reference (str): Эталонный бэкенд для совпадения рамок
+        min_size (int): Минимальная сторона лица (как в стадии crop)
+        score_threshold (float): Минимальная уверенность лучшего лица (как в стадии crop)
+
+    Returns:
+        dict: Для каждого бэкенда время на фото (мс), пропускная способность (фото/с),
+              доля фото с лицом и сравнение с эталоном
+    """
+    paths = sorted(str(p) for p in Path(images_dir).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+    if not paths:
+        raise FileNotFoundError(f"No photos found in: {images_dir}")
+    paths = paths[:count]
+    previews = [read_detection_preview(path, PREVIEW_MIN_SIDE) for path in paths]
+
+    # Эталон считается первым, остальные бэкенды сравниваются с ним
+    order = [reference] + [backend for backend in backends if backend != reference]
+    boxes = {}
+    results = {}
+    for backend in order:
+        try:
+            boxes[backend], elapsed = run_backend(backend, paths, previews, min_size, score_threshold)
+        except FileNotFoundError as e:
+            print(f"[WARN] Skipping backend {backend}: {e}")
+            continue
+        finally:
+            shutdown_face_detection_engine()
+
+        results[backend] = {
+            "ms_per_photo": 1000 * elapsed / len(paths),
+            "photos_per_s": len(paths) / elapsed if elapsed else float("inf"),
+            "face_rate": sum(box is not None for box in boxes[backend]) / len(paths),
+        }
+        if reference in boxes and backend != reference:
+            results[backend].update(compare_boxes(boxes[backend], boxes[reference]))
+
+    print(f"[INFO] {len(paths)} photos from {images_dir}, reference backend: {reference}")
+    for backend, r in results.items():
+        line = (f"[INFO] {backend:<10} {r['ms_per_photo']:7.2f} ms/photo  {r['photos_per_s']:7.1f} photos/s  "
+                f"face on {100 * r['face_rate']:5.1f}%")
+        if "agreement" in r:
+            recall = "n/a" if r["recall"] is None else f"{100 * r['recall']:.1f}%"
+            line += (f"  agreement {100 * r['agreement']:5.1f}%  recall {recall}  extra {r['extra']}  "
+                     f"mean IoU {r['mean_iou'] or 0:.3f}")
+        print(line)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк бэкендов детекции лиц")
+    parser.add_argument("--images", required=True, help="Папка с фото")
+    parser.add_argument("--count", type=int, default=500, help="Максимальное количество фото")
+    parser.add_argument("--backends", nargs="+", choices=DETECTOR_BACKENDS, default=list(DETECTOR_BACKENDS),
+                        help="Сравниваемые бэкенды")
+    parser.add_argument("--reference", choices=DETECTOR_BACKENDS, default=DETECTOR_MEDIAPIPE,
+                        help="Эталонный бэкенд")
+    parser.add_argument("--min-size", type=int, default=80, help="Минимальная сторона лица (как в стадии crop)")
+    parser.add_argument("--score-threshold", type=float, default=SCORE_THRESHOLD,
+                        help="Минимальная уверенность лучшего лица (как в стадии crop)")
+    args = parser.parse_args()
+
+    run_benchmark(args.images, args.count, tuple(args.backends), args.reference, args.min_size, args.score_threshold)
@@ -0,0 +1,137 @@
+"""
+Бенчмарк чтения обрезанных лиц из JPEG-файлов и из хранилища тензоров.
+
+Генерирует синтетические кропы лиц разного размера во временной папке,
+упаковывает их в FaceTensorStore и сравнивает время одной эпохи чтения:
+декодирование и ресайз каждого JPEG (как при обучении на photos_cropped/)
+против перебора пачек из отображенных в память шардов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_face_tensor_store --faces 5000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.Dataset.packer.dv_dataset_packer import load_face
+from src.Dataset.packer.face_tensor_store import FACE_SIZE, FaceTensorStore, FaceTensorWriter
+
+
+def generate_cropped_faces(directory, faces, seed=0):
+    """
+    Генерирует синтетические JPEG-кропы со сторонами от 80 до 400 пикселей.
+
+    Args:
+        directory (Path): Папка для кропов
+        faces (int): Количество кропов
+        seed (int): Зерно генератора случайных чисел
+
+    Returns:
+        list: Пути к кропам в виде строк
+    """
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(faces):
+        h, w = rng.integers(80, 400, size=2)
+        # Плавный градиент с шумом сжимается примерно как настоящее фото
+        gradient = np.linspace(0, 255, w, dtype=np.float32)[None, :, None]
+        noise = rng.normal(0, 12, size=(h, w, 3)).astype(np.float32)
+        image = np.clip(gradient + noise, 0, 255).astype(np.uint8)
+        path = directory / f"face_{i}_cropped.jpg"
+        cv2.imwrite(str(path), image)
+        paths.append(str(path))
+    return paths
+
+
+def read_epoch_from_files(paths, batch_size, face_size=FACE_SIZE):
+    """
+    Читает эпоху, декодируя и приводя к размеру каждый JPEG.
+
+    Args:
+        paths (list): Пути к кропам
+        batch_size (int): Размер пачки
+        face_size (int): Сторона лица
+
+    Returns:
+        int: Контрольная сумма пикселей (чтобы чтение не было пропущено)
+    """
+    checksum = 0
+    for start in range(0, len(paths), batch_size):
+        batch = np.stack([load_face(path, face_size) for path in paths[start:start + batch_size]])
+        checksum += int(batch[:, 0, 0, 0].sum())
+    return checksum
+
+
+def read_epoch_from_store(store, batch_size):
+    """
+    Читает эпоху пачками из хранилища тензоров.
+
+    Каждая пачка копируется в непрерывный массив, как при передаче в фреймворк обучения.
+
+    Args:
+        store (FaceTensorStore): Открытое хранилище
+        batch_size (int): Размер пачки
+
+    Returns:
+        int: Контрольная сумма пикселей
+    """
+    checksum = 0
+    for faces, _, _ in store.iter_batches(batch_size, shuffle=True, seed=0):
+        batch = np.array(faces)
+        checksum += int(batch[:, 0, 0, 0].sum())
+    return checksum
+
+
+def run_benchmark(faces=5000, batch_size=256, shard_size=2048):
+    """
+    Запускает бенчмарк и печатает время эпохи и пропускную способность.
+
+    Args:
+        faces (int): Количество синтетических кропов
+        batch_size (int): Размер пачки
+        shard_size (int): Количество лиц в шарде
+
+    Returns:
+        dict: Время эпохи (в секундах) для каждого режима
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        crops_dir = tmp_dir / "photos_cropped"
+        crops_dir.mkdir()
+        paths = generate_cropped_faces(crops_dir, faces)
+
+        start = time.perf_counter()
+        with FaceTensorWriter(tmp_dir / "store", shard_size=shard_size) as writer:
+            for i, path in enumerate(paths):
+                writer.add(load_face(path), profile_id=i, image_index=0, profile_liked=i % 2, image_path=path)
+        print(f"[INFO] Packed {faces} faces in {time.perf_counter() - start:.2f} s")
+
+        store = FaceTensorStore(tmp_dir / "store")
+        modes = {
+            "JPEG decode + resize": lambda: read_epoch_from_files(paths, batch_size),
+            "tensor store (mmap)": lambda: read_epoch_from_store(store, batch_size),
+        }
+
+        results = {}
+        for name, read_epoch in modes.items():
+            start = time.perf_counter()
+            read_epoch()
+            results[name] = time.perf_counter() - start
+            print(f"[INFO] {name:<22} {results[name]:8.3f} s/epoch  {faces / results[name]:10.0f} faces/s")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк чтения кропов из JPEG и из хранилища тензоров")
+    parser.add_argument("--faces", type=int, default=5000, help="Количество синтетических кропов")
+    parser.add_argument("--batch-size", type=int, default=256, help="Размер пачки")
+    parser.add_argument("--shard-size", type=int, default=2048, help="Количество лиц в шарде")
+    args = parser.parse_args()
+
+    run_benchmark(args.faces, args.batch_size, args.shard_size)
@@ -0,0 +1,142 @@
+"""
+Бенчмарк выборки кадров из видео.
+
+Генерирует синтетические MP4-ролики во временной директории и сравнивает время
+на одно видео для исходного цикла cap.read() с пропуском кадров по шагу и для
+iter_sampled_frames в режимах step, sample_fps и num_samples (с переходом по времени).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_frame_sampling --videos 5 --seconds 10
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.Dataset.video_processor.frame_sampler import iter_sampled_frames
+
+
+def generate_synthetic_clip(path, seconds=10, fps=30, size=(720, 1280)):
+    """
+    Генерирует синтетический MP4-ролик с движущимися фигурами.
+
+    Args:
+        path (Path): Путь для сохранения ролика
+        seconds (int): Длительность ролика в секундах
+        fps (int): Частота кадров
+        size (tuple): Размер кадра (высота, ширина)
+    """
+    h, w = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8)
+
+    for i in range(seconds * fps):
+        frame = background.copy()
+        cv2.circle(frame, ((i * 7) % w, h // 2), h // 6, (40, 160, 220), -1)
+        cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+
+    writer.release()
+
+
+def decode_baseline(video_path, step=5):
+    """
+    Исходный способ: декодирует каждый кадр через cap.read() и отбрасывает лишние.
+
+    Args:
+        video_path (Path): Путь к видео
+        step (int): Интервал между анализируемыми кадрами
+
+    Returns:
+        int: Количество выбранных кадров
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    frame_idx = 0
+    sampled = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frame_idx += 1
+        if frame_idx % step != 0:
+            continue
+        sampled += 1
+    cap.release()
+    return sampled
+
+
+def decode_sampled(video_path, **sampling):
+    """
+    Новый способ: выборка кадров через iter_sampled_frames.
+
+    Args:
+        video_path (Path): Путь к видео
+        **sampling: Параметры выборки для iter_sampled_frames
+
+    Returns:
+        int: Количество выбранных кадров
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    sampled = sum(1 for _ in iter_sampled_frames(cap, **sampling))
+    cap.release()
+    return sampled
+
+
+def run_benchmark(videos=3, seconds=10, fps=30, repeats=3):
+    """
+    Запускает бенчмарк и печатает среднее время декодирования на одно видео.
+
+    Args:
+        videos (int): Количество синтетических роликов
+        seconds (int): Длительность каждого ролика в секундах
+        fps (int): Частота кадров роликов
+        repeats (int): Количество повторов каждого замера
+
+    Returns:
+        dict: Среднее время на видео (в мс) для каждого режима
+    """
+    modes = {
+        "read() + skip, step=5": lambda p: decode_baseline(p, step=5),
+        "grab()/retrieve(), step=5": lambda p: decode_sampled(p, step=5),
+        "grab()/retrieve(), sample_fps=2": lambda p: decode_sampled(p, sample_fps=2),
+        "grab()/retrieve(), num_samples=20": lambda p: decode_sampled(p, num_samples=20),
+        "seek POS_MSEC, num_samples=20": lambda p: decode_sampled(p, num_samples=20, seek=True),
+    }
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        clips = []
+        for i in range(videos):
+            clip_path = Path(tmp_dir) / f"clip_{i}.mp4"
+            generate_synthetic_clip(clip_path, seconds=seconds, fps=fps)
+            clips.append(clip_path)
+
+        results = {}
+        for name, decode in modes.items():
+            timings = []
+            sampled = 0
+            for _ in range(repeats):
+                for clip_path in clips:
+                    start = time.perf_counter()
+                    sampled = decode(clip_path)
+                    timings.append(time.perf_counter() - start)
+
+            results[name] = 1000 * sum(timings) / len(timings)
+            print(f"[INFO] {name:<36} {results[name]:8.1f} ms/video ({sampled} frames sampled)")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк выборки кадров из видео")
+    parser.add_argument("--videos", type=int, default=3, help="Количество синтетических роликов")
+    parser.add_argument("--seconds", type=int, default=10, help="Длительность ролика в секундах")
+    parser.add_argument("--fps", type=int, default=30, help="Частота кадров роликов")
+    parser.add_argument("--repeats", type=int, default=3, help="Количество повторов замера")
+    args = parser.parse_args()
+
+    run_benchmark(args.videos, args.seconds, args.fps, args.repeats)
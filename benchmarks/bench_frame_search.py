@@ -0,0 +1,137 @@
+"""
+Бенчмарк поиска лучших кадров с лицом в длинных видео.
+
+Генерирует синтетический ролик: фото с лицом (--face) движется по шумному
+фону, а его размер и четкость меняются со временем, поэтому у ролика есть
+явные лучшие моменты. Сравнивает:
+    - extract_best_face_frame: полный просмотр видео с шагом step, один кадр;
+    - extract_top_face_frames: поиск от грубого к точному с бюджетом кадров, top_k кадров.
+Оба результата оцениваются одной функцией (детекция в режиме IMAGE и
+score_face_frame), чтобы сравнить качество найденного лучшего кадра.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_frame_search --face datasets/ChatExport_test/photos/p0.jpg --seconds 120
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.Dataset.detector.face_detection_engine import get_face_detection_engine, shutdown_face_detection_engine
+from src.Dataset.video_processor.frame_extractor import (
+    FRAME_BUDGET, TOP_K, extract_best_face_frame, extract_top_face_frames, score_face_frame,
+)
+
+
+def generate_face_clip(path, face, seconds=120, fps=30, size=(480, 640)):
+    """
+    Генерирует ролик с лицом, у которого меняются положение, размер и размытие.
+
+    Args:
+        path (Path): Путь для сохранения ролика
+        face (np.ndarray): Фото с лицом в BGR
+        seconds (int): Длительность ролика в секундах
+        fps (int): Частота кадров
+        size (tuple): Размер кадра (высота, ширина)
+    """
+    h, w = size
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    rng = np.random.default_rng(0)
+    background = rng.integers(0, 255, size=(h, w, 3), dtype=np.uint8)
+    total = seconds * fps
+
+    for i in range(total):
+        t = i / total
+        frame = background.copy()
+        # Размер лица и четкость медленно колеблются: несколько пиков за ролик
+        scale = 0.45 + 0.35 * np.sin(2 * np.pi * 3 * t) ** 2
+        blur = 1 + 2 * int(6 * (1 - np.cos(2 * np.pi * 5 * t) ** 2))
+        side = int(min(h, w) * scale)
+        patch = cv2.GaussianBlur(cv2.resize(face, (side, side), interpolation=cv2.INTER_AREA), (blur, blur), 0)
+        x = int((w - side) * (0.5 + 0.4 * np.sin(2 * np.pi * 2 * t)))
+        y = (h - side) // 2
+        frame[y:y + side, x:x + side] = patch
+        writer.write(frame)
+
+    writer.release()
+
+
+def score_frame(frame):
+    """
+    Оценивает кадр так же, как при поиске (детекция в режиме IMAGE).
+
+    Returns:
+        float: Оценка кадра (0 — лиц нет)
+    """
+    detections = get_face_detection_engine().detect([frame])[0]
+    return score_face_frame(frame, detections) if detections else 0.0
+
+
+def run_benchmark(face_path, seconds=120, step=5, top_k=TOP_K, frame_budget=FRAME_BUDGET):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        face_path (str): Путь к фото с лицом
+        seconds (int): Длительность ролика в секундах
+        step (int): Шаг полного просмотра и минимальный шаг уточнения
+        top_k (int): Количество кадров при поиске от грубого к точному
+        frame_budget (int): Бюджет оцениваемых кадров на видео
+
+    Returns:
+        dict: Время (в секундах) и оценки лучших кадров для обоих способов
+    """
+    face = cv2.imread(face_path)
+    if face is None:
+        raise FileNotFoundError(f"Face photo not found: {face_path}")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        video_path = Path(tmp_dir) / "clip.mp4"
+        generate_face_clip(video_path, face, seconds)
+
+        # Прогрев детектора не входит в замер
+        score_frame(face)
+
+        start = time.perf_counter()
+        best_frame = extract_best_face_frame(video_path, step=step)
+        scan_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        top_frames = extract_top_face_frames(video_path, top_k=top_k, step=step, frame_budget=frame_budget)
+        search_time = time.perf_counter() - start
+
+    scan_score = score_frame(best_frame) if best_frame is not None else 0.0
+    search_scores = [score_frame(frame) for _, frame in top_frames]
+    results = {
+        "scan_s": scan_time,
+        "search_s": search_time,
+        "scan_best_score": scan_score,
+        "search_best_score": max(search_scores, default=0.0),
+    }
+    print(f"[INFO] {seconds} s clip at 30 fps, scan step {step}, frame budget {frame_budget}")
+    print(f"[INFO] full scan        {scan_time:7.2f} s  (1 frame, score {scan_score:.0f})")
+    print(f"[INFO] coarse-to-fine   {search_time:7.2f} s  ({len(top_frames)} frames at "
+          f"{[timestamp for timestamp, _ in top_frames]} ms, best score {results['search_best_score']:.0f})")
+    if scan_score:
+        print(f"[INFO] speedup x{scan_time / search_time:.1f}, "
+              f"best score {100 * results['search_best_score'] / scan_score:.0f}% of full scan")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска лучших кадров с лицом в видео")
+    parser.add_argument("--face", required=True, help="Фото с лицом для синтетического ролика")
+    parser.add_argument("--seconds", type=int, default=120, help="Длительность ролика в секундах")
+    parser.add_argument("--step", type=int, default=5, help="Шаг полного просмотра")
+    parser.add_argument("--top-k", type=int, default=TOP_K, help="Количество кадров")
+    parser.add_argument("--frame-budget", type=int, default=FRAME_BUDGET, help="Бюджет оцениваемых кадров на видео")
+    args = parser.parse_args()
+
+    try:
+        run_benchmark(args.face, args.seconds, args.step, args.top_k, args.frame_budget)
+    finally:
+        shutdown_face_detection_engine()
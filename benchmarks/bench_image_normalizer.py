@@ -0,0 +1,151 @@
+"""
+Бенчмарк пропускной способности нормализатора фото.
+
+Генерирует синтетические фото двух типов — обычные и с сильным засветом —
+и сравнивает число обработанных фото в секунду для исходной реализации
+remove_artificial_filters_adaptive (с проверкой np.array_equal на стороне
+вызывающего кода) и для normalize_image с флагом изменения.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_image_normalizer --images 50 --size 1280x960
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from src.Dataset.filter_remover.image_normalizer import (
+    BRIGHT_PIXEL_LEVEL,
+    BRIGHT_RATIO_THRESHOLD,
+    CLAHE_CLIP_LIMIT,
+    CLAHE_TILE_GRID_SIZE,
+    GAMMA,
+    LAB_SATURATION_FACTOR,
+    MEAN_BRIGHTNESS_THRESHOLD,
+    YUV_CHROMA_FACTOR,
+    normalize_image,
+)
+
+
+def normalize_baseline(image):
+    """
+    Исходная реализация нормализатора: гистограмма по полному разрешению,
+    цепочка LAB -> BGR -> YUV -> BGR с временными float32-массивами и
+    пересборка таблицы гаммы на каждый вызов.
+
+    Args:
+        image (np.ndarray): Изображение в формате BGR
+
+    Returns:
+        np.ndarray: Обработанное изображение или копия исходного
+    """
+    lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    l, a, b = cv2.split(lab)
+
+    hist, _ = np.histogram(l, bins=256, range=(0, 256))
+    bright_ratio = np.sum(hist[BRIGHT_PIXEL_LEVEL:]) / l.size
+    if not (bright_ratio > BRIGHT_RATIO_THRESHOLD or np.mean(l) > MEAN_BRIGHTNESS_THRESHOLD):
+        return image.copy()
+
+    clahe = cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID_SIZE)
+    l_norm = clahe.apply(l)
+    a = np.clip((a.astype(np.float32) - 128) * LAB_SATURATION_FACTOR + 128, 0, 255).astype(np.uint8)
+    b = np.clip((b.astype(np.float32) - 128) * LAB_SATURATION_FACTOR + 128, 0, 255).astype(np.uint8)
+    result = cv2.cvtColor(cv2.merge([l_norm, a, b]), cv2.COLOR_LAB2BGR)
+
+    y, u, v = cv2.split(cv2.cvtColor(result, cv2.COLOR_BGR2YUV))
+    u = np.clip((u.astype(np.float32) - 128) * YUV_CHROMA_FACTOR + 128, 0, 255).astype(np.uint8)
+    v = np.clip((v.astype(np.float32) - 128) * YUV_CHROMA_FACTOR + 128, 0, 255).astype(np.uint8)
+    result = cv2.cvtColor(cv2.merge([y, u, v]), cv2.COLOR_YUV2BGR)
+
+    inv_gamma = 1.0 / GAMMA
+    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
+    return cv2.LUT(result, table)
+
+
+def generate_synthetic_images(count, size=(960, 1280), bright=False):
+    """
+    Генерирует синтетические фото с градиентом и шумом.
+
+    Args:
+        count (int): Количество фото
+        size (tuple): Размер фото (высота, ширина)
+        bright (bool): Делать ли фото засвеченными
+
+    Returns:
+        list: Список изображений BGR
+    """
+    h, w = size
+    rng = np.random.default_rng(0)
+    gradient = np.linspace(0, 1, w, dtype=np.float32)[np.newaxis, :, np.newaxis]
+    base = 170 if bright else 60
+    images = []
+    for _ in range(count):
+        noise = rng.normal(0, 20, size=(h, w, 3)).astype(np.float32)
+        image = base + 80 * gradient + noise + rng.integers(-20, 20, size=3)
+        images.append(np.clip(image, 0, 255).astype(np.uint8))
+    return images
+
+
+def measure_throughput(func, images, repeats=3):
+    """
+    Замеряет пропускную способность функции.
+
+    Args:
+        func (callable): Функция, принимающая одно изображение
+        images (list): Изображения для обработки
+        repeats (int): Количество повторов замера
+
+    Returns:
+        float: Лучшее число обработанных фото в секунду
+    """
+    best = 0.0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for image in images:
+            func(image)
+        best = max(best, len(images) / (time.perf_counter() - start))
+    return best
+
+
+def run_benchmark(images=30, size=(960, 1280), repeats=3):
+    """
+    Запускает бенчмарк и печатает число фото в секунду для каждого режима.
+
+    Args:
+        images (int): Количество синтетических фото каждого типа
+        size (tuple): Размер фото (высота, ширина)
+        repeats (int): Количество повторов каждого замера
+
+    Returns:
+        dict: Число фото в секунду для каждого режима и типа фото
+    """
+    modes = {
+        # Исходный вызывающий код сравнивал результат с исходником через np.array_equal
+        "baseline + array_equal": lambda image: np.array_equal(image, normalize_baseline(image)),
+        "normalize_image": normalize_image,
+        "normalize_image, full-res gate": lambda image: normalize_image(image, gate_max_side=None),
+    }
+
+    results = {}
+    for kind, bright in (("normal", False), ("bright", True)):
+        batch = generate_synthetic_images(images, size=size, bright=bright)
+        for name, func in modes.items():
+            key = f"{name} [{kind}]"
+            results[key] = measure_throughput(func, batch, repeats=repeats)
+            print(f"[INFO] {key:<44} {results[key]:8.1f} images/s")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк пропускной способности нормализатора фото")
+    parser.add_argument("--images", type=int, default=30, help="Количество синтетических фото каждого типа")
+    parser.add_argument("--size", default="1280x960", help="Размер фото ШxВ")
+    parser.add_argument("--repeats", type=int, default=3, help="Количество повторов замера")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    run_benchmark(args.images, (height, width), args.repeats)
@@ -0,0 +1,95 @@
+"""
+Бенчмарк инкрементальной сборки датасета при еженедельном экспорте чата.
+
+Генерирует синтетический result.json и его «прошлую неделю» — тот же
+экспорт без последней доли сообщений. Сравнивает на новом экспорте:
+    - полную сборку (export_with_profiles с первого сообщения);
+    - export_incremental поверх сборки прошлой недели (дописываются только новые анкеты).
+Итоговые CSV и датасеты анкет обоих способов сравниваются.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_incremental_build --profiles 200000 --new-fraction 0.02
+"""
+
+import argparse
+import hashlib
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from benchmarks.bench_pipeline_suite import generate_dv_export
+from src.Dataset.dataset_builder.dv_dataset_builder import DatasetBuilder
+from src.Dataset.dataset_builder.profile_dataset import ProfileDataset
+
+
+def write_previous_export(json_path, previous_path, new_fraction):
+    """
+    Сохраняет экспорт без последней доли сообщений (как экспорт прошлой недели).
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    keep = int(len(data["messages"]) * (1 - new_fraction))
+    data["messages"] = data["messages"][:keep]
+    with open(previous_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+
+
+def same_profiles(a_path, b_path):
+    """
+    Проверяет, что два датасета анкет совпадают.
+    """
+    a, b = ProfileDataset.load(a_path), ProfileDataset.load(b_path)
+    return all(np.array_equal(getattr(a, name), getattr(b, name)) for name in ProfileDataset.ARRAYS)
+
+
+def run_benchmark(profiles=200_000, new_fraction=0.02, streaming=False):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        profiles (int): Количество анкет в синтетическом экспорте
+        new_fraction (float): Доля новых сообщений с прошлой сборки
+        streaming (bool): Потоково разбирать JSON
+
+    Returns:
+        dict: Время (в секундах) полной и инкрементальной сборки
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        json_path, previous_path = tmp_dir / "result.json", tmp_dir / "previous.json"
+        generate_dv_export(json_path, profiles)
+        write_previous_export(json_path, previous_path, new_fraction)
+
+        full_csv, full_npz = tmp_dir / "full.csv", tmp_dir / "full.npz"
+        start = time.perf_counter()
+        DatasetBuilder(json_path, streaming).export_with_profiles(full_csv, full_npz)
+        full_time = time.perf_counter() - start
+
+        inc_csv, inc_npz, state = tmp_dir / "inc.csv", tmp_dir / "inc.npz", tmp_dir / "state.json"
+        DatasetBuilder(previous_path, streaming).export_incremental(inc_csv, state, inc_npz)
+        start = time.perf_counter()
+        DatasetBuilder(json_path, streaming).export_incremental(inc_csv, state, inc_npz)
+        incremental_time = time.perf_counter() - start
+
+        identical = (hashlib.md5(full_csv.read_bytes()).digest() == hashlib.md5(inc_csv.read_bytes()).digest()
+                     and same_profiles(full_npz, inc_npz))
+
+    results = {"full_s": full_time, "incremental_s": incremental_time}
+    print(f"[INFO] {profiles} profiles, {100 * new_fraction:.0f}% new messages, streaming {streaming}")
+    print(f"[INFO] full rebuild   {full_time:7.2f} s")
+    print(f"[INFO] incremental    {incremental_time:7.2f} s")
+    print(f"[INFO] speedup x{full_time / incremental_time:.1f}, outputs identical: {identical}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк инкрементальной сборки датасета")
+    parser.add_argument("--profiles", type=int, default=200_000, help="Количество анкет в синтетическом экспорте")
+    parser.add_argument("--new-fraction", type=float, default=0.02, help="Доля новых сообщений с прошлой сборки")
+    parser.add_argument("--streaming", action="store_true", help="Потоково разбирать JSON")
+    args = parser.parse_args()
+
+    run_benchmark(args.profiles, args.new_fraction, args.streaming)
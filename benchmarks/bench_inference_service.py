@@ -0,0 +1,231 @@
+"""
+Нагрузочный тест сервиса предсказания лайков.
+
+Запускает сервис src.ML.inference.server в отдельном процессе (или
+использует уже запущенный по --url), открывает несколько одновременных
+keep-alive соединений и отправляет запросы /predict с анкетами. В конце
+печатает p50/p90/p99 задержки, количество запросов в секунду и средний
+размер микро-пачки на стороне сервиса.
+
+Фото берутся из папки --images (например, photos/ экспорта чата) или
+генерируются синтетически. Если обученной модели нет, с --synthetic-model
+сервису передается модель, обученная на случайных признаках: для замера
+задержки значения вероятностей не важны.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_inference_service --synthetic-model --requests 200 --concurrency 16
+    python -m benchmarks.bench_inference_service --images datasets/ChatExport_2024/photos --max-delay-ms 0
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_image_normalizer import generate_synthetic_images
+
+
+def build_synthetic_model(path, seed=0):
+    """
+    Сохраняет модель лайков, обученную на случайных признаках.
+
+    Args:
+        path (Path): Путь к файлу модели
+        seed (int): Зерно генератора случайных чисел
+    """
+    from src.ML.features.descriptors import get_descriptor_params, get_feature_dim
+    from src.ML.inference.like_model import LikeModel
+
+    rng = np.random.default_rng(seed)
+    features = rng.random((256, get_feature_dim()), dtype=np.float32)
+    labels = rng.integers(0, 2, size=256)
+    LikeModel.fit(features, labels, params=get_descriptor_params()).save(path)
+
+
+def load_photos(images_dir, count, size):
+    """
+    Загружает фото из папки или генерирует синтетические и кодирует их в base64 JPEG.
+
+    Args:
+        images_dir (str or None): Папка с фото (None — синтетические фото)
+        count (int): Максимальное количество фото
+        size (tuple): Размер синтетических фото (высота, ширина)
+
+    Returns:
+        list: Фото в base64
+    """
+    if images_dir:
+        paths = sorted(p for p in Path(images_dir).rglob("*") if p.suffix.lower() in (".jpg", ".jpeg", ".png"))
+        photos = [p.read_bytes() for p in paths[:count]]
+        if not photos:
+            raise FileNotFoundError(f"No photos found in: {images_dir}")
+    else:
+        photos = [cv2.imencode(".jpg", image)[1].tobytes() for image in generate_synthetic_images(count, size)]
+    return [base64.b64encode(photo).decode("ascii") for photo in photos]
+
+
+async def http_request(reader, writer, method, path, payload=None):
+    """
+    Отправляет HTTP-запрос по открытому keep-alive соединению и читает JSON-ответ.
+
+    Returns:
+        tuple: (код статуса, разобранный JSON)
+    """
+    body = b"" if payload is None else json.dumps(payload).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body
+    )
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def run_clients(host, port, photos, requests, concurrency, photos_per_profile, profiles_per_request):
+    """
+    Отправляет запросы из нескольких одновременных клиентов.
+
+    Returns:
+        tuple: (список задержек запросов в секундах, общее время в секундах, статистика сервиса)
+    """
+    latencies = []
+    counter = iter(range(requests))
+    rng = np.random.default_rng(0)
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            for i in counter:
+                profiles = [
+                    {"id": f"{i}-{j}", "photos": list(rng.choice(photos, size=photos_per_profile))}
+                    for j in range(profiles_per_request)
+                ]
+                start = time.perf_counter()
+                status, _ = await http_request(reader, writer, "POST", "/predict", {"profiles": profiles})
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    raise RuntimeError(f"Request failed with status {status}")
+        finally:
+            writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await http_request(reader, writer, "GET", "/stats")
+    writer.close()
+    return latencies, elapsed, stats
+
+
+async def wait_until_ready(host, port, process, timeout=120.0):
+    """
+    Ждет, пока сервис начнет отвечать на /health.
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("Inference service exited before becoming ready")
+        try:
+            reader, writer = await asyncio.open_connection(host, port)
+            await http_request(reader, writer, "GET", "/health")
+            writer.close()
+            return
+        except OSError:
+            await asyncio.sleep(0.2)
+    raise TimeoutError("Inference service did not become ready")
+
+
+def run_benchmark(args):
+    """
+    Запускает сервис (если не задан --url), выполняет нагрузочный тест и печатает результаты.
+
+    Returns:
+        dict: p50/p90/p99 задержки в мс, запросы в секунду и средний размер пачки
+    """
+    photos = load_photos(args.images, args.photo_pool, (args.photo_height, args.photo_width))
+
+    process = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if args.url:
+            host, _, port = args.url.removeprefix("http://").rstrip("/").partition(":")
+            port = int(port or 80)
+        else:
+            host, port = "127.0.0.1", args.port
+            command = [sys.executable, "-m", "src.ML.inference.server", "--host", host, "--port", str(port),
+                       "--max-batch-size", str(args.max_batch_size), "--max-delay-ms", str(args.max_delay_ms)]
+            if args.synthetic_model:
+                model_path = Path(tmp_dir) / "synthetic_like_model.npz"
+                build_synthetic_model(model_path)
+                command += ["--model", str(model_path)]
+            elif args.model:
+                command += ["--model", args.model]
+            process = subprocess.Popen(command)
+
+        try:
+            asyncio.run(wait_until_ready(host, port, process))
+
+            # Прогревочные запросы не входят в замер
+            asyncio.run(run_clients(host, port, photos, args.concurrency, args.concurrency,
+                                    args.photos_per_profile, args.profiles_per_request))
+            latencies, elapsed, stats = asyncio.run(run_clients(
+                host, port, photos, args.requests, args.concurrency,
+                args.photos_per_profile, args.profiles_per_request,
+            ))
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    latencies_ms = 1000 * np.array(latencies)
+    results = {
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p90_ms": float(np.percentile(latencies_ms, 90)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+        "requests_per_s": len(latencies) / elapsed,
+        "mean_batch_size": stats.get("mean_batch_size"),
+    }
+    print(f"[INFO] {len(latencies)} requests, concurrency {args.concurrency}, "
+          f"{args.profiles_per_request} profile(s) x {args.photos_per_profile} photo(s) per request")
+    print(f"[INFO] latency p50 {results['p50_ms']:.1f} ms  p90 {results['p90_ms']:.1f} ms  "
+          f"p99 {results['p99_ms']:.1f} ms")
+    print(f"[INFO] throughput {results['requests_per_s']:.1f} req/s, "
+          f"mean server batch {results['mean_batch_size'] or 0:.2f} profiles")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса предсказания лайков")
+    parser.add_argument("--url", help="Адрес уже запущенного сервиса (например, http://127.0.0.1:8080)")
+    parser.add_argument("--port", type=int, default=8765, help="Порт для запускаемого сервиса")
+    parser.add_argument("--model", help="Путь к модели лайков для запускаемого сервиса")
+    parser.add_argument("--synthetic-model", action="store_true",
+                        help="Запустить сервис с моделью, обученной на случайных признаках")
+    parser.add_argument("--max-batch-size", type=int, default=16, help="Максимум анкет в пачке сервиса")
+    parser.add_argument("--max-delay-ms", type=float, default=5.0, help="Задержка добора пачки сервиса")
+    parser.add_argument("--requests", type=int, default=200, help="Количество запросов")
+    parser.add_argument("--concurrency", type=int, default=8, help="Количество одновременных клиентов")
+    parser.add_argument("--profiles-per-request", type=int, default=1, help="Анкет в одном запросе")
+    parser.add_argument("--photos-per-profile", type=int, default=3, help="Фото в одной анкете")
+    parser.add_argument("--images", help="Папка с фото для запросов (по умолчанию синтетические фото)")
+    parser.add_argument("--photo-pool", type=int, default=32, help="Количество различных фото")
+    parser.add_argument("--photo-height", type=int, default=960, help="Высота синтетических фото")
+    parser.add_argument("--photo-width", type=int, default=720, help="Ширина синтетических фото")
+    run_benchmark(parser.parse_args())
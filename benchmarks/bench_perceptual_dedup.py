@@ -0,0 +1,118 @@
+"""
+Бенчмарк поиска дубликатов по перцептивным хэшам: multi-index hashing против попарного сравнения.
+
+Генерирует синтетические 64-битные хэши: уникальные фото и их копии с
+несколькими перевернутыми битами (как после пересжатия JPEG), — и
+группирует их двумя способами:
+    - cluster_hashes из стадии dedup (запросы к индексу MultiIndexHash канонических хэшей);
+    - попарное сравнение каждого хэша со всеми каноническими хэшами (numpy).
+Проверяет, что группы совпадают, и печатает время обоих способов.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_perceptual_dedup --images 50000 --duplicate-fraction 0.3
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.Dataset.deduplicator.dv_dataset_deduplicator import NO_GROUP, cluster_hashes
+from src.Dataset.deduplicator.perceptual_hash import HAMMING_RADIUS
+
+
+def generate_hashes(images, duplicate_fraction, max_flips, seed=0):
+    """
+    Генерирует хэши уникальных фото и их слегка измененных копий в случайном порядке.
+
+    Args:
+        images (int): Общее количество хэшей
+        duplicate_fraction (float): Доля копий среди хэшей
+        max_flips (int): Максимальное количество перевернутых битов в копии
+        seed (int): Зерно генератора случайных чисел
+
+    Returns:
+        list: Хэши (int)
+    """
+    rng = np.random.default_rng(seed)
+    unique = int(images * (1 - duplicate_fraction))
+    hashes = [int(value) for value in rng.integers(0, 2 ** 63, size=unique, dtype=np.int64)]
+
+    for _ in range(images - unique):
+        value = hashes[rng.integers(unique)]
+        for bit in rng.choice(64, size=rng.integers(0, max_flips + 1), replace=False):
+            value ^= 1 << int(bit)
+        hashes.append(value)
+
+    order = rng.permutation(len(hashes))
+    return [hashes[i] for i in order]
+
+
+def cluster_brute_force(hashes, radius):
+    """
+    Группирует хэши попарным сравнением с каждым каноническим хэшем.
+
+    Returns:
+        np.ndarray: Номер группы для каждого хэша (как у cluster_hashes)
+    """
+    bits = np.unpackbits(np.array(hashes, dtype=">u8").view(np.uint8).reshape(-1, 8), axis=1).astype(bool)
+    groups = np.full(len(hashes), NO_GROUP, dtype=np.int32)
+    canonical = np.empty((len(hashes), 64), dtype=bool)
+    count = 0
+
+    for i, row in enumerate(bits):
+        distances = (canonical[:count] != row).sum(axis=1)
+        close = np.flatnonzero(distances <= radius)
+        if len(close):
+            groups[i] = close[np.argmin(distances[close])]
+            continue
+        canonical[count] = row
+        groups[i] = count
+        count += 1
+    return groups
+
+
+def run_benchmark(images=50_000, duplicate_fraction=0.3, radius=HAMMING_RADIUS, brute_force_limit=50_000):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        images (int): Количество хэшей
+        duplicate_fraction (float): Доля копий среди хэшей
+        radius (int): Радиус поиска дубликатов
+        brute_force_limit (int): Максимальное количество хэшей для попарного сравнения
+
+    Returns:
+        dict: Время (в секундах) обоих способов и количество групп
+    """
+    hashes = generate_hashes(images, duplicate_fraction, max_flips=radius // 2)
+
+    start = time.perf_counter()
+    groups, canonical = cluster_hashes(hashes, radius)
+    results = {"index_s": time.perf_counter() - start, "groups": len(canonical)}
+    print(f"[INFO] {images} hashes, radius {radius}: {len(canonical)} groups, "
+          f"{images - len(canonical)} duplicates")
+    print(f"[INFO] multi-index  {results['index_s']:8.2f} s")
+
+    if images <= brute_force_limit:
+        start = time.perf_counter()
+        expected = cluster_brute_force(hashes, radius)
+        results["brute_force_s"] = time.perf_counter() - start
+        print(f"[INFO] brute force  {results['brute_force_s']:8.2f} s")
+        if not np.array_equal(groups, expected):
+            print("[WARN] Multi-index groups differ from brute force")
+    else:
+        print(f"[INFO] brute force skipped (more than {brute_force_limit} hashes)")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк поиска дубликатов по перцептивным хэшам")
+    parser.add_argument("--images", type=int, default=50_000, help="Количество хэшей")
+    parser.add_argument("--duplicate-fraction", type=float, default=0.3, help="Доля копий среди хэшей")
+    parser.add_argument("--radius", type=int, default=HAMMING_RADIUS, help="Радиус поиска дубликатов")
+    parser.add_argument("--brute-force-limit", type=int, default=50_000,
+                        help="Максимальное количество хэшей для попарного сравнения")
+    args = parser.parse_args()
+
+    run_benchmark(args.images, args.duplicate_fraction, args.radius, args.brute_force_limit)
@@ -0,0 +1,294 @@
+"""
+Набор микробенчмарков для горячих функций всех стадий пайплайна.
+
+Генерирует синтетические входные данные во временной директории: фото
+нескольких разрешений (обычные и с засветом), короткие MP4-ролики и JSON-
+экспорты чата разного размера. Для каждой функции считает перцентили
+задержки одного вызова, пропускную способность и пиковую память
+(по tracemalloc, отдельным прогоном), а результаты сохраняет в JSON.
+Два JSON-файла сравниваются скриптом benchmarks.compare_results.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_pipeline_suite --output files/bench/baseline.json
+    python -m benchmarks.bench_pipeline_suite --quick --only normalizer sharpness
+"""
+
+import argparse
+import json
+import platform
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from benchmarks.bench_frame_sampling import generate_synthetic_clip
+from benchmarks.bench_image_normalizer import generate_synthetic_images
+from src.Dataset.cropper.face_cropper import crop_face_from_image
+from src.Dataset.dataset_builder.dv_dataset_builder import DatasetBuilder
+from src.Dataset.detector.face_detection_engine import shutdown_face_detection_engine
+from src.Dataset.filter_remover.image_normalizer import remove_artificial_filters_adaptive
+from src.Dataset.video_processor.frame_extractor import extract_best_face_frame
+from src.Dataset.video_processor.sharpness_calculator import get_sharpness_score
+
+
+# Версия формата файла результатов
+RESULTS_VERSION = 1
+
+# Разрешения синтетических фото (ширина, высота)
+IMAGE_SIZES = ((640, 480), (1280, 960), (1920, 1440))
+QUICK_IMAGE_SIZES = ((640, 480), (1280, 960))
+
+# Длительности синтетических роликов в секундах
+CLIP_SECONDS = (2, 5)
+QUICK_CLIP_SECONDS = (2,)
+
+# Количество анкет в синтетических JSON-экспортах
+EXPORT_PROFILES = (1_000, 10_000, 50_000)
+QUICK_EXPORT_PROFILES = (1_000, 10_000)
+
+# Группы бенчмарков (для --only)
+GROUPS = ("normalizer", "crop", "sharpness", "video", "dataset")
+
+
+def generate_dv_export(path, profiles, photos_per_profile=3, seed=0):
+    """
+    Генерирует синтетический result.json экспорта чата с ботом.
+
+    Каждая анкета — несколько сообщений бота с фото или видео и реакция
+    пользователя; между анкетами встречаются служебные сообщения.
+
+    Args:
+        path (Path): Путь для сохранения JSON-файла
+        profiles (int): Количество анкет
+        photos_per_profile (int): Среднее количество фото в анкете
+        seed (int): Зерно генератора случайных чисел
+    """
+    rng = np.random.default_rng(seed)
+    bot_name = "Дайвинчик | Leo – знакомства, общение и новые друзья"
+
+    messages = []
+    for profile in range(profiles):
+        for idx in range(int(rng.integers(1, 2 * photos_per_profile))):
+            if rng.random() < 0.1:
+                media = {"file": f"video_files/v{profile}_{idx}.mp4"}
+            else:
+                media = {"photo": f"photos/p{profile}_{idx}.jpg"}
+            messages.append({"id": len(messages), "type": "message", "from": bot_name, "text": "", **media})
+
+        if rng.random() < 0.05:
+            messages.append({"id": len(messages), "type": "message", "from": "me", "text": "🚀 Смотреть анкеты"})
+        text = "❤️" if rng.random() < 0.3 else "👎"
+        messages.append({"id": len(messages), "type": "message", "from": "me", "text": text})
+
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"name": "bench", "type": "personal_chat", "messages": messages}, f, ensure_ascii=False)
+
+
+def measure(func, inputs, repeats=3, warmup=1):
+    """
+    Замеряет задержку, пропускную способность и пиковую память функции.
+
+    Сначала функция прогревается на первых входах, затем каждый вход
+    обрабатывается repeats раз с замером времени каждого вызова. Пиковая
+    память считается отдельным прогоном под tracemalloc, чтобы трассировка
+    не искажала время; учитываются аллокации Python и NumPy, но не
+    внутренние буферы OpenCV и MediaPipe.
+
+    Args:
+        func (callable): Функция, принимающая один вход
+        inputs (list): Входные данные
+        repeats (int): Количество проходов по входам
+        warmup (int): Количество прогревочных вызовов
+
+    Returns:
+        dict: Перцентили задержки (мс), пропускная способность (вызовов/с) и пиковая память (МБ)
+    """
+    for item in inputs[:warmup]:
+        func(item)
+
+    latencies = []
+    for _ in range(repeats):
+        for item in inputs:
+            start = time.perf_counter()
+            func(item)
+            latencies.append(time.perf_counter() - start)
+    latencies_ms = 1000 * np.asarray(latencies)
+
+    tracemalloc.start()
+    for item in inputs:
+        func(item)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "min": float(latencies_ms.min()),
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p90": float(np.percentile(latencies_ms, 90)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "max": float(latencies_ms.max()),
+        },
+        "throughput_per_s": float(len(latencies) / (latencies_ms.sum() / 1000)),
+        "peak_memory_mb": peak / (1 << 20),
+    }
+
+
+def build_cases(work_dir, groups=GROUPS, quick=False, images_per_case=5, face_image=None):
+    """
+    Генерирует входные данные и собирает список бенчмарков.
+
+    Args:
+        work_dir (Path): Временная директория для входных и выходных файлов
+        groups (iterable): Группы бенчмарков для запуска (см. GROUPS)
+        quick (bool): Сокращенный набор разрешений, роликов и экспортов
+        images_per_case (int): Количество фото на каждый бенчмарк по фото
+        face_image (str or None): Путь к реальному фото с лицом для бенчмарка обрезки
+                                  (на синтетических фото лицо не находится)
+
+    Returns:
+        list: Кортежи (имя бенчмарка, функция, входные данные)
+    """
+    image_sizes = QUICK_IMAGE_SIZES if quick else IMAGE_SIZES
+    clip_seconds = QUICK_CLIP_SECONDS if quick else CLIP_SECONDS
+    export_profiles = QUICK_EXPORT_PROFILES if quick else EXPORT_PROFILES
+    cases = []
+
+    images = {}
+    for width, height in image_sizes:
+        for kind, bright in (("normal", False), ("bright", True)):
+            images[(width, height, kind)] = generate_synthetic_images(
+                images_per_case, size=(height, width), bright=bright
+            )
+
+    if "normalizer" in groups:
+        for (width, height, kind), batch in images.items():
+            cases.append((f"normalizer/{width}x{height}/{kind}", remove_artificial_filters_adaptive, batch))
+
+    if "sharpness" in groups:
+        for (width, height, kind), batch in images.items():
+            if kind != "normal":
+                continue
+            bbox = {"x": width // 4, "y": height // 4, "width": width // 2, "height": height // 2}
+            cases.append((f"sharpness/{width}x{height}/full", get_sharpness_score, batch))
+            cases.append((
+                f"sharpness/{width}x{height}/roi",
+                lambda image, bbox=bbox: get_sharpness_score(image, bbox=bbox),
+                batch,
+            ))
+
+    if "crop" in groups:
+        crop_dir = work_dir / "crop"
+        crop_dir.mkdir()
+        for (width, height, kind), batch in images.items():
+            if kind != "normal":
+                continue
+            paths = []
+            for i, image in enumerate(batch):
+                path = crop_dir / f"{width}x{height}_{i}.jpg"
+                cv2.imwrite(str(path), image)
+                paths.append(str(path))
+            cases.append((
+                f"crop/{width}x{height}/no_face",
+                lambda path: crop_face_from_image(path, path + ".cropped.jpg"),
+                paths,
+            ))
+
+        if face_image is not None:
+            cases.append((
+                "crop/face_image",
+                lambda path: crop_face_from_image(path, str(crop_dir / "face_cropped.jpg")),
+                [face_image] * images_per_case,
+            ))
+
+    if "video" in groups:
+        for seconds in clip_seconds:
+            clip_path = work_dir / f"clip_{seconds}s.mp4"
+            generate_synthetic_clip(clip_path, seconds=seconds, size=(480, 640))
+            cases.append((f"video/extract_best_face_frame/{seconds}s", extract_best_face_frame, [str(clip_path)]))
+
+    if "dataset" in groups:
+        for profiles in export_profiles:
+            json_path = work_dir / f"result_{profiles}.json"
+            generate_dv_export(json_path, profiles)
+            cases.append((
+                f"dataset/build_dataset/{profiles}_profiles",
+                lambda path: DatasetBuilder(path).build_dataset(),
+                [str(json_path)],
+            ))
+            cases.append((
+                f"dataset/build_dataset_streaming/{profiles}_profiles",
+                lambda path: DatasetBuilder(path, streaming=True).build_dataset(),
+                [str(json_path)],
+            ))
+
+    return cases
+
+
+def run_suite(groups=GROUPS, quick=False, repeats=3, images_per_case=5, face_image=None):
+    """
+    Запускает набор бенчмарков и печатает результаты.
+
+    Args:
+        groups (iterable): Группы бенчмарков для запуска (см. GROUPS)
+        quick (bool): Сокращенный набор входных данных
+        repeats (int): Количество проходов по входам каждого бенчмарка
+        images_per_case (int): Количество фото на каждый бенчмарк по фото
+        face_image (str or None): Путь к реальному фото с лицом
+
+    Returns:
+        dict: Метаданные запуска и результаты по каждому бенчмарку
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = build_cases(Path(tmp_dir), groups, quick, images_per_case, face_image)
+        for name, func, inputs in cases:
+            results[name] = measure(func, inputs, repeats=repeats)
+            latency = results[name]["latency_ms"]
+            print(
+                f"[INFO] {name:<52} p50 {latency['p50']:9.2f} ms  p99 {latency['p99']:9.2f} ms  "
+                f"{results[name]['throughput_per_s']:9.1f}/s  peak {results[name]['peak_memory_mb']:8.1f} MB"
+            )
+
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "quick": quick,
+            "repeats": repeats,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Набор микробенчмарков стадий пайплайна")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, default=list(GROUPS),
+                        help="Группы бенчмарков для запуска")
+    parser.add_argument("--quick", action="store_true", help="Сокращенный набор входных данных")
+    parser.add_argument("--repeats", type=int, default=3, help="Количество проходов по входам")
+    parser.add_argument("--images", type=int, default=5, help="Количество фото на бенчмарк")
+    parser.add_argument("--face-image", help="Реальное фото с лицом для бенчмарка обрезки")
+    parser.add_argument("--output", help="Путь для сохранения результатов в JSON")
+    args = parser.parse_args()
+
+    try:
+        report = run_suite(args.only, args.quick, args.repeats, args.images, args.face_image)
+    finally:
+        shutdown_face_detection_engine()
+
+    if args.output:
+        output_path = Path(args.output)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[INFO] Results saved to: {output_path}")
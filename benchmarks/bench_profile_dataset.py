@@ -0,0 +1,119 @@
+"""
+Бенчмарк датасета анкет (ProfileDataset) против группировки строк pandas.
+
+Генерирует синтетический result.json, строит по нему датасет с одной
+строкой на фото и компактный датасет анкет и сравнивает:
+    - время построения и размер в памяти;
+    - размер файла (CSV против .npz) и время загрузки;
+    - время получения фото и метки каждой анкеты (groupby против срезов по смещениям).
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_profile_dataset --profiles 100000
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from benchmarks.bench_pipeline_suite import generate_dv_export
+from src.Dataset.dataset_builder.dv_dataset_builder import DatasetBuilder
+from src.Dataset.dataset_builder.profile_dataset import ProfileDataset
+
+
+def timed(func):
+    """
+    Выполняет функцию и возвращает ее результат и время выполнения.
+
+    Returns:
+        tuple: (результат, время в секундах)
+    """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def iterate_groupby(df):
+    """
+    Перебирает анкеты через groupby: пути к фото и метку каждой анкеты.
+
+    Returns:
+        int: Количество фото (чтобы перебор не был пропущен)
+    """
+    total = 0
+    for _, group in df.groupby("profile_id", sort=False):
+        total += len(group["image_path"].tolist()) + int(group["profile_liked"].iloc[0])
+    return total
+
+
+def iterate_profiles(dataset):
+    """
+    Перебирает анкеты через срезы по смещениям: пути к фото и метку каждой анкеты.
+
+    Returns:
+        int: Количество фото
+    """
+    total = 0
+    for profile in range(len(dataset)):
+        total += len(dataset.photos(profile)) + int(dataset.labels[profile])
+    return total
+
+
+def run_benchmark(profiles=100_000):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        profiles (int): Количество анкет в синтетическом экспорте
+
+    Returns:
+        dict: Время (в секундах) и размеры (в МБ) для обоих представлений
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        json_path = tmp_dir / "result.json"
+        generate_dv_export(json_path, profiles)
+        builder = DatasetBuilder(json_path)
+
+        df, build_rows = timed(builder.build_dataset)
+        dataset, build_profiles = timed(builder.build_profile_dataset)
+
+        csv_path = tmp_dir / "dataset.csv"
+        npz_path = tmp_dir / "profiles.npz"
+        df.to_csv(csv_path, index=False)
+        dataset.save(npz_path)
+
+        _, load_rows = timed(lambda: pd.read_csv(csv_path))
+        _, load_profiles = timed(lambda: ProfileDataset.load(npz_path))
+        _, iterate_rows_time = timed(lambda: iterate_groupby(df))
+        _, iterate_profiles_time = timed(lambda: iterate_profiles(dataset))
+
+        results = {
+            "rows": {
+                "build_s": build_rows, "memory_mb": df.memory_usage(deep=True).sum() / (1 << 20),
+                "file_mb": csv_path.stat().st_size / (1 << 20), "load_s": load_rows, "iterate_s": iterate_rows_time,
+            },
+            "profiles": {
+                "build_s": build_profiles,
+                "memory_mb": sum(getattr(dataset, name).nbytes for name in ProfileDataset.ARRAYS) / (1 << 20),
+                "file_mb": npz_path.stat().st_size / (1 << 20), "load_s": load_profiles,
+                "iterate_s": iterate_profiles_time,
+            },
+        }
+
+    print(f"[INFO] {len(dataset)} profiles, {dataset.num_photos} photos")
+    for name, label in (("rows", "DataFrame + groupby"), ("profiles", "ProfileDataset")):
+        r = results[name]
+        print(f"[INFO] {label:<20} build {r['build_s']:6.2f} s  memory {r['memory_mb']:7.1f} MB  "
+              f"file {r['file_mb']:7.1f} MB  load {r['load_s']:6.3f} s  iterate {r['iterate_s']:6.2f} s")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк компактного датасета анкет")
+    parser.add_argument("--profiles", type=int, default=100_000, help="Количество анкет в синтетическом экспорте")
+    args = parser.parse_args()
+
+    run_benchmark(args.profiles)
@@ -0,0 +1,139 @@
+"""
+Бенчмарк потокового чтения наперед и фоновой записи фото.
+
+Повторяет цикл стадии filter (декодирование, normalize_image, кодирование
+и запись засвеченного фото) на синтетических фото и сравнивает:
+    - последовательный цикл с cv2.imread / cv2.imwrite;
+    - тот же цикл с prefetch и BackgroundWriter из threaded_io.
+
+Задержка сетевой папки (NFS) имитируется опцией --latency-ms: перед каждым
+чтением и после каждой записи поток ждет заданное время, как при сетевых
+запросах (ожидание отпускает GIL). Выходные файлы обоих способов сравниваются
+побайтно.
+
+Запуск из корня проекта:
+    python -m benchmarks.bench_threaded_io --count 200 --latency-ms 20
+"""
+
+import argparse
+import hashlib
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+
+from benchmarks.bench_image_normalizer import generate_synthetic_images
+from src.Dataset.filter_remover.image_normalizer import normalize_image
+from src.Dataset.utils.threaded_io import IO_QUEUE_DEPTH, IO_THREADS, BackgroundWriter, prefetch, write_image
+
+
+def _read(path, latency):
+    """
+    Читает фото с имитацией задержки сетевой папки.
+    """
+    time.sleep(latency)
+    return cv2.imread(str(path))
+
+
+def _write(path, image, latency):
+    """
+    Записывает фото с имитацией задержки сетевой папки.
+    """
+    write_image(path, image)
+    time.sleep(latency)
+
+
+def run_serial(paths, out_dir, latency):
+    """
+    Последовательный цикл: чтение, нормализация и запись по одному фото.
+    """
+    for path in paths:
+        image = _read(path, latency)
+        normalized, changed = normalize_image(image)
+        if changed:
+            _write(out_dir / path.name, normalized, latency)
+
+
+def run_threaded(paths, out_dir, latency, threads, depth):
+    """
+    Тот же цикл с чтением наперед и фоновой записью.
+    """
+    with BackgroundWriter(threads, depth) as writer:
+        for path, image in prefetch(paths, lambda p: _read(p, latency), threads, depth):
+            normalized, changed = normalize_image(image)
+            if changed:
+                writer.submit(_write, out_dir / path.name, normalized, latency)
+
+
+def _digest_dir(directory):
+    """
+    Возвращает общий хэш содержимого всех файлов папки.
+    """
+    digest = hashlib.md5()
+    for path in sorted(directory.iterdir()):
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def run_benchmark(count=200, size=(1440, 1920), latency_ms=20.0, threads=IO_THREADS, depth=IO_QUEUE_DEPTH):
+    """
+    Запускает бенчмарк и печатает результаты.
+
+    Args:
+        count (int): Количество фото
+        size (tuple): Размер фото (высота, ширина)
+        latency_ms (float): Имитируемая задержка одного чтения или записи в мс
+        threads (int): Количество потоков чтения и записи
+        depth (int): Глубина очередей чтения и записи
+
+    Returns:
+        dict: Время (в секундах) последовательного и потокового циклов
+    """
+    latency = latency_ms / 1000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_dir = Path(tmp_dir)
+        src_dir, serial_dir, threaded_dir = tmp_dir / "src", tmp_dir / "serial", tmp_dir / "threaded"
+        for directory in (src_dir, serial_dir, threaded_dir):
+            directory.mkdir()
+
+        # Половина фото засвечена: их нормализатор меняет, и они записываются
+        paths = []
+        images = generate_synthetic_images(count // 2, size, bright=True) + \
+            generate_synthetic_images(count - count // 2, size)
+        for i, image in enumerate(images):
+            path = src_dir / f"photo_{i:05d}.jpg"
+            cv2.imwrite(str(path), image)
+            paths.append(path)
+        del images
+
+        start = time.perf_counter()
+        run_serial(paths, serial_dir, latency)
+        serial_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        run_threaded(paths, threaded_dir, latency, threads, depth)
+        threaded_time = time.perf_counter() - start
+
+        identical = _digest_dir(serial_dir) == _digest_dir(threaded_dir)
+
+    results = {"serial_s": serial_time, "threaded_s": threaded_time}
+    print(f"[INFO] {count} photos {size[1]}x{size[0]}, simulated latency {latency_ms:.0f} ms per read/write")
+    print(f"[INFO] serial loop    {serial_time:8.2f} s  ({1000 * serial_time / count:.1f} ms/photo)")
+    print(f"[INFO] threaded I/O   {threaded_time:8.2f} s  ({1000 * threaded_time / count:.1f} ms/photo, "
+          f"{threads} threads, depth {depth})")
+    print(f"[INFO] speedup x{serial_time / threaded_time:.2f}, outputs identical: {identical}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Бенчмарк чтения наперед и фоновой записи фото")
+    parser.add_argument("--count", type=int, default=200, help="Количество фото")
+    parser.add_argument("--latency-ms", type=float, default=20.0,
+                        help="Имитируемая задержка одного чтения или записи в мс (0 — локальный диск)")
+    parser.add_argument("--threads", type=int, default=IO_THREADS, help="Количество потоков чтения и записи")
+    parser.add_argument("--depth", type=int, default=IO_QUEUE_DEPTH, help="Глубина очередей чтения и записи")
+    args = parser.parse_args()
+
+    run_benchmark(args.count, latency_ms=args.latency_ms, threads=args.threads, depth=args.depth)
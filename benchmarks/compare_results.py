@@ -0,0 +1,89 @@
+"""
+Сравнение двух запусков набора бенчмарков.
+
+Сравнивает медианную задержку (p50) и пиковую память каждого бенчмарка,
+присутствующего в обоих файлах результатов bench_pipeline_suite, и
+завершается с кодом 1, если хотя бы один бенчмарк стал медленнее
+(или тяжелее по памяти) больше чем на заданный порог.
+
+Запуск из корня проекта:
+    python -m benchmarks.compare_results baseline.json current.json --threshold 0.10
+"""
+
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    """
+    Загружает результаты набора бенчмарков.
+
+    Args:
+        path (str): Путь к JSON-файлу результатов
+
+    Returns:
+        dict: Результаты по имени бенчмарка
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+
+def compare_results(baseline, current, threshold=0.10, memory_threshold=None):
+    """
+    Сравнивает результаты двух запусков.
+
+    Args:
+        baseline (dict): Результаты базового запуска
+        current (dict): Результаты текущего запуска
+        threshold (float): Допустимый относительный рост задержки p50 (0.10 — 10%)
+        memory_threshold (float or None): Допустимый относительный рост пиковой памяти;
+                                          None — память не проверяется
+
+    Returns:
+        list: Кортежи (имя бенчмарка, изменение p50, изменение памяти, регрессия ли это)
+    """
+    rows = []
+    for name in sorted(baseline.keys() & current.keys()):
+        base_p50 = baseline[name]["latency_ms"]["p50"]
+        cur_p50 = current[name]["latency_ms"]["p50"]
+        latency_change = cur_p50 / base_p50 - 1 if base_p50 > 0 else 0.0
+
+        base_mem = baseline[name]["peak_memory_mb"]
+        cur_mem = current[name]["peak_memory_mb"]
+        memory_change = cur_mem / base_mem - 1 if base_mem > 0 else 0.0
+
+        regression = latency_change > threshold or (
+            memory_threshold is not None and memory_change > memory_threshold
+        )
+        rows.append((name, latency_change, memory_change, regression))
+
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сравнение двух запусков набора бенчмарков")
+    parser.add_argument("baseline", help="JSON с результатами базового запуска")
+    parser.add_argument("current", help="JSON с результатами текущего запуска")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="Допустимый относительный рост задержки p50 (по умолчанию 0.10)")
+    parser.add_argument("--memory-threshold", type=float,
+                        help="Допустимый относительный рост пиковой памяти (по умолчанию не проверяется)")
+    args = parser.parse_args()
+
+    baseline = load_results(args.baseline)
+    current = load_results(args.current)
+    rows = compare_results(baseline, current, args.threshold, args.memory_threshold)
+
+    for name, latency_change, memory_change, regression in rows:
+        status = "REGRESSION" if regression else "ok"
+        print(f"[INFO] {name:<52} p50 {latency_change:+8.1%}  memory {memory_change:+8.1%}  {status}")
+
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"[WARN] Missing in current run: {name}")
+
+    regressions = [row for row in rows if row[3]]
+    if regressions:
+        print(f"[ERROR] {len(regressions)} benchmark(s) regressed beyond the threshold")
+        sys.exit(1)
+    print("[INFO] No regressions")
@@ -6,18 +6,173 @@
 до областей с лицами с помощью детектора лиц.
 """
 
-import pandas as pd
-from pathlib import Path
+from concurrent.futures import Future
+from functools import partial
 
-from src.Сonfigs.common_paths import (
-    DV_FRAMES_UNFILTERED_CSV,
-    DV_CROPPED_FACES_DIR,
-    DV_DATASET
+import numpy as np
+
+from src.Сonfigs import common_paths
+from src.Dataset.cropper.face_cropper import (
+    CROP_MARGIN, SCORE_THRESHOLD, crop_face_file, get_crop_params, get_detection_params, read_detection_preview,
 )
-from src.Dataset.cropper.face_cropper import crop_face_from_image
+from src.Dataset.detector.detection_cache import DetectionCache
+from src.Dataset.detector.face_detection_engine import MIN_DETECTION_CONFIDENCE, get_face_detection_engine
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.photo_index import PHOTO_DIRS, PhotoIndex, group_duplicate_paths, split_filenames
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.process_pool import resolve_workers, run_in_process_pool
+from src.Dataset.utils.stage_manifest import STAGE_FACE_CROPPING, file_digest, params_key
+from src.Dataset.utils.threaded_io import IO_QUEUE_DEPTH, IO_THREADS, JPEG_QUALITY, BackgroundWriter, prefetch
+
+
+# Максимальное количество фото в одной задаче воркера
+BATCH_SIZE = 64
+
+
+def _resolve_source_paths(image_paths):
+    """
+    Определяет пути к исходным изображениям для колонки image_path из датасета.
+
+    Путь с префиксом ищется только в папке этого префикса, путь без префикса —
+    в photos/, photos_extracted/ и photos_unfiltered/ по порядку. Папки
+    перечисляются один раз, а вся колонка разрешается векторно.
+
+    Args:
+        image_paths (pd.Series): Колонка image_path (photos/..., photos_extracted/...,
+                                 photos_unfiltered/... или без префикса)
+
+    Returns:
+        tuple: (PhotoIndex, pd.DataFrame с колонками "clean_rel_path", "source_dir", "found")
+    """
+    index = PhotoIndex(common_paths.DV_DATASET, PHOTO_DIRS)
+    resolved = index.resolve(image_paths, prefixes=PHOTO_DIRS, search_order=PHOTO_DIRS, prefix_selects_dir=True)
+    return index, resolved
+
+
+def _split_batches(tasks, workers):
+    """
+    Делит задачи на пачки для воркеров.
+
+    В одном процессе пачки максимальные, чтобы чтение наперед не прерывалось;
+    в пуле процессов на каждый воркер приходится несколько пачек.
+
+    Args:
+        tasks (list): Задачи обрезки
+        workers (int or None): Количество процессов
+
+    Returns:
+        list: Пачки задач не длиннее BATCH_SIZE
+    """
+    workers = resolve_workers(workers)
+    batch_size = BATCH_SIZE
+    if workers > 1:
+        batch_size = max(1, min(BATCH_SIZE, -(-len(tasks) // (workers * 4))))
+    return [tasks[start:start + batch_size] for start in range(0, len(tasks), batch_size)]
+
+
+def _init_crop_worker(min_detection_confidence, detector_backend):
+    """
+    Инициализирует процесс-воркер: заранее загружает собственный детектор лиц.
+
+    Детектор создается с порогом и бэкендом стадии, иначе первая задача
+    воркера закрыла бы его и загрузила модель заново.
+
+    Args:
+        min_detection_confidence (float): Минимальная уверенность детектора лиц
+        detector_backend (str): Бэкенд детекции лиц
+    """
+    get_face_detection_engine(min_detection_confidence, detector_backend)
+
+
+def _read_crop_preview(item):
+    """
+    Декодирует уменьшенную копию фото для детекции (выполняется в потоке чтения).
+
+    Фото с рамками из кэша детекций не читаются: полное фото для них
+    декодируется в потоке записи, и только если лицо выбрано.
+
+    Args:
+        item (tuple): Элемент пачки (см. _crop_batch_task)
+
+    Returns:
+        tuple or None: Результат read_detection_preview или None для фото из кэша
+    """
+    src_path, _, crop_params, cached = item
+    if cached is not None:
+        return None
+    return read_detection_preview(src_path, crop_params["preview_min_side"])
+
+
+def _crop_batch_task(task):
+    """
+    Обрезает пачку изображений до лиц (выполняется в воркере).
+
+    Копии следующих фото читаются наперед в потоках, пока текущее фото
+    проходит детекцию, а декодирование полного фото, вырезание лица и запись
+    выполняются в пуле потоков записи. Результаты возвращаются в порядке пачки
+    после завершения всей записи.
+
+    Если рамки лиц для фото уже есть в кэше детекций, детектор не запускается:
+    лицо выбирается по сохраненным рамкам, и остается только вырезать пиксели.
+
+    Args:
+        task (tuple): (элементы пачки (путь к исходному изображению, путь для сохранения,
+                       параметры обрезки из get_crop_params, (рамки, (высота, ширина) фото)
+                       из кэша детекций или None),
+                       количество потоков чтения и записи, глубина очередей, качество JPEG)
+
+    Returns:
+        list: Для каждого элемента (True, если лицо найдено и обрезанное фото сохранено,
+              новые рамки для кэша или None, если детектор не запускался или фото не читается,
+              (высота, ширина) фото или None)
+    """
+    items, io_threads, io_depth, jpeg_quality = task
+    metrics = get_metrics()
+
+    results = []
+    with BackgroundWriter(io_threads, io_depth) as writer:
+        for (src_path, dst_path, crop_params, cached), preview in prefetch(items, _read_crop_preview,
+                                                                           io_threads, io_depth):
+            detections, image_shape = cached or (None, None)
+            if cached is not None:
+                metrics.inc("crop.cached_detections")
+
+            with metrics.timer("crop.image"):
+                try:
+                    results.append(crop_face_file(src_path, dst_path, jpeg_quality=jpeg_quality,
+                                                  detections=detections, image_shape=image_shape,
+                                                  preview=preview, writer=writer, **crop_params))
+                except Exception as e:
+                    print(f"[ERROR] Cropping failed: {e}")
+                    results.append((False, None, None))
+
+    # Запись завершена: подставляем итоговые флаги сохранения
+    return [(saved.result() if isinstance(saved, Future) else saved, detections, image_shape)
+            for saved, detections, image_shape in results]
+
+
+def open_detection_cache(crop_params):
+    """
+    Открывает кэш детекций пайплайна с параметрами детектора из crop_params.
+
+    Для каждого набора параметров детектора (бэкенд, модель, уверенность) ведется
+    отдельный кэш в подпапке DV_DETECTIONS_DIR с хэшем параметров, поэтому запуск
+    с другим детектором не стирает рамки, найденные прежним.
+
+    Args:
+        crop_params (dict): Параметры обрезки из get_crop_params
+
+    Returns:
+        DetectionCache: Кэш в DV_DETECTIONS_DIR/<хэш параметров детектора>
+    """
+    params = get_detection_params(crop_params)
+    return DetectionCache(common_paths.DV_DETECTIONS_DIR / params_key(params), params)
 
 
-def process_dataset_with_face_cropping():
+def process_dataset_with_face_cropping(workers=1, min_size=80, score_threshold=SCORE_THRESHOLD,
+                                       min_detection_confidence=MIN_DETECTION_CONFIDENCE, margin=CROP_MARGIN,
+                                       io_threads=IO_THREADS, io_depth=IO_QUEUE_DEPTH, jpeg_quality=JPEG_QUALITY,
+                                       detector_backend=None, manifest=None):
     """
     Обрабатывает датасет: обрезает фото до лиц.
 
@@ -35,78 +190,135 @@ def process_dataset_with_face_cropping():
     Процесс:
     1. Создает директорию для обрезанных изображений
     2. Читает CSV-файл с необработанными изображениями
-    3. Для каждой строки датасета:
-       - определяет правильный путь к исходному изображению
+    3. Определяет пути ко всем исходным изображениям по индексу папок (один листинг на папку)
+    4. Для каждого уникального найденного изображения (дубликаты обрабатываются один раз):
        - обрезает изображение до области с лицом
        - сохраняет обрезанное изображение
-       - добавляет строку в выходной датасет (если лицо найдено)
-    4. Сохраняет обновленный датасет в CSV-файл
+    5. Оставляет в датасете строки, для которых лицо найдено, и сохраняет его в CSV-файл
+
+    При workers > 1 шаг 4 выполняется в пуле процессов: строки делятся на пачки,
+    каждый воркер держит собственный детектор, а результаты возвращаются в исходном
+    порядке, поэтому итоговый CSV совпадает с последовательным запуском.
+    Внутри пачки чтение и запись фото вынесены в потоки (см. threaded_io):
+    копии следующих io_depth фото декодируются наперед, пока детектор занят
+    текущим фото, а полное декодирование, вырезание и запись кропов идут в фоне.
+
+    Если передан манифест стадий, фото с неизменившимся содержимым и параметрами
+    обрезки повторно не обрабатываются: результат берется из манифеста.
+
+    Рамки лиц всех обработанных фото сохраняются в кэш детекций (см. open_detection_cache)
+    по хэшу содержимого. При запуске с другими min_size, score_threshold или margin
+    детектор для этих фото не запускается: лицо выбирается по сохраненным рамкам.
+
+    Args:
+        workers (int or None): Количество процессов для обрезки (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        min_size (int): Минимальный размер стороны обрезанного лица (по умолчанию 80)
+        score_threshold (float): Минимальная уверенность лучшего лица (по умолчанию SCORE_THRESHOLD)
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        margin (float): Отступ вокруг рамки лица в долях ее размера (по умолчанию CROP_MARGIN)
+        io_threads (int): Количество потоков чтения и записи в каждом процессе (0 — последовательно)
+        io_depth (int): Максимальное количество фото в очереди чтения и в очереди записи
+        jpeg_quality (int): Качество JPEG обрезанных фото (по умолчанию JPEG_QUALITY)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+        manifest (StageManifest or None): Манифест стадий для инкрементальных перезапусков
     """
     # Создаем директорию для обрезанных лиц
-    DV_CROPPED_FACES_DIR.mkdir(parents=True, exist_ok=True)
+    common_paths.DV_CROPPED_FACES_DIR.mkdir(parents=True, exist_ok=True)
 
     # Читаем исходный датасет
-    df = pd.read_csv(DV_FRAMES_UNFILTERED_CSV)
+    df = read_dataset(common_paths.DV_FRAMES_UNFILTERED_CSV)
 
     # Проверяем наличие обязательной колонки
     if "image_path" not in df.columns:
         raise ValueError("CSV must contain 'image_path' column.")
 
-    kept_rows = []
-
-    # Обрабатываем каждую строку датасета
-    for _, row in df.iterrows():
-        rel_path = row["image_path"]
-        clean_rel_path = rel_path
-        base_dir = None
-
-        # Определяем базовую директорию в зависимости от префикса пути
-        if rel_path.startswith("photos_unfiltered/"):
-            clean_rel_path = rel_path[len("photos_unfiltered/"):]
-            base_dir = DV_DATASET / "photos_unfiltered"
-        elif rel_path.startswith("photos_extracted/"):
-            clean_rel_path = rel_path[len("photos_extracted/"):]
-            base_dir = DV_DATASET / "photos_extracted"
-        elif rel_path.startswith("photos/"):
-            clean_rel_path = rel_path[len("photos/"):]
-            base_dir = DV_DATASET / "photos"
+    metrics = get_metrics()
+    crop_params = get_crop_params(min_size, score_threshold, min_detection_confidence, margin=margin,
+                                  detector_backend=detector_backend)
+    # Параметры детекции входят в ключ манифеста: смена модели или оценки рамок меняет результат
+    output_params = {**crop_params, **get_detection_params(crop_params), "jpeg_quality": jpeg_quality}
+    detection_cache = open_detection_cache(crop_params)
+
+    # Определяем исходные пути ко всем изображениям сразу; ненайденные строки пропускаются
+    index, resolved = _resolve_source_paths(df["image_path"])
+    found_mask = resolved["found"].to_numpy()
+    metrics.inc("crop.missing", int((~found_mask).sum()))
+
+    # Генерируем новые имена файлов для обрезанных изображений
+    found = resolved[found_mask]
+    stems, suffixes = split_filenames(found["clean_rel_path"])
+    new_filenames = (stems + "_cropped" + suffixes).to_numpy()
+    src_paths = index.source_paths(found)
+
+    # Строки с одним и тем же исходным файлом (дубликаты после дедупликации)
+    # обрезаются один раз, результат копируется на всю группу
+    first_positions, groups = group_duplicate_paths(src_paths)
+    metrics.inc("crop.duplicate", len(src_paths) - len(first_positions))
+    src_paths = [src_paths[i] for i in first_positions]
+    dst_paths = [common_paths.DV_CROPPED_FACES_DIR / new_filenames[i] for i in first_positions]
+
+    # Если фото уже обрезалось с теми же параметрами, берем результат из манифеста
+    keys = [None] * len(src_paths)
+    cached = [None] * len(src_paths)
+    if manifest is not None:
+        for i, (src_path, dst_path) in enumerate(zip(src_paths, dst_paths)):
+            keys[i] = manifest.entry_key(src_path, output_params, dst_path)
+            cached[i] = manifest.lookup(STAGE_FACE_CROPPING, keys[i])
+
+    # Для остальных фото берем рамки лиц из кэша детекций по хэшу содержимого
+    pending = [i for i, result in enumerate(cached) if result is None]
+    content_hashes = {
+        i: manifest.file_hash(src_paths[i]) if manifest is not None else file_digest(src_paths[i])
+        for i in pending
+    }
+    tasks = [
+        (src_paths[i], str(dst_paths[i]), crop_params, detection_cache.get(content_hashes[i]))
+        for i in pending
+    ]
+
+    success = np.zeros(len(src_paths), dtype=bool)
+    reused = 0
+
+    # Обрезаем изображения до области с лицом пачками (последовательно или в пуле процессов)
+    batches = [(batch, io_threads, io_depth, jpeg_quality) for batch in _split_batches(tasks, workers)]
+    initializer = partial(_init_crop_worker, crop_params["min_detection_confidence"], crop_params["detector_backend"])
+    batch_results = run_in_process_pool(_crop_batch_task, batches, workers=workers, chunksize=1,
+                                        initializer=initializer)
+    results = (result for batch in batch_results for result in batch)
+    for i, (key, dst_path, result) in enumerate(zip(keys, dst_paths, cached)):
+        if result is None:
+            result, detections, image_shape = next(results)
+            if detections is not None:
+                detection_cache.append(content_hashes[i], detections, image_shape)
+            if manifest is not None:
+                manifest.record(STAGE_FACE_CROPPING, key, result, [dst_path] if result else [])
         else:
-            # Если префикс не определен, пробуем все возможные директории
-            for candidate_name in ["photos", "photos_extracted", "photos_unfiltered"]:
-                candidate_path = DV_DATASET / candidate_name / rel_path
-                if candidate_path.exists():
-                    base_dir = DV_DATASET / candidate_name
-                    clean_rel_path = rel_path
-                    break
-            if base_dir is None:
-                continue
-
-        # Формируем полный путь к исходному изображению
-        src_path = base_dir / clean_rel_path
-        if not src_path.exists():
-            continue
-
-        # Генерируем новое имя файла для обрезанного изображения
-        filename = Path(clean_rel_path).name
-        stem = Path(filename).stem
-        suffix = Path(filename).suffix
-        new_filename = f"{stem}_cropped{suffix}"
-        dst_path = DV_CROPPED_FACES_DIR / new_filename
-        
-        # Обрезаем изображение до области с лицом
-        success = crop_face_from_image(str(src_path), str(dst_path), min_size=80)
-
-        # Если лицо успешно найдено и обрезано, добавляем строку в выходной датасет
-        if success:
-            new_row = row.copy()
-            new_row["image_path"] = f"photos_cropped/{new_filename}"
-            kept_rows.append(new_row)
-    
-    # Создаем выходной датафрейм и сохраняем в CSV
-    df_out = pd.DataFrame(kept_rows)
-    output_csv = DV_FRAMES_UNFILTERED_CSV.parent / "dv_dataset_frames_cropped_filtered.csv"
-    df_out.to_csv(output_csv, index=False)
+            reused += 1
+            metrics.inc("crop.reused")
+
+        metrics.inc("crop.ok" if result else "crop.no_face")
+        success[i] = result
+
+    # Завершаем генератор результатов, чтобы сразу освободить пул процессов
+    batch_results.close()
+    detection_cache.save()
+
+    # Оставляем только строки, для которых лицо найдено и обрезано
+    success = success[groups]
+    kept_mask = np.zeros(len(df), dtype=bool)
+    kept_mask[found_mask] = success
+    df_out = df[kept_mask].copy()
+    df_out["image_path"] = "photos_cropped/" + new_filenames[success]
+
+    # Сохраняем выходной датафрейм (CSV или Parquet)
+    output_csv = write_dataset(df_out, common_paths.DV_FRAMES_CROPPED_FILTERED_CSV)
 
     print(f"[INFO] Filtered dataset saved to: {output_csv}")
     print(f"[INFO] Kept {len(df_out)} rows out of {len(df)}")
-    print(f"[INFO] Cropped faces saved to: {DV_CROPPED_FACES_DIR}")
+    print(f"[INFO] Cropped faces saved to: {common_paths.DV_CROPPED_FACES_DIR}")
+    print(f"[INFO] Detections of {len(detection_cache)} images cached in: {detection_cache.cache_dir}")
+
+    if manifest is not None:
+        manifest.save()
+        print(f"[INFO] Reused {reused} cropping results from manifest")
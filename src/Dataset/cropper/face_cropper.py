@@ -1,119 +1,434 @@
 """
-Модуль для обрезки изображений до области лица с использованием MediaPipe.
+Модуль для обрезки изображений до области лица с использованием детектора лиц.
 
 Этот модуль предоставляет функции для обнаружения лиц на изображениях
 и последующего вырезания областей с лицами. Используется для подготовки
-датасета с изображениями лиц.
+датасета с изображениями лиц. Детектор выбирается бэкендом (detector_backend:
+MediaPipe BlazeFace по умолчанию или каскады OpenCV, см. face_detection_engine).
+
+BlazeFace работает на входе 128 x 128, поэтому лица ищутся на уменьшенной
+копии фото (меньшая сторона не меньше PREVIEW_MIN_SIDE): из файла она сразу
+декодируется в уменьшенном виде, а уже декодированное фото уменьшается
+перед детекцией. Рамки переводятся в координаты полного фото, и в полном
+разрешении фото декодируется только для вырезания выбранного лица.
 """
 
 import cv2
-import mediapipe as mp
-from mediapipe.tasks.python import BaseOptions
-from mediapipe.tasks.python.vision import FaceDetectorOptions, RunningMode, FaceDetector
 
-from src.Сonfigs.common_paths import CV2_MODELS_DIR
+from src.Dataset.detector.cascade_detection_engine import CASCADE_SCORE_VERSION
+from src.Dataset.detector.face_detection_engine import (
+    DETECTOR_MEDIAPIPE, MIN_DETECTION_CONFIDENCE, get_detector_backend, get_detector_model_name,
+    get_face_detection_engine,
+)
+from src.Dataset.utils.image_decode import choose_reduction, read_preview
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.threaded_io import JPEG_QUALITY, write_image
+
+
+# Минимальная уверенность лучшего лица, при которой фото обрезается
+# (fine-tune если необходимо и в cropped-датасете много мусора (не лиц))
+SCORE_THRESHOLD = 0.6
+
+# Во сколько раз увеличивается фото для повторной детекции, если лицо не найдено
+UPSCALE_FACTOR = 2.0
+
+# Отступ вокруг рамки лица в долях ее ширины и высоты с каждой стороны
+CROP_MARGIN = 0.0
 
+# Минимальная меньшая сторона уменьшенной копии, на которой ищутся лица
+PREVIEW_MIN_SIDE = 320
 
-def crop_face_from_image(image_path: str, output_path: str, min_size=100):
+
+def get_crop_params(min_size=100, score_threshold=SCORE_THRESHOLD,
+                    min_detection_confidence=MIN_DETECTION_CONFIDENCE, upscale_factor=UPSCALE_FACTOR,
+                    margin=CROP_MARGIN, preview_min_side=PREVIEW_MIN_SIDE, detector_backend=None):
     """
-    Обрезает изображение до области лица и сохраняет результат.
+    Возвращает параметры обрезки, от которых зависит ее результат.
 
-    Функция использует MediaPipe BlazeFace для обнаружения лица на изображении,
-    затем вырезает область лица и сохраняет в указанный файл. Если лицо не найдено
-    или размер области меньше минимального, функция возвращает False.
+    Словарь можно передать в crop_face_from_image/crop_face_from_array как **kwargs;
+    также он используется как часть ключа в манифесте стадий.
 
     Args:
-        image_path (str): Путь к входному изображению
-        output_path (str): Путь для сохранения обрезанного изображения
+        min_size (int): Минимальный размер стороны обрезанного изображения
+        score_threshold (float): Минимальная уверенность лучшего лица
+        min_detection_confidence (float): Минимальная уверенность детектора
+        upscale_factor (float): Увеличение фото для повторной детекции
+        margin (float): Отступ вокруг рамки лица в долях ее размера
+        preview_min_side (int): Минимальная меньшая сторона копии фото для детекции
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        dict: Параметры детекции и обрезки
+    """
+    return {
+        "min_size": min_size,
+        "score_threshold": score_threshold,
+        "min_detection_confidence": min_detection_confidence,
+        "upscale_factor": upscale_factor,
+        "margin": margin,
+        "preview_min_side": preview_min_side,
+        "detector_backend": get_detector_backend(detector_backend),
+    }
+
+
+def get_detection_params(crop_params):
+    """
+    Возвращает параметры, от которых зависят рамки детектора (без параметров выбора лица).
+
+    Используются как параметры кэша детекций: при изменении только min_size,
+    score_threshold или margin сохраненные рамки остаются актуальными.
+
+    Args:
+        crop_params (dict): Параметры обрезки из get_crop_params
+
+    Returns:
+        dict: Модель, минимальная уверенность детектора, увеличение для повторной детекции,
+              размер копии фото для детекции и (для каскадов) версия оценки рамок
+    """
+    params = {
+        "model": get_detector_model_name(crop_params["detector_backend"]),
+        "min_detection_confidence": crop_params["min_detection_confidence"],
+        "upscale_factor": crop_params["upscale_factor"],
+        "preview_min_side": crop_params["preview_min_side"],
+    }
+    if crop_params["detector_backend"] != DETECTOR_MEDIAPIPE:
+        # Рамки каскада, сохраненные с прежней оценкой, не переиспользуются
+        params["cascade_score"] = CASCADE_SCORE_VERSION
+    return params
+
+
+def _detect_on_preview(preview, reduction, min_detection_confidence, upscale_factor, detector_backend=None):
+    """
+    Находит лица на уменьшенной копии фото и переводит рамки в координаты полного фото.
+
+    Если лица не найдены, детекция повторяется на увеличенной копии — она в reduction
+    раз меньше полного фото, поэтому повторная попытка стоит дешево. Каскадам OpenCV
+    повторная попытка не нужна (см. upscale_retry движка).
+
+    Args:
+        preview (np.ndarray): Копия фото в BGR, уменьшенная в reduction раз
+        reduction (int): Коэффициент уменьшения копии
+        min_detection_confidence (float): Минимальная уверенность детектора
+        upscale_factor (float): Увеличение копии для повторной детекции
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        list: Рамки в координатах полного фото; 'scale' — масштаб относительно полного фото,
+              на котором найдено лицо
+    """
+    # Общий для процесса движок детекции (модель загружается один раз)
+    engine = get_face_detection_engine(min_detection_confidence, detector_backend)
+
+    # Сначала пробуем обнаружить лица на копии как есть
+    scale = 1.0 / reduction
+    detections = engine.detect([preview], scale=scale)[0]
+
+    # Если лица не найдены, увеличиваем копию и пробуем снова (если это нужно детектору)
+    if not detections and engine.upscale_retry:
+        get_metrics().inc("crop.upscale_retry")
+        scale = upscale_factor / reduction
+        scaled = cv2.resize(preview, None, fx=upscale_factor, fy=upscale_factor, interpolation=cv2.INTER_CUBIC)
+        detections = engine.detect([scaled], scale=scale)[0]
+
+    return [{**detection, "scale": scale} for detection in detections]
+
+
+def detect_faces(image, min_detection_confidence=MIN_DETECTION_CONFIDENCE, upscale_factor=UPSCALE_FACTOR,
+                 preview_min_side=PREVIEW_MIN_SIDE, detector_backend=None):
+    """
+    Находит все лица на уже декодированном изображении.
+
+    Большое изображение перед детекцией уменьшается (INTER_AREA) так, чтобы
+    меньшая сторона была не меньше preview_min_side.
+
+    Args:
+        image (np.ndarray): Изображение в формате BGR
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        upscale_factor (float): Увеличение фото для повторной детекции (по умолчанию UPSCALE_FACTOR)
+        preview_min_side (int): Минимальная меньшая сторона копии для детекции (по умолчанию PREVIEW_MIN_SIDE)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        list: Рамки с ключами 'x', 'y', 'width', 'height', 'score' в координатах исходного
+              изображения и 'scale' — масштаб, на котором найдено лицо
+
+    Raises:
+        FileNotFoundError: Если модель детектора не найдена
+    """
+    h, w = image.shape[:2]
+    reduction = choose_reduction(h, w, preview_min_side)
+    preview = image
+    if reduction > 1:
+        size = (-(-w // reduction), -(-h // reduction))
+        preview = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return _detect_on_preview(preview, reduction, min_detection_confidence, upscale_factor, detector_backend)
+
+
+def read_detection_preview(image_path, preview_min_side=PREVIEW_MIN_SIDE):
+    """
+    Декодирует уменьшенную копию фото для детекции лиц.
+
+    Отделено от детекции, чтобы копии можно было читать наперед в потоках
+    (см. threaded_io.prefetch), пока основной поток ищет лица.
+
+    Args:
+        image_path (str): Путь к фото
+        preview_min_side (int): Минимальная меньшая сторона копии для детекции (по умолчанию PREVIEW_MIN_SIDE)
+
+    Returns:
+        tuple: Результат read_preview: (копия или None, коэффициент уменьшения, (высота, ширина) полного фото или None)
+    """
+    with get_metrics().timer("crop.decode_preview"):
+        return read_preview(image_path, preview_min_side)
+
+
+def detect_faces_in_file(image_path, min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                         upscale_factor=UPSCALE_FACTOR, preview_min_side=PREVIEW_MIN_SIDE, preview=None,
+                         detector_backend=None):
+    """
+    Находит все лица на фото из файла, декодируя только уменьшенную копию.
+
+    Args:
+        image_path (str): Путь к фото
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        upscale_factor (float): Увеличение фото для повторной детекции (по умолчанию UPSCALE_FACTOR)
+        preview_min_side (int): Минимальная меньшая сторона копии для детекции (по умолчанию PREVIEW_MIN_SIDE)
+        preview (tuple or None): Уже прочитанная копия (результат read_detection_preview)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        tuple: (рамки как у detect_faces или None, если фото не читается,
+                (высота, ширина) полного фото или None,
+                полное фото, если оно уже декодировано (маленькие фото и не-JPEG), иначе None)
+
+    Raises:
+        FileNotFoundError: Если модель детектора не найдена
+    """
+    if preview is None:
+        preview = read_detection_preview(image_path, preview_min_side)
+    image, reduction, image_shape = preview
+    if image is None:
+        get_metrics().inc("crop.unreadable")
+        return None, None, None
+
+    detections = _detect_on_preview(image, reduction, min_detection_confidence, upscale_factor, detector_backend)
+    return detections, image_shape, image if reduction == 1 else None
+
+
+def select_face_box(detections, image_shape, min_size=100, score_threshold=SCORE_THRESHOLD, margin=CROP_MARGIN):
+    """
+    Выбирает лицо для обрезки среди найденных рамок.
+
+    Не требует пикселей изображения, поэтому по кэшу детекций можно
+    подбирать пороги, не декодируя фото.
+
+    Args:
+        detections (list): Рамки из detect_faces (или из кэша детекций)
+        image_shape (tuple): (высота, ширина, ...) изображения
         min_size (int): Минимальный размер стороны обрезанного изображения (по умолчанию 100)
+        score_threshold (float): Минимальная уверенность лучшего лица (по умолчанию SCORE_THRESHOLD)
+        margin (float): Отступ вокруг рамки лица в долях ее размера (по умолчанию CROP_MARGIN)
 
     Returns:
-        bool: True, если лицо успешно обнаружено и сохранено, иначе False
+        tuple or None: (x_min, y_min, x_max, y_max) области лица или None
+    """
+    # Если лиц нет, обрезать нечего
+    if not detections:
+        return None
+
+    h, w = image_shape[:2]
+
+    # Выбираем лицо с наибольшим показателем уверенности
+    best = max(detections, key=lambda d: d['score'])
+
+    # Проверяем минимальный порог уверенности
+    if best['score'] < score_threshold:
+        return None
+
+    # Вычисляем границы области с лицом (с отступом, если он задан)
+    pad_x = int(round(best['width'] * margin))
+    pad_y = int(round(best['height'] * margin))
+    x_min = max(0, best['x'] - pad_x)
+    y_min = max(0, best['y'] - pad_y)
+    x_max = min(w, max(0, best['x']) + best['width'] + pad_x)
+    y_max = min(h, max(0, best['y']) + best['height'] + pad_y)
+
+    # Проверяем, удовлетворяет ли размер области минимальным требованиям
+    if (x_max - x_min) < min_size or (y_max - y_min) < min_size:
+        return None
+
+    return x_min, y_min, x_max, y_max
+
+
+def crop_face_from_array(image, min_size=100, score_threshold=SCORE_THRESHOLD,
+                         min_detection_confidence=MIN_DETECTION_CONFIDENCE, upscale_factor=UPSCALE_FACTOR,
+                         margin=CROP_MARGIN, preview_min_side=PREVIEW_MIN_SIDE, detections=None,
+                         detector_backend=None):
+    """
+    Вырезает область лица из уже декодированного изображения.
+
+    Функция использует детектор лиц (по умолчанию MediaPipe BlazeFace). Если лицо не найдено,
+    уверенность ниже порога или размер области меньше минимального, возвращается None.
+
+    Args:
+        image (np.ndarray): Изображение в формате BGR
+        min_size (int): Минимальный размер стороны обрезанного изображения (по умолчанию 100)
+        score_threshold (float): Минимальная уверенность лучшего лица (по умолчанию SCORE_THRESHOLD)
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        upscale_factor (float): Увеличение фото для повторной детекции (по умолчанию UPSCALE_FACTOR)
+        margin (float): Отступ вокруг рамки лица в долях ее размера (по умолчанию CROP_MARGIN)
+        preview_min_side (int): Минимальная меньшая сторона копии для детекции (по умолчанию PREVIEW_MIN_SIDE)
+        detections (list or None): Уже найденные рамки (например, из кэша детекций);
+                                   если переданы, детектор не запускается
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        np.ndarray or None: Область изображения с лицом (view исходного массива) или None
 
     Raises:
-        FileNotFoundError: Если модель BlazeFace не найдена
+        FileNotFoundError: Если модель детектора не найдена
     """
-    # Загружаем изображение
-    image = cv2.imread(image_path)
+    try:
+        if detections is None:
+            detections = detect_faces(image, min_detection_confidence, upscale_factor, preview_min_side,
+                                      detector_backend)
+
+        box = select_face_box(detections, image.shape, min_size, score_threshold, margin)
+        if box is None:
+            return None
+
+        # Вырезаем область с лицом
+        x_min, y_min, x_max, y_max = box
+        return image[y_min:y_max, x_min:x_max]
+
+    except Exception as e:
+        print(f"[ERROR] Cropping failed: {e}")
+        return None
+
+
+def save_face_crop(image_path, output_path, box, image=None, jpeg_quality=JPEG_QUALITY):
+    """
+    Вырезает область лица из полного фото и сохраняет ее.
+
+    Args:
+        image_path (str): Путь к исходному фото (читается, если image не передан)
+        output_path (str): Путь для сохранения обрезанного фото
+        box (tuple): (x_min, y_min, x_max, y_max) области лица в координатах полного фото
+        image (np.ndarray or None): Уже декодированное полное фото
+        jpeg_quality (int): Качество JPEG обрезанного фото (по умолчанию JPEG_QUALITY)
+
+    Returns:
+        bool: True, если обрезанное фото сохранено
+    """
+    metrics = get_metrics()
+
+    # Полное фото нужно только для вырезания выбранного лица
     if image is None:
+        with metrics.timer("crop.decode"):
+            image = cv2.imread(image_path)
+        if image is None:
+            metrics.inc("crop.unreadable")
+            return False
+
+    x_min, y_min, x_max, y_max = box
+    try:
+        # Сохраняем обрезанное изображение
+        with metrics.timer("crop.encode"):
+            write_image(output_path, image[y_min:y_max, x_min:x_max], jpeg_quality)
+        return True
+
+    except Exception as e:
+        print(f"[ERROR] Cropping failed: {e}")
         return False
 
-    h, w = image.shape[:2]
 
-    # Путь к модели BlazeFace
-    model_path = CV2_MODELS_DIR / "blaze_face_short_range.tflite"
-    if not model_path.exists():
-        raise FileNotFoundError(f"Model not found: {model_path}")
-
-    def detect_on_image(img, scale=1.0):
-        """
-        Обнаруживает лица на изображении с заданным масштабом.
-
-        Args:
-            img: Изображение OpenCV
-            scale (float): Масштаб изображения для детекции
-
-        Returns:
-            list: Список обнаруженных лиц с координатами и оценками
-        """
-        mp_img = mp.Image(image_format=mp.ImageFormat.SRGB, data=cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
-        result = detector.detect(mp_img)
-        detections = []
-        for d in result.detections:
-            bbox = d.bounding_box
-            detections.append({
-                'x': int(bbox.origin_x / scale),
-                'y': int(bbox.origin_y / scale),
-                'width': int(bbox.width / scale),
-                'height': int(bbox.height / scale),
-                'score': d.categories[0].score
-            })
-        return detections
+def crop_face_file(image_path, output_path, min_size=100, score_threshold=SCORE_THRESHOLD,
+                   min_detection_confidence=MIN_DETECTION_CONFIDENCE, upscale_factor=UPSCALE_FACTOR,
+                   margin=CROP_MARGIN, preview_min_side=PREVIEW_MIN_SIDE, jpeg_quality=JPEG_QUALITY,
+                   detections=None, image_shape=None, preview=None, writer=None, detector_backend=None):
+    """
+    Обрезает фото из файла до области лица и сохраняет результат.
 
-    try:
-        # Создаем опции для детектора лиц
-        options = FaceDetectorOptions(
-            base_options=BaseOptions(model_asset_path=str(model_path)),
-            running_mode=RunningMode.IMAGE,
-            min_detection_confidence=0.5
-        )
+    Лица ищутся на уменьшенной копии (см. detect_faces_in_file), а полное фото
+    декодируется только если лицо выбрано. Если переданы рамки и размер фото
+    (например, из кэша детекций), детектор не запускается, а фото без
+    подходящего лица не декодируется вовсе.
 
-        # Создаем детектор и выполняем обнаружение
-        with FaceDetector.create_from_options(options) as detector:
-            # Сначала пробуем обнаружить лица на оригинальном изображении
-            detections = detect_on_image(image, scale=1.0)
+    Args:
+        image_path (str): Путь к входному изображению
+        output_path (str): Путь для сохранения обрезанного изображения
+        min_size (int): Минимальный размер стороны обрезанного изображения (по умолчанию 100)
+        score_threshold (float): Минимальная уверенность лучшего лица (по умолчанию SCORE_THRESHOLD)
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        upscale_factor (float): Увеличение фото для повторной детекции (по умолчанию UPSCALE_FACTOR)
+        margin (float): Отступ вокруг рамки лица в долях ее размера (по умолчанию CROP_MARGIN)
+        preview_min_side (int): Минимальная меньшая сторона копии для детекции (по умолчанию PREVIEW_MIN_SIDE)
+        jpeg_quality (int): Качество JPEG обрезанного фото (по умолчанию JPEG_QUALITY)
+        detections (list or None): Уже найденные рамки в координатах полного фото
+        image_shape (tuple or None): (высота, ширина) полного фото для переданных рамок
+        preview (tuple or None): Уже прочитанная копия для детекции (результат read_detection_preview)
+        writer (BackgroundWriter or None): Пул записи; если передан, декодирование полного фото,
+                                           вырезание и запись выполняются в нем
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
 
-            # Если лица не найдены, увеличиваем изображение и пробуем снова
-            if not detections:
-                scaled = cv2.resize(image, None, fx=2.0, fy=2.0, interpolation=cv2.INTER_CUBIC)
-                detections = detect_on_image(scaled, scale=2.0)
+    Returns:
+        tuple: (True, если лицо найдено и сохранено (при переданном writer — Future с этим флагом),
+                рамки, найденные детектором (None, если он не запускался или фото не читается),
+                (высота, ширина) полного фото или None)
 
-            # Если так и не нашли лиц, возвращаем False
-            if not detections:
-                return False
+    Raises:
+        FileNotFoundError: Если модель детектора не найдена
+    """
+    new_detections = None
+    image = None
+
+    if detections is None or image_shape is None:
+        new_detections, image_shape, image = detect_faces_in_file(
+            image_path, min_detection_confidence, upscale_factor, preview_min_side, preview, detector_backend,
+        )
+        if new_detections is None:
+            return False, None, None
+        detections = new_detections
+
+    # Выбираем лицо по рамкам, не трогая пиксели
+    box = select_face_box(detections, image_shape, min_size, score_threshold, margin)
+    if box is None:
+        return False, new_detections, image_shape
 
-            # Выбираем лицо с наибольшим показателем уверенности
-            best = max(detections, key=lambda d: d['score'])
+    if writer is not None:
+        return writer.submit(save_face_crop, image_path, output_path, box, image, jpeg_quality), \
+            new_detections, image_shape
+    return save_face_crop(image_path, output_path, box, image, jpeg_quality), new_detections, image_shape
 
-            # Проверяем минимальный порог уверенности
-            if best['score'] < 0.6:  # fine-tune если необходимо и в cropped-датасете много мусора (не лиц)
-                return False
 
-            # Вычисляем границы области с лицом
-            x_min = max(0, best['x'])
-            y_min = max(0, best['y'])
-            x_max = min(w, x_min + best['width'])
-            y_max = min(h, y_min + best['height'])
+def crop_face_from_image(image_path: str, output_path: str, min_size=100, **crop_params):
+    """
+    Обрезает изображение до области лица и сохраняет результат.
 
-            # Проверяем, удовлетворяет ли размер области минимальным требованиям
-            if (x_max - x_min) < min_size or (y_max - y_min) < min_size:
-                return False
+    Функция использует детектор лиц (по умолчанию MediaPipe BlazeFace) на уменьшенной копии
+    изображения, затем вырезает область лица из полного изображения и сохраняет
+    в указанный файл. Если лицо не найдено или размер области меньше минимального,
+    функция возвращает False.
+
+    Args:
+        image_path (str): Путь к входному изображению
+        output_path (str): Путь для сохранения обрезанного изображения
+        min_size (int): Минимальный размер стороны обрезанного изображения (по умолчанию 100)
+        **crop_params: Остальные параметры обрезки для crop_face_file (score_threshold,
+                       min_detection_confidence, upscale_factor, margin, preview_min_side, jpeg_quality,
+                       detector_backend)
 
-            # Вырезаем область с лицом и сохраняем
-            cropped = image[y_min:y_max, x_min:x_max]
-            cv2.imwrite(output_path, cropped)
-            return True
+    Returns:
+        bool: True, если лицо успешно обнаружено и сохранено, иначе False
 
+    Raises:
+        FileNotFoundError: Если модель детектора не найдена
+    """
+    try:
+        return crop_face_file(image_path, output_path, min_size=min_size, **crop_params)[0]
+    except FileNotFoundError:
+        # Без модели детектора упадёт каждое изображение, поэтому ошибка не глушится
+        raise
     except Exception as e:
         print(f"[ERROR] Cropping failed: {e}")
         return False
@@ -3,11 +3,39 @@
 
 Этот модуль предоставляет класс DatasetBuilder для парсинга JSON-файла
 экспорта чата с ботом "Дайвинчик" и создания датасета с метками лайков/дизлайков.
+В потоковом режиме сообщения читаются из файла по одному, а строки датасета
+записываются в CSV пачками, поэтому расход памяти не зависит от размера экспорта.
+Кроме датасета с одной строкой на фото строится компактный датасет анкет
+(ProfileDataset), который заполняется прямо при разборе сообщений.
+
+Инкрементальный экспорт (export_incremental) сохраняет рядом с датасетом
+состояние сборки: ID последнего разобранного сообщения, счетчик ID анкет
+и фото незакрытой анкеты. При следующем экспорте чата строки строятся
+только для более новых сообщений и дописываются в конец датасета, а ID
+анкет продолжают прежнюю нумерацию.
 """
 
 import json
+import os
+from pathlib import Path
+
 import pandas as pd
 
+from src.Dataset.dataset_builder.profile_dataset import ProfileDataset, ProfileDatasetBuilder
+from src.Dataset.utils.dataset_io import ParquetDatasetWriter, read_dataset, write_dataset
+from src.Dataset.utils.json_stream import iter_json_array
+from src.Dataset.utils.stage_manifest import STAGE_DATASET_BUILDER
+
+
+# Колонки итогового датасета
+DATASET_COLUMNS = ["profile_id", "image_path", "image_index", "profile_liked"]
+
+# Размер пачки строк при потоковой записи CSV
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Версия формата файла состояния инкрементальной сборки
+BUILDER_STATE_VERSION = 1
+
 
 class DatasetBuilder:
     """
@@ -17,15 +45,22 @@ class DatasetBuilder:
     и метки пользовательских реакций (лайк/дизлайк), формируя структурированный датасет.
     """
 
-    def __init__(self, path_to_json):
+    def __init__(self, path_to_json, streaming=False):
         """
         Инициализирует DatasetBuilder с указанным JSON-файлом.
 
         Args:
             path_to_json (str): Путь к JSON-файлу экспорта чата
+            streaming (bool): Не загружать JSON целиком, а читать сообщения
+                              потоково при каждом построении датасета (по умолчанию False)
         """
-        with open(path_to_json, "r", encoding="utf-8") as f:
-            self.data = json.load(f)
+        self.path_to_json = path_to_json
+        self.streaming = streaming
+        self.data = None
+
+        if not streaming:
+            with open(path_to_json, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
 
         # Имя бота, которое отправляет профили пользователей
         self.bot_name = "Дайвинчик | Leo – знакомства, общение и новые друзья"
@@ -33,24 +68,68 @@ class DatasetBuilder:
         # Исключения - текстовые сообщения, которые не должны обрабатываться как реакции
         self.parse_exception = {"🚀 Смотреть анкеты", "Нет", "1 🚀", "1 👍"}
 
-    def build_dataset(self):
+        # Состояние после последнего полного перебора анкет (см. iter_profiles)
+        self.resume_state = None
+
+    def _iter_messages(self):
         """
-        Строит датасет из сообщений чата.
+        Перебирает сообщения чата из загруженного JSON или потоково из файла.
 
-        Метод анализирует сообщения из JSON-файла и создает датафрейм pandas
-        с информацией о профилях и реакциях пользователя. Берутся только сообщения
-        от бота (с фотографиями профилей) и ответы пользователя (лайки/дизлайки).
+        Yields:
+            dict: Очередное сообщение
+        """
+        if self.data is not None:
+            yield from self.data["messages"]
+        else:
+            yield from iter_json_array(self.path_to_json, "messages")
+
+    def _params(self):
+        """
+        Возвращает правила разбора, от которых зависит содержимое датасета.
 
         Returns:
-            pd.DataFrame: Датафрейм с колонками ["profile_id", "image_path", "image_index", "profile_liked"],
-                          где profile_liked принимает значения 0 (дизлайк) или 1 (лайк)
+            dict: Параметры для манифеста стадий и состояния сборки
         """
-        rows = []
+        return {
+            "bot_name": self.bot_name,
+            "parse_exception": sorted(self.parse_exception),
+            "columns": DATASET_COLUMNS,
+        }
+
+    def iter_profiles(self, state=None):
+        """
+        Перебирает анкеты по мере разбора сообщений чата.
+
+        Берутся только сообщения от бота (с фотографиями профилей)
+        и ответы пользователя (лайки/дизлайки). ID получают все анкеты
+        с реакцией, в том числе анкеты без фото. После полного перебора
+        в self.resume_state сохраняется состояние, с которого можно
+        продолжить разбор более нового экспорта того же чата.
+
+        Args:
+            state (dict or None): Состояние предыдущей сборки (self.resume_state): сообщения с ID
+                                  не больше last_message_id пропускаются, ID анкет продолжаются
+                                  с next_profile_id, а незакрытая анкета дополняет фото open_photos
 
-        current_profile_photos = []  # Список фотографий текущего профиля
-        profile_id = 0  # ID профиля
+        Yields:
+            tuple: (ID анкеты, список путей к фото анкеты, метка: 1 — лайк, 0 — дизлайк)
+        """
+        state = state or {}
+        watermark = state.get("last_message_id")
+        current_profile_photos = list(state.get("open_photos", []))  # Список фотографий текущего профиля
+        profile_id = state.get("next_profile_id", 0)  # ID профиля
+        last_message_id = watermark
+        watermark_found = watermark is None
+
+        for msg in self._iter_messages():
+            msg_id = msg.get("id")
+            if msg_id is not None:
+                # Сообщения, разобранные прошлой сборкой, пропускаем
+                if watermark is not None and msg_id <= watermark:
+                    watermark_found = watermark_found or msg_id == watermark
+                    continue
+                last_message_id = msg_id if last_message_id is None else max(last_message_id, msg_id)
 
-        for msg in self.data["messages"]:
             # Обработка сообщений от бота (содержащих фотографии профилей)
             if msg.get("from") == self.bot_name:
                 if "photo" in msg:
@@ -72,33 +151,406 @@ class DatasetBuilder:
 
                 # Определяем метку: 1 для лайка, 0 для дизлайка
                 profile_liked = 1 if text == "❤️" else 0
-                final_label = profile_liked
-
-                # Добавляем каждую фотографию профиля в датасет
-                for idx, photo_path in enumerate(current_profile_photos):
-                    rows.append({
-                        "profile_id": profile_id,
-                        "image_path": photo_path,
-                        "image_index": idx,
-                        "profile_liked": final_label
-                    })
+                yield profile_id, current_profile_photos, profile_liked
 
                 profile_id += 1  # Переходим к следующему профилю
                 current_profile_photos = []  # Очищаем список фотографий
 
-        return pd.DataFrame(
-            rows,
-            columns=["profile_id", "image_path", "image_index", "profile_liked"]
-        )
+        if not watermark_found:
+            print(f"[WARN] Message {watermark} from the previous build is not in the export, "
+                  f"appending messages newer than it")
+
+        self.resume_state = {
+            "last_message_id": last_message_id,
+            "next_profile_id": profile_id,
+            "open_photos": current_profile_photos,
+        }
+
+    @staticmethod
+    def _profile_rows(profile_id, photo_paths, profile_liked):
+        """
+        Возвращает строки датасета для одной анкеты.
+
+        Returns:
+            list: Строки с ключами "profile_id", "image_path", "image_index", "profile_liked"
+        """
+        return [
+            {
+                "profile_id": profile_id,
+                "image_path": photo_path,
+                "image_index": idx,
+                "profile_liked": profile_liked
+            }
+            for idx, photo_path in enumerate(photo_paths)
+        ]
+
+    def iter_rows(self):
+        """
+        Перебирает строки датасета по мере разбора сообщений чата.
 
-    def export_to_csv(self, output_path="files/processed/dv_dataset_raw.csv"):
+        Yields:
+            dict: Строка датасета с ключами "profile_id", "image_path", "image_index", "profile_liked"
+        """
+        for profile_id, photo_paths, profile_liked in self.iter_profiles():
+            # Добавляем каждую фотографию профиля в датасет
+            yield from self._profile_rows(profile_id, photo_paths, profile_liked)
+
+    def build_profile_dataset(self):
+        """
+        Строит компактный датасет анкет прямо при разборе сообщений.
+
+        Анкеты без фото в датасет не попадают (как и в датасет с одной строкой на фото),
+        поэтому сквозные номера фото совпадают с номерами строк build_dataset().
+
+        Returns:
+            ProfileDataset: Датасет анкет
+        """
+        builder = ProfileDatasetBuilder()
+        for profile_id, photo_paths, profile_liked in self.iter_profiles():
+            if photo_paths:
+                builder.add_profile(photo_paths, profile_liked, profile_id)
+        return builder.build()
+
+    def build_dataset(self):
+        """
+        Строит датасет из сообщений чата.
+
+        Метод анализирует сообщения из JSON-файла и создает датафрейм pandas
+        с информацией о профилях и реакциях пользователя. Берутся только сообщения
+        от бота (с фотографиями профилей) и ответы пользователя (лайки/дизлайки).
+
+        Returns:
+            pd.DataFrame: Датафрейм с колонками ["profile_id", "image_path", "image_index", "profile_liked"],
+                          где profile_liked принимает значения 0 (дизлайк) или 1 (лайк)
+        """
+        return pd.DataFrame(list(self.iter_rows()), columns=DATASET_COLUMNS)
+
+    def iter_dataset_chunks(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """
+        Перебирает датасет пачками ограниченного размера.
+
+        Args:
+            chunk_size (int): Максимальное количество строк в пачке
+
+        Yields:
+            pd.DataFrame: Очередная пачка строк с колонками DATASET_COLUMNS
+        """
+        rows = []
+        for row in self.iter_rows():
+            rows.append(row)
+            if len(rows) >= chunk_size:
+                yield pd.DataFrame(rows, columns=DATASET_COLUMNS)
+                rows = []
+
+        if rows:
+            yield pd.DataFrame(rows, columns=DATASET_COLUMNS)
+
+    def export_to_csv(self, output_path="files/processed/dv_dataset_raw.csv", chunk_size=None, manifest=None):
         """
         Экспортирует построенный датасет в CSV-файл.
 
         Метод вызывает build_dataset() и сохраняет результат в указанный CSV-файл.
+        В потоковом режиме (или если задан chunk_size) датасет целиком не строится:
+        строки пишутся в файл пачками по мере разбора сообщений, а содержимое
+        файла совпадает с обычным экспортом.
 
         Args:
             output_path (str): Путь для сохранения CSV-файла (по умолчанию "files/processed/dv_dataset_raw.csv")
+            chunk_size (int or None): Размер пачки строк при потоковой записи
+                                      (по умолчанию DEFAULT_CHUNK_SIZE в потоковом режиме)
+            manifest (StageManifest or None): Манифест стадий; если JSON-файл и правила разбора
+                                              не изменились и CSV существует, экспорт пропускается
         """
-        df = self.build_dataset()
-        df.to_csv(output_path, index=False, encoding="utf-8")
+        self._export(output_path, lambda: self._write_csv(output_path, chunk_size), manifest)
+
+    def export_to_parquet(self, output_path="files/processed/dv_dataset_raw.parquet", chunk_size=None, manifest=None):
+        """
+        Экспортирует построенный датасет в файл Parquet с компактной схемой.
+
+        Колонки profile_id и image_index хранятся как int32, profile_liked — как int8,
+        а image_path — со словарным кодированием (см. dataset_io.get_arrow_schema).
+        В потоковом режиме (или если задан chunk_size) строки пишутся пачками
+        по мере разбора сообщений. Требует пакет pyarrow.
+
+        Args:
+            output_path (str): Путь для сохранения файла Parquet
+            chunk_size (int or None): Размер пачки строк при потоковой записи
+                                      (по умолчанию DEFAULT_CHUNK_SIZE в потоковом режиме)
+            manifest (StageManifest or None): Манифест стадий; если JSON-файл и правила разбора
+                                              не изменились и файл существует, экспорт пропускается
+        """
+        self._export(output_path, lambda: self._write_parquet(output_path, chunk_size), manifest)
+
+    def export_profiles(self, output_path="files/processed/dv_profiles.npz", manifest=None):
+        """
+        Экспортирует компактный датасет анкет в .npz (см. ProfileDataset).
+
+        Args:
+            output_path (str): Путь для сохранения файла .npz
+            manifest (StageManifest or None): Манифест стадий; если JSON-файл и правила разбора
+                                              не изменились и файл существует, экспорт пропускается
+        """
+        self._export(output_path, lambda: self.build_profile_dataset().save(output_path), manifest)
+
+    def export_with_profiles(self, output_path, profiles_path, chunk_size=DEFAULT_CHUNK_SIZE, manifest=None):
+        """
+        Экспортирует датасет и датасет анкет за один проход по сообщениям.
+
+        Дает те же файлы, что export_to_csv (или export_to_parquet) и export_profiles,
+        но JSON разбирается один раз, а строки пишутся пачками. Формат датасета
+        (CSV или Parquet) определяется по расширению output_path.
+
+        Args:
+            output_path (str or Path): Путь к датасету с одной строкой на фото
+            profiles_path (str or Path): Путь к датасету анкет (.npz)
+            chunk_size (int): Размер пачки строк при записи
+            manifest (StageManifest or None): Манифест стадий; если JSON-файл и правила разбора
+                                              не изменились и датасеты существуют, экспорт пропускается
+        """
+        self._export(
+            output_path,
+            lambda: self._write_with_profiles(Path(output_path), Path(profiles_path), chunk_size),
+            manifest,
+            outputs=[output_path, profiles_path],
+        )
+
+    def export_incremental(self, output_path, state_path, profiles_path, chunk_size=DEFAULT_CHUNK_SIZE,
+                           manifest=None):
+        """
+        Дописывает в датасет и датасет анкет только сообщения новее прошлой сборки.
+
+        Строки и анкеты строятся за один проход по сообщениям; ID анкет продолжают
+        нумерацию прошлой сборки, поэтому итоговые файлы совпадают с полным экспортом
+        того же чата. Если состояния нет, оно не подходит к файлам (другие правила
+        разбора, файлы удалены или изменены) или прошлая запись оборвалась, датасет
+        строится заново с первого сообщения. Формат датасета (CSV или Parquet)
+        определяется по расширению output_path; Parquet дописывается перезаписью файла.
+
+        Args:
+            output_path (str or Path): Путь к датасету с одной строкой на фото
+            state_path (str or Path): Путь к файлу состояния сборки (.json)
+            profiles_path (str or Path): Путь к датасету анкет (.npz)
+            chunk_size (int): Размер пачки строк при записи
+            manifest (StageManifest or None): Манифест стадий; если JSON-файл и правила разбора
+                                              не изменились и датасеты существуют, экспорт пропускается
+        """
+        self._export(
+            output_path,
+            lambda: self._write_incremental(Path(output_path), Path(state_path), Path(profiles_path), chunk_size),
+            manifest,
+            outputs=[output_path, profiles_path, state_path],
+        )
+
+    def _export(self, output_path, write, manifest, outputs=None):
+        """
+        Выполняет экспорт с учетом манифеста стадий.
+
+        Args:
+            output_path (str): Путь к итоговому файлу
+            write (callable): Функция, записывающая датасет
+            manifest (StageManifest or None): Манифест стадий
+            outputs (list or None): Все файлы экспорта (по умолчанию только output_path)
+        """
+        key = None
+        if manifest is not None:
+            key = manifest.entry_key(self.path_to_json, self._params(), output_path)
+            if manifest.lookup(STAGE_DATASET_BUILDER, key) is not None:
+                print(f"[INFO] Dataset is up to date, skipping export: {output_path}")
+                return
+
+        write()
+
+        if manifest is not None:
+            manifest.record(STAGE_DATASET_BUILDER, key, True, outputs or [output_path])
+            manifest.save()
+
+    def _load_state(self, state_path, output_path, profiles_path):
+        """
+        Загружает состояние прошлой сборки, если по нему можно дописать датасеты.
+
+        Состояние подходит, если совпадают правила разбора и имена файлов, датасет
+        не короче записанного прошлой сборкой (недописанный хвост CSV обрезается
+        при записи), а в датасете анкет столько же анкет, сколько в состоянии.
+
+        Args:
+            state_path (Path): Путь к файлу состояния
+            output_path (Path): Путь к датасету
+            profiles_path (Path): Путь к датасету анкет
+
+        Returns:
+            tuple or None: (состояние, датасет анкет прошлой сборки) или None, если нужна полная сборка
+        """
+        if not (state_path.exists() and output_path.exists() and profiles_path.exists()):
+            return None
+
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"[WARN] Builder state is unreadable, rebuilding dataset: {e}")
+            return None
+
+        if (state.get("version") != BUILDER_STATE_VERSION or state.get("params") != self._params()
+                or state.get("dataset") != output_path.name or state.get("profiles") != profiles_path.name):
+            return None
+
+        # CSV мог остаться с недописанным хвостом; Parquet перезаписывается целиком и должен совпадать
+        size = output_path.stat().st_size
+        if size < state["dataset_bytes"] or (output_path.suffix == ".parquet" and size != state["dataset_bytes"]):
+            return None
+
+        profiles = ProfileDataset.load(profiles_path)
+        if len(profiles) != state["num_profiles"]:
+            return None
+
+        return state, profiles
+
+    def _iter_state_chunks(self, state, chunk_size, profiles):
+        """
+        Перебирает пачки строк для сообщений новее состояния и заполняет датасет анкет.
+
+        Args:
+            state (dict or None): Состояние прошлой сборки (None — с первого сообщения)
+            chunk_size (int): Максимальное количество строк в пачке
+            profiles (ProfileDatasetBuilder): Накопитель новых анкет
+
+        Yields:
+            pd.DataFrame: Очередная пачка строк с колонками DATASET_COLUMNS
+        """
+        rows = []
+        for profile_id, photo_paths, profile_liked in self.iter_profiles(state):
+            if not photo_paths:
+                continue
+            profiles.add_profile(photo_paths, profile_liked, profile_id)
+            rows.extend(self._profile_rows(profile_id, photo_paths, profile_liked))
+            if len(rows) >= chunk_size:
+                yield pd.DataFrame(rows, columns=DATASET_COLUMNS)
+                rows = []
+
+        if rows:
+            yield pd.DataFrame(rows, columns=DATASET_COLUMNS)
+
+    def _write_incremental(self, output_path, state_path, profiles_path, chunk_size):
+        """
+        Дописывает датасеты по состоянию прошлой сборки или строит их заново.
+
+        Файлы записываются в порядке датасет, датасет анкет, состояние (атомарно, последним),
+        поэтому оборванная запись обнаруживается при следующем запуске.
+
+        Args:
+            output_path (Path): Путь к датасету
+            state_path (Path): Путь к файлу состояния
+            profiles_path (Path): Путь к датасету анкет
+            chunk_size (int): Размер пачки строк при записи
+        """
+        loaded = self._load_state(state_path, output_path, profiles_path)
+        state, previous_profiles = loaded if loaded is not None else (None, None)
+        if state is None:
+            print(f"[INFO] No matching builder state, building dataset from the first message: {output_path}")
+        else:
+            print(f"[INFO] Appending messages newer than {state['last_message_id']} to: {output_path}")
+
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        new_profiles = ProfileDatasetBuilder()
+        chunks = self._iter_state_chunks(state, chunk_size, new_profiles)
+
+        if output_path.suffix == ".parquet":
+            # Parquet нельзя дописать: прошлые строки переписываются в новый файл пачкой
+            previous = read_dataset(output_path) if state is not None else None
+            with ParquetDatasetWriter(output_path, DATASET_COLUMNS) as writer:
+                if previous is not None and len(previous):
+                    writer.write(previous)
+                for chunk in chunks:
+                    writer.write(chunk)
+        else:
+            if state is None:
+                pd.DataFrame(columns=DATASET_COLUMNS).to_csv(output_path, index=False, encoding="utf-8")
+            else:
+                # Отбрасываем строки, дописанные оборванной прошлой сборкой
+                with open(output_path, "r+b") as f:
+                    f.truncate(state["dataset_bytes"])
+            for chunk in chunks:
+                chunk.to_csv(output_path, mode="a", header=False, index=False, encoding="utf-8")
+
+        profiles = new_profiles.build()
+        if previous_profiles is not None:
+            profiles = ProfileDataset.concatenate([previous_profiles, profiles])
+        profiles.save(profiles_path)
+
+        new_state = {
+            "version": BUILDER_STATE_VERSION,
+            "params": self._params(),
+            "dataset": output_path.name,
+            "dataset_bytes": output_path.stat().st_size,
+            "profiles": profiles_path.name,
+            "num_profiles": len(profiles),
+            **self.resume_state,
+        }
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(new_state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, state_path)
+
+        added = len(profiles) - (len(previous_profiles) if previous_profiles is not None else 0)
+        print(f"[INFO] Dataset has {len(profiles)} profiles with photos ({added} added), "
+              f"last message id {new_state['last_message_id']}")
+
+    def _write_with_profiles(self, output_path, profiles_path, chunk_size):
+        """
+        Записывает датасет пачками и датасет анкет, заполняемый в том же проходе.
+
+        Args:
+            output_path (Path): Путь к датасету
+            profiles_path (Path): Путь к датасету анкет
+            chunk_size (int): Размер пачки строк при записи
+        """
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        profiles = ProfileDatasetBuilder()
+        chunks = self._iter_state_chunks(None, chunk_size, profiles)
+
+        if output_path.suffix == ".parquet":
+            with ParquetDatasetWriter(output_path, DATASET_COLUMNS) as writer:
+                for chunk in chunks:
+                    writer.write(chunk)
+        else:
+            # Заголовок пишем сразу, чтобы пустой датасет давал тот же файл, что и обычный экспорт
+            pd.DataFrame(columns=DATASET_COLUMNS).to_csv(output_path, index=False, encoding="utf-8")
+            for chunk in chunks:
+                chunk.to_csv(output_path, mode="a", header=False, index=False, encoding="utf-8")
+
+        profiles.build().save(profiles_path)
+
+    def _write_csv(self, output_path, chunk_size):
+        """
+        Записывает датасет в CSV целиком или пачками.
+
+        Args:
+            output_path (str): Путь для сохранения CSV-файла
+            chunk_size (int or None): Размер пачки строк при потоковой записи
+        """
+        if chunk_size is None and not self.streaming:
+            df = self.build_dataset()
+            df.to_csv(output_path, index=False, encoding="utf-8")
+            return
+
+        # Заголовок пишем сразу, чтобы пустой датасет давал тот же файл, что и обычный экспорт
+        pd.DataFrame(columns=DATASET_COLUMNS).to_csv(output_path, index=False, encoding="utf-8")
+        for chunk in self.iter_dataset_chunks(chunk_size or DEFAULT_CHUNK_SIZE):
+            chunk.to_csv(output_path, mode="a", header=False, index=False, encoding="utf-8")
+
+    def _write_parquet(self, output_path, chunk_size):
+        """
+        Записывает датасет в Parquet целиком или пачками.
+
+        Args:
+            output_path (str): Путь для сохранения файла Parquet
+            chunk_size (int or None): Размер пачки строк при потоковой записи
+        """
+        if chunk_size is None and not self.streaming:
+            write_dataset(self.build_dataset(), output_path, "parquet")
+            return
+
+        # Пустой датасет тоже дает валидный файл со схемой
+        with ParquetDatasetWriter(output_path, DATASET_COLUMNS) as writer:
+            for chunk in self.iter_dataset_chunks(chunk_size or DEFAULT_CHUNK_SIZE):
+                writer.write(chunk)
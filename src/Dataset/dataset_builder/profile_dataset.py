@@ -0,0 +1,279 @@
+"""
+Модуль с компактным представлением датасета на уровне анкет.
+
+Вместо одной строки на фото (с повторяющейся меткой анкеты) датасет
+хранится плоскими массивами:
+    - photo_offsets: границы фото каждой анкеты, фото анкеты i — это
+      элементы photo_offsets[i]:photo_offsets[i + 1] массивов фото;
+    - labels и profile_ids: метка и ID для каждой анкеты;
+    - path_data и path_offsets: пути всех фото подряд в одном буфере UTF-8;
+    - image_indices: номер каждого фото внутри анкеты.
+
+Срез фото любой анкеты выполняется за O(1) без groupby, а весь датасет
+сохраняется в один .npz-файл.
+"""
+
+import os
+from array import array
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+class ProfileDatasetBuilder:
+    """
+    Накопитель анкет, из которого строится ProfileDataset.
+
+    Пути накапливаются сразу в байтовом буфере, а смещения, номера фото, метки
+    и ID — в типизированных буферах array тех же типов, что и массивы датасета,
+    поэтому память не тратится на отдельный Python-объект для каждой строки датасета.
+    """
+
+    def __init__(self):
+        self._path_data = bytearray()
+        self._path_offsets = array("q", [0])
+        self._photo_offsets = array("q", [0])
+        self._image_indices = array("i")
+        self._labels = array("b")
+        self._profile_ids = array("i")
+
+    def add_profile(self, photo_paths, label, profile_id=None, image_indices=None):
+        """
+        Добавляет анкету.
+
+        Args:
+            photo_paths (list): Пути к фото анкеты
+            label (int): Метка анкеты (1 — лайк, 0 — дизлайк)
+            profile_id (int or None): ID анкеты (по умолчанию — порядковый номер)
+            image_indices (list or None): Номера фото в анкете (по умолчанию 0, 1, ...)
+        """
+        for photo_path in photo_paths:
+            self._path_data += photo_path.encode("utf-8")
+            self._path_offsets.append(len(self._path_data))
+
+        self._image_indices.extend(range(len(photo_paths)) if image_indices is None else image_indices)
+        self._photo_offsets.append(self._photo_offsets[-1] + len(photo_paths))
+        self._labels.append(label)
+        self._profile_ids.append(len(self._profile_ids) if profile_id is None else profile_id)
+
+    def build(self):
+        """
+        Возвращает накопленный датасет.
+
+        Returns:
+            ProfileDataset: Датасет анкет
+        """
+        # Массивы копируются, чтобы накопитель можно было пополнять и после build()
+        return ProfileDataset(
+            photo_offsets=np.frombuffer(self._photo_offsets, dtype=np.int64).copy(),
+            labels=np.frombuffer(self._labels, dtype=np.int8).copy(),
+            profile_ids=np.frombuffer(self._profile_ids, dtype=np.int32).copy(),
+            path_data=np.frombuffer(bytes(self._path_data), dtype=np.uint8),
+            path_offsets=np.frombuffer(self._path_offsets, dtype=np.int64).copy(),
+            image_indices=np.frombuffer(self._image_indices, dtype=np.int32).copy(),
+        )
+
+
+class ProfileDataset:
+    """
+    Датасет анкет в виде плоских массивов с индексами смещений.
+    """
+
+    # Массивы, из которых состоит датасет (в таком виде они сохраняются в .npz)
+    ARRAYS = ("photo_offsets", "labels", "profile_ids", "path_data", "path_offsets", "image_indices")
+
+    def __init__(self, photo_offsets, labels, profile_ids, path_data, path_offsets, image_indices):
+        """
+        Args:
+            photo_offsets (np.ndarray): Границы фото анкет (длина — количество анкет + 1)
+            labels (np.ndarray): Метки анкет
+            profile_ids (np.ndarray): ID анкет
+            path_data (np.ndarray): Пути всех фото подряд (uint8, UTF-8)
+            path_offsets (np.ndarray): Границы путей в path_data (длина — количество фото + 1)
+            image_indices (np.ndarray): Номера фото внутри анкет
+        """
+        self.photo_offsets = photo_offsets
+        self.labels = labels
+        self.profile_ids = profile_ids
+        self.path_data = path_data
+        self.path_offsets = path_offsets
+        self.image_indices = image_indices
+
+    def __len__(self):
+        return len(self.labels)
+
+    @property
+    def num_photos(self):
+        """
+        int: Общее количество фото.
+        """
+        return int(self.photo_offsets[-1])
+
+    @property
+    def photo_counts(self):
+        """
+        np.ndarray: Количество фото в каждой анкете.
+        """
+        return np.diff(self.photo_offsets)
+
+    @property
+    def photo_labels(self):
+        """
+        np.ndarray: Метка анкеты для каждого фото (без хранения копии на диске).
+        """
+        return np.repeat(self.labels, self.photo_counts)
+
+    def photo_range(self, profile):
+        """
+        Возвращает диапазон сквозных номеров фото анкеты за O(1).
+
+        Сквозные номера совпадают с порядком строк датасета с одной строкой на фото,
+        поэтому по ним можно брать строки матрицы признаков или хранилища тензоров.
+
+        Args:
+            profile (int): Номер анкеты от 0 до len(dataset) - 1
+
+        Returns:
+            slice: Диапазон номеров фото
+        """
+        return slice(int(self.photo_offsets[profile]), int(self.photo_offsets[profile + 1]))
+
+    def photo_path(self, photo):
+        """
+        Возвращает путь к фото по сквозному номеру.
+
+        Args:
+            photo (int): Сквозной номер фото
+
+        Returns:
+            str: Путь к фото
+        """
+        start, end = self.path_offsets[photo], self.path_offsets[photo + 1]
+        return self.path_data[start:end].tobytes().decode("utf-8")
+
+    def photos(self, profile):
+        """
+        Возвращает пути к фото анкеты.
+
+        Args:
+            profile (int): Номер анкеты
+
+        Returns:
+            list: Пути к фото анкеты по порядку
+        """
+        photos = self.photo_range(profile)
+        return [self.photo_path(photo) for photo in range(photos.start, photos.stop)]
+
+    def save(self, path):
+        """
+        Атомарно сохраняет датасет в .npz.
+
+        Args:
+            path (str or Path): Путь к файлу
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_path, **{name: getattr(self, name) for name in self.ARRAYS})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Загружает датасет из .npz.
+
+        Args:
+            path (str or Path): Путь к файлу
+
+        Returns:
+            ProfileDataset: Датасет анкет
+        """
+        with np.load(path) as data:
+            return cls(**{name: data[name] for name in cls.ARRAYS})
+
+    @classmethod
+    def concatenate(cls, datasets):
+        """
+        Объединяет датасеты анкет: анкеты следующего датасета идут после анкет предыдущего.
+
+        Массивы склеиваются со сдвигом смещений, без разворачивания в строки,
+        поэтому дописывание новых анкет к большому датасету стоит O(размер массивов).
+
+        Args:
+            datasets (list): Датасеты анкет (ProfileDataset)
+
+        Returns:
+            ProfileDataset: Объединенный датасет
+        """
+        photo_offsets, path_offsets = [np.zeros(1, dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+        photo_base = path_base = 0
+        for dataset in datasets:
+            photo_offsets.append(dataset.photo_offsets[1:] + photo_base)
+            path_offsets.append(dataset.path_offsets[1:] + path_base)
+            photo_base += dataset.num_photos
+            path_base += int(dataset.path_offsets[-1])
+
+        return cls(
+            photo_offsets=np.concatenate(photo_offsets).astype(np.int64),
+            labels=np.concatenate([np.zeros(0, np.int8)] + [d.labels for d in datasets]).astype(np.int8),
+            profile_ids=np.concatenate([np.zeros(0, np.int32)] + [d.profile_ids for d in datasets]).astype(np.int32),
+            path_data=np.concatenate([np.zeros(0, np.uint8)] + [d.path_data for d in datasets]).astype(np.uint8),
+            path_offsets=np.concatenate(path_offsets).astype(np.int64),
+            # Пустой массив int32 в начале приводит к int32 и старые датасеты с image_indices int8
+            image_indices=np.concatenate([np.zeros(0, np.int32)] + [d.image_indices for d in datasets]),
+        )
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Строит датасет анкет из датасета с одной строкой на фото (например, после обрезки).
+
+        Фото анкеты должны идти подряд, как во всех датасетах пайплайна;
+        порядок анкет и фото сохраняется.
+
+        Args:
+            df (pd.DataFrame): Датасет с колонками profile_id, image_path, image_index, profile_liked
+
+        Returns:
+            ProfileDataset: Датасет анкет
+
+        Raises:
+            ValueError: Если фото одной анкеты идут не подряд или у анкеты разные метки
+        """
+        profile_ids = df["profile_id"].to_numpy()
+        starts = np.flatnonzero(np.r_[True, profile_ids[1:] != profile_ids[:-1]]) if len(df) else np.array([], int)
+        if len(np.unique(profile_ids[starts])) != len(starts):
+            raise ValueError("Photos of each profile must be contiguous in the dataset.")
+
+        labels = df["profile_liked"].to_numpy()
+        if len(df) and (labels != np.repeat(labels[starts], np.diff(np.r_[starts, len(df)]))).any():
+            raise ValueError("All photos of a profile must have the same profile_liked label.")
+
+        encoded = [path.encode("utf-8") for path in df["image_path"]]
+        path_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(path) for path in encoded], out=path_offsets[1:])
+
+        return cls(
+            photo_offsets=np.r_[starts, len(df)].astype(np.int64),
+            labels=labels[starts].astype(np.int8),
+            profile_ids=profile_ids[starts].astype(np.int32),
+            path_data=np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            path_offsets=path_offsets,
+            image_indices=df["image_index"].to_numpy().astype(np.int32),
+        )
+
+    def to_frame(self):
+        """
+        Разворачивает датасет анкет в датасет с одной строкой на фото.
+
+        Returns:
+            pd.DataFrame: Датасет с колонками profile_id, image_path, image_index, profile_liked
+        """
+        counts = self.photo_counts
+        return pd.DataFrame({
+            "profile_id": np.repeat(self.profile_ids, counts),
+            "image_path": [self.photo_path(photo) for photo in range(self.num_photos)],
+            "image_index": self.image_indices,
+            "profile_liked": np.repeat(self.labels, counts),
+        })
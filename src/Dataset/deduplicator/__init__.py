@@ -0,0 +1,2 @@
+# В этом модуле лежит дедупликатор, который по перцептивным хэшам находит
+# повторяющиеся фото анкет, чтобы дальше каждое фото обрабатывалось один раз.
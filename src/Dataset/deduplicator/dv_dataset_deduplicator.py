@@ -0,0 +1,192 @@
+"""
+Модуль для поиска повторяющихся фото в датасете кадров.
+
+В экспорте одно и то же фото часто встречается несколько раз: анкета
+показывается повторно, фото пересжато Telegram или слегка изменено.
+Стадия считает перцептивный хэш каждого фото из DV_FRAMES_CSV,
+группирует близкие по расстоянию Хэмминга хэши через индекс MultiIndexHash и
+переписывает DV_FRAMES_CSV так, что все строки группы указывают на одно
+каноническое фото. Следующие стадии обрабатывают каждый уникальный файл
+один раз и копируют результат на всю группу, а номер группы в колонке
+duplicate_group позволяет не разносить дубликаты по обучающей и
+валидационной выборкам.
+"""
+
+import numpy as np
+
+from src.Сonfigs import common_paths
+from src.Dataset.deduplicator.perceptual_hash import (
+    HAMMING_RADIUS, HASH_IMAGE_SIZE, HASH_LOW_FREQ_SIZE, MultiIndexHash, index_chunks, phash_from_file,
+)
+from src.Dataset.filter_remover.dv_dataset_filter_remover import resolve_frame_paths
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.photo_index import group_duplicate_paths
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.process_pool import run_in_process_pool
+from src.Dataset.utils.stage_manifest import STAGE_PERCEPTUAL_HASH
+
+
+# Колонка с исходным путем фото (до замены на путь канонического фото)
+SOURCE_PATH_COLUMN = "source_image_path"
+
+# Колонка с номером группы дубликатов (-1 — фото не найдено или не читается)
+GROUP_COLUMN = "duplicate_group"
+
+# Номер группы для строк без хэша
+NO_GROUP = -1
+
+
+def get_hash_params():
+    """
+    Возвращает параметры перцептивного хэша для ключей манифеста стадий.
+
+    Returns:
+        dict: Параметры, от которых зависит значение хэша
+    """
+    return {"image_size": HASH_IMAGE_SIZE, "low_freq_size": HASH_LOW_FREQ_SIZE}
+
+
+def _hash_task(src_path):
+    """
+    Считает перцептивный хэш одного фото (выполняется в воркере).
+
+    Args:
+        src_path (str): Путь к фото
+
+    Returns:
+        int or None: Хэш или None, если фото не читается
+    """
+    with get_metrics().timer("dedup.hash"):
+        return phash_from_file(src_path)
+
+
+def cluster_hashes(hashes, radius=HAMMING_RADIUS):
+    """
+    Группирует близкие хэши за один проход по индексу MultiIndexHash.
+
+    Первое фото группы становится каноническим, и только оно добавляется
+    в индекс. Каждое следующее фото ищется в индексе в радиусе radius и
+    присоединяется к ближайшему каноническому фото, а если такого нет,
+    открывает новую группу. Запрос проверяет только кандидатов с совпадающими
+    частями хэша, поэтому общее время субквадратично по числу фото.
+
+    Args:
+        hashes (list): Хэши фото (None — фото пропускается)
+        radius (int): Максимальное расстояние Хэмминга до канонического фото
+
+    Returns:
+        tuple: (np.ndarray номера группы для каждого фото (NO_GROUP для None),
+                np.ndarray номера канонического фото каждой группы)
+    """
+    groups = np.full(len(hashes), NO_GROUP, dtype=np.int32)
+    canonical = []
+    index = MultiIndexHash(index_chunks(len(hashes)))
+
+    for i, hash_value in enumerate(hashes):
+        if hash_value is None:
+            continue
+        matches = index.query(hash_value, radius)
+        if matches:
+            groups[i] = matches[0][1]
+            continue
+        groups[i] = len(canonical)
+        index.add(hash_value, len(canonical))
+        canonical.append(i)
+
+    return groups, np.asarray(canonical, dtype=np.int64)
+
+
+def process_dataset_with_deduplication(workers=1, dedup_radius=HAMMING_RADIUS, manifest=None):
+    """
+    Находит повторяющиеся фото в DV_FRAMES_CSV и связывает их с каноническими.
+
+    Процесс:
+    1. Читает датасет из DV_FRAMES_CSV (при повторном запуске — исходные пути
+       из колонки source_image_path, поэтому стадия идемпотентна)
+    2. Определяет пути ко всем фото по индексу папок (см. resolve_frame_paths)
+    3. Считает перцептивный хэш каждого уникального файла
+    4. Группирует хэши в радиусе dedup_radius (см. cluster_hashes)
+    5. Перезаписывает DV_FRAMES_CSV:
+       - source_image_path — исходный путь фото,
+       - duplicate_group — номер группы дубликатов,
+       - image_path — путь канонического фото группы
+
+    Если передан манифест стадий, хэши неизменившихся фото берутся из манифеста.
+
+    Args:
+        workers (int or None): Количество процессов для хэширования (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        dedup_radius (int): Максимальное расстояние Хэмминга между дубликатами (по умолчанию HAMMING_RADIUS)
+        manifest (StageManifest or None): Манифест стадий для инкрементальных перезапусков
+    """
+    df = read_dataset(common_paths.DV_FRAMES_CSV)
+
+    # Проверяем наличие необходимой колонки
+    if "image_path" not in df.columns:
+        raise ValueError("CSV must contain 'image_path' column.")
+
+    # При повторном запуске восстанавливаем исходные пути
+    if SOURCE_PATH_COLUMN in df.columns:
+        df["image_path"] = df[SOURCE_PATH_COLUMN]
+        df = df.drop(columns=[SOURCE_PATH_COLUMN, GROUP_COLUMN], errors="ignore")
+
+    metrics = get_metrics()
+    hash_params = get_hash_params()
+
+    # Определяем пути ко всем фото сразу
+    index, resolved = resolve_frame_paths(df["image_path"])
+    found_mask = resolved["found"].to_numpy()
+    metrics.inc("dedup.missing", int((~found_mask).sum()))
+
+    # Одинаковые файлы хэшируются один раз
+    src_paths = index.source_paths(resolved[found_mask])
+    first_positions, file_groups = group_duplicate_paths(src_paths)
+    unique_paths = [src_paths[i] for i in first_positions]
+
+    # Берем хэши неизменившихся фото из манифеста
+    keys = [None] * len(unique_paths)
+    hashes = [None] * len(unique_paths)
+    if manifest is not None:
+        for i, src_path in enumerate(unique_paths):
+            keys[i] = manifest.entry_key(src_path, hash_params)
+            hashes[i] = manifest.lookup(STAGE_PERCEPTUAL_HASH, keys[i])
+    pending = [i for i, hash_value in enumerate(hashes) if hash_value is None]
+    reused = len(unique_paths) - len(pending)
+    metrics.inc("dedup.reused", reused)
+
+    # Считаем недостающие хэши (последовательно или в пуле процессов)
+    results = run_in_process_pool(_hash_task, [unique_paths[i] for i in pending], workers=workers)
+    for i, hash_value in zip(pending, results):
+        if hash_value is None:
+            print(f"[WARNING] Failed to read image: {unique_paths[i]}")
+            metrics.inc("dedup.unreadable")
+            continue
+        hashes[i] = hash_value
+        if manifest is not None:
+            manifest.record(STAGE_PERCEPTUAL_HASH, keys[i], hash_value)
+
+    # Группируем близкие хэши
+    with metrics.timer("dedup.cluster"):
+        unique_groups, canonical = cluster_hashes(hashes, dedup_radius)
+
+    # Раздаем группы строкам и заменяем пути на пути канонических фото
+    groups = np.full(len(df), NO_GROUP, dtype=np.int32)
+    groups[found_mask] = unique_groups[file_groups]
+    image_paths = df["image_path"].to_numpy()
+    canonical_rows = np.flatnonzero(found_mask)[first_positions[canonical]]
+
+    df_out = df.copy()
+    df_out[SOURCE_PATH_COLUMN] = image_paths
+    df_out[GROUP_COLUMN] = groups
+    has_group = groups != NO_GROUP
+    df_out.loc[has_group, "image_path"] = image_paths[canonical_rows[groups[has_group]]]
+    output_path = write_dataset(df_out, common_paths.DV_FRAMES_CSV)
+
+    duplicates = int(has_group.sum()) - len(canonical)
+    metrics.inc("dedup.duplicate", duplicates)
+    print(f"[INFO] Deduplicated dataset saved to: {output_path}")
+    print(f"[INFO] Found {len(canonical)} unique images and {duplicates} duplicates in {len(df)} rows")
+
+    if manifest is not None:
+        manifest.save()
+        print(f"[INFO] Reused {reused} perceptual hashes from manifest")
@@ -0,0 +1,212 @@
+"""
+Модуль с перцептивным хэшем фото и индексом поиска по расстоянию Хэмминга.
+
+pHash — 64-битный хэш по знакам низких частот DCT уменьшенного фото
+в оттенках серого. Он почти не меняется при повторном сжатии JPEG,
+изменении размера и небольшой цветокоррекции, поэтому близкие по
+расстоянию Хэмминга хэши означают одно и то же фото.
+
+MultiIndexHash — индекс для поиска всех хэшей в радиусе r без попарного
+сравнения (multi-index hashing): хэш делится на части длиной около
+log2 от размера индекса, и кандидаты ищутся по значениям частей в малом
+радиусе. BK-дерево здесь не подходит: случайные 64-битные хэши отстоят
+друг от друга примерно на 32 бита, и запрос к дереву посещает почти все
+узлы.
+"""
+
+from itertools import combinations
+
+import cv2
+import numpy as np
+
+
+# Сторона уменьшенного фото, по которому считается DCT
+HASH_IMAGE_SIZE = 32
+
+# Сторона блока низких частот DCT (8 x 8 = 64 бита)
+HASH_LOW_FREQ_SIZE = 8
+
+# Максимальное расстояние Хэмминга между хэшами дубликатов
+HAMMING_RADIUS = 6
+
+# Количество бит в хэше
+HASH_BITS = HASH_LOW_FREQ_SIZE * HASH_LOW_FREQ_SIZE
+
+# Количество частей хэша в индексе по умолчанию (части по 16 бит)
+HASH_CHUNKS = 4
+
+
+def phash_from_array(image):
+    """
+    Считает перцептивный хэш уже декодированного фото.
+
+    Args:
+        image (np.ndarray): Фото в BGR или в оттенках серого
+
+    Returns:
+        int: 64-битный хэш
+    """
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    small = cv2.resize(image, (HASH_IMAGE_SIZE, HASH_IMAGE_SIZE), interpolation=cv2.INTER_AREA)
+    low_freq = cv2.dct(small.astype(np.float32))[:HASH_LOW_FREQ_SIZE, :HASH_LOW_FREQ_SIZE].ravel()
+
+    # Медиана без постоянной составляющей, которая отражает только общую яркость
+    bits = low_freq > np.median(low_freq[1:])
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def phash_from_file(image_path):
+    """
+    Считает перцептивный хэш фото из файла.
+
+    Фото декодируется сразу в оттенках серого с уменьшением в 4 раза:
+    для хэша по блоку 32 x 32 полное разрешение не нужно.
+
+    Args:
+        image_path (str): Путь к фото
+
+    Returns:
+        int or None: 64-битный хэш или None, если фото не читается
+    """
+    image = cv2.imread(image_path, cv2.IMREAD_REDUCED_GRAYSCALE_4)
+    if image is None or min(image.shape[:2]) < HASH_IMAGE_SIZE:
+        # Маленькие фото читаем в полном разрешении
+        image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    return phash_from_array(image)
+
+
+def hamming_distance(a, b):
+    """
+    Возвращает расстояние Хэмминга между двумя хэшами.
+
+    Args:
+        a (int): Хэш
+        b (int): Хэш
+
+    Returns:
+        int: Количество различающихся битов
+    """
+    return (a ^ b).bit_count()
+
+
+def index_chunks(size):
+    """
+    Подбирает количество частей хэша для индекса на size хэшей.
+
+    Как рекомендуют авторы multi-index hashing, части берутся длиной около
+    log2(size) бит: тогда в каждом значении части в среднем лежит около
+    одного хэша, и время запроса растет медленнее размера индекса.
+
+    Args:
+        size (int): Ожидаемое количество хэшей в индексе
+
+    Returns:
+        int: Количество частей от 2 до HASH_CHUNKS
+    """
+    if size < 2:
+        return HASH_CHUNKS
+    return int(np.clip(round(HASH_BITS / np.log2(size)), 2, HASH_CHUNKS))
+
+
+def _neighbour_masks(width, radius):
+    """
+    Возвращает все маски части хэша, в которых не больше radius единичных битов.
+
+    Args:
+        width (int): Ширина части в битах
+        radius (int): Максимальное количество перевернутых битов в части
+
+    Returns:
+        list: Маски (0 — сама часть без изменений)
+    """
+    masks = [0]
+    for bits in range(1, radius + 1):
+        masks.extend(sum(1 << bit for bit in combo) for combo in combinations(range(width), bits))
+    return masks
+
+
+class MultiIndexHash:
+    """
+    Индекс хэшей для поиска в радиусе Хэмминга (multi-index hashing).
+
+    Хэш делится на chunks частей, и для каждой части хранится словарь
+    «значение части -> номера хэшей». Если расстояние между хэшами не больше r,
+    то по принципу Дирихле хотя бы одна часть отличается не больше чем на
+    r // chunks бит. Поэтому запрос перебирает только значения частей в этом
+    малом радиусе и проверяет полное расстояние у найденных кандидатов.
+    """
+
+    def __init__(self, chunks=HASH_CHUNKS):
+        """
+        Args:
+            chunks (int): Количество частей хэша (см. index_chunks)
+        """
+        # Границы частей: ширины отличаются не больше чем на 1 бит
+        bounds = [HASH_BITS * i // chunks for i in range(chunks + 1)]
+        self._shifts = bounds[:-1]
+        self._widths = [end - start for start, end in zip(bounds, bounds[1:])]
+        self._tables = [{} for _ in range(chunks)]
+        self._hashes = []
+        self._items = []
+        self._masks = {}
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def _chunks(self, hash_value):
+        """
+        Делит хэш на части.
+        """
+        return [(hash_value >> shift) & ((1 << width) - 1) for shift, width in zip(self._shifts, self._widths)]
+
+    def add(self, hash_value, item):
+        """
+        Добавляет хэш в индекс.
+
+        Args:
+            hash_value (int): Хэш
+            item: Связанное с хэшем значение (например, номер фото)
+        """
+        position = len(self._hashes)
+        self._hashes.append(hash_value)
+        self._items.append(item)
+        for table, chunk in zip(self._tables, self._chunks(hash_value)):
+            table.setdefault(chunk, []).append(position)
+
+    def query(self, hash_value, radius=HAMMING_RADIUS):
+        """
+        Находит все хэши на расстоянии не больше radius.
+
+        Args:
+            hash_value (int): Искомый хэш
+            radius (int): Максимальное расстояние Хэмминга
+
+        Returns:
+            list: Пары (расстояние, значение), отсортированные по расстоянию,
+                  а при равном расстоянии — по порядку добавления
+        """
+        chunk_radius = radius // len(self._tables)
+        candidates = set()
+        for table, chunk, width in zip(self._tables, self._chunks(hash_value), self._widths):
+            masks = self._masks.get((width, chunk_radius))
+            if masks is None:
+                masks = self._masks[width, chunk_radius] = _neighbour_masks(width, chunk_radius)
+            for mask in masks:
+                positions = table.get(chunk ^ mask)
+                if positions:
+                    candidates.update(positions)
+
+        # Расстояние считается без вызова hamming_distance: это самый частый шаг запроса
+        hashes = self._hashes
+        matches = []
+        for position in sorted(candidates):
+            distance = (hash_value ^ hashes[position]).bit_count()
+            if distance <= radius:
+                matches.append((distance, self._items[position]))
+
+        matches.sort(key=lambda match: match[0])
+        return matches
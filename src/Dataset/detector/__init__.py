@@ -0,0 +1,2 @@
+# В этом модуле лежит общий движок детекции лиц, который переиспользуется
+# кроппером и обработчиком видео в рамках одного процесса.
@@ -0,0 +1,181 @@
+"""
+Модуль с движком детекции лиц на каскадах OpenCV (Haar и LBP).
+
+Каскады работают на полутоновом изображении и не требуют MediaPipe, поэтому
+на потоке фото они дешевле BlazeFace, но хуже находят повернутые и мелкие лица.
+Движок повторяет интерфейс FaceDetectionEngine: detect() возвращает рамки
+в том же формате, а режим VIDEO и временные метки принимаются для
+совместимости и ни на что не влияют (каскады не хранят состояние между кадрами).
+
+Каскад не дает вероятности лица. Вместо нее используется количество соседних
+срабатываний n, подтвердивших рамку. detectMultiScale2 возвращает только рамки
+с n > CASCADE_MIN_NEIGHBORS, поэтому оценка считается по числу подтверждений
+сверх минимума k = n - CASCADE_MIN_NEIGHBORS: score = k / (k + 1). Самая слабая
+возвращенная рамка (k = 1) получает 0.5, следующие — 0.67, 0.75 и т.д. ближе к 1.
+Пороги сравниваются с этой оценкой так же, как с вероятностью BlazeFace:
+min_detection_confidence = 0.5 пропускает все рамки каскада, а порог выбора лица
+score_threshold = 0.6 отбрасывает рамки с k = 1, как и слабые рамки BlazeFace.
+
+Время каскада растет с размером изображения, поэтому изображение перед
+детекцией уменьшается до CASCADE_MAX_SIDE по большей стороне. Повторная
+детекция на увеличенном фото (как для BlazeFace) каскаду не нужна: пирамида
+масштабов и так доходит до лиц размером CASCADE_MIN_FACE_SIZE.
+"""
+
+import os
+import threading
+from pathlib import Path
+
+import cv2
+
+from src.Сonfigs.common_paths import CV2_MODELS_DIR
+from src.Dataset.detector.face_detection_engine import DETECTOR_HAAR, DETECTOR_LBP, RunningMode
+from src.Dataset.utils.pipeline_metrics import get_metrics
+
+
+# Файлы каскадов для бэкендов. Каскады Haar входят в opencv-python (cv2.data),
+# каскад LBP нужно положить в CV2_MODELS_DIR (его нет в пакетах opencv-python)
+CASCADE_MODELS = {
+    DETECTOR_HAAR: "haarcascade_frontalface_default.xml",
+    DETECTOR_LBP: "lbpcascade_frontalface_improved.xml",
+}
+
+# Шаг пирамиды масштабов каскада
+CASCADE_SCALE_FACTOR = 1.1
+
+# Минимальное количество соседних срабатываний, подтверждающих рамку
+CASCADE_MIN_NEIGHBORS = 3
+
+# Версия перевода числа соседей в score (входит в ключи кэша детекций и манифеста)
+CASCADE_SCORE_VERSION = 2
+
+# Минимальная сторона лица в пикселях изображения, на котором работает каскад
+CASCADE_MIN_FACE_SIZE = 24
+
+# Большая сторона изображения, до которой оно уменьшается перед детекцией
+CASCADE_MAX_SIDE = 320
+
+
+def find_cascade_model(model_name):
+    """
+    Ищет файл каскада в CV2_MODELS_DIR, затем среди каскадов opencv-python.
+
+    Args:
+        model_name (str): Имя файла каскада
+
+    Returns:
+        Path: Путь к файлу каскада
+
+    Raises:
+        FileNotFoundError: Если каскад не найден
+    """
+    directories = [CV2_MODELS_DIR]
+    cv2_data = getattr(cv2, "data", None)
+    if cv2_data is not None:
+        directories.append(Path(cv2_data.haarcascades))
+
+    for directory in directories:
+        path = directory / model_name
+        if path.exists():
+            return path
+    raise FileNotFoundError(f"Cascade model not found: {model_name} (put it into {CV2_MODELS_DIR})")
+
+
+class CascadeDetectionEngine:
+    """
+    Движок детекции лиц на каскаде OpenCV с интерфейсом FaceDetectionEngine.
+    """
+
+    # Повторять ли детекцию на увеличенном фото, если лица не найдены
+    upscale_retry = False
+
+    def __init__(self, backend=DETECTOR_HAAR, model_path=None, min_detection_confidence=0.5):
+        """
+        Инициализирует движок и загружает каскад.
+
+        Args:
+            backend (str): Бэкенд из CASCADE_MODELS ("haar" или "lbp")
+            model_path (str or Path or None): Путь к каскаду (по умолчанию ищется по CASCADE_MODELS)
+            min_detection_confidence (float): Минимальная оценка рамки (см. описание модуля)
+
+        Raises:
+            ValueError: Если бэкенд не каскадный
+            FileNotFoundError: Если каскад не найден или не читается
+        """
+        if backend not in CASCADE_MODELS:
+            raise ValueError(f"Unsupported cascade backend: {backend!r} (expected one of {tuple(CASCADE_MODELS)})")
+
+        if model_path is None:
+            model_path = find_cascade_model(CASCADE_MODELS[backend])
+
+        self._classifier = cv2.CascadeClassifier(str(model_path))
+        if self._classifier.empty():
+            raise FileNotFoundError(f"Cascade model could not be loaded: {model_path}")
+
+        self.backend = backend
+        self.model_path = model_path
+        self.model_name = os.path.basename(model_path)
+        self.min_detection_confidence = min_detection_confidence
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def start_video_stream(self):
+        """
+        Отмечает начало нового видео (каскаду не нужно, метод оставлен для совместимости).
+        """
+
+    def detect(self, images, running_mode=RunningMode.IMAGE, timestamps_ms=None, scale=1.0):
+        """
+        Обнаруживает лица на пакете изображений.
+
+        Args:
+            images (list[np.ndarray]): Список изображений в формате BGR
+            running_mode (RunningMode): Режим работы (не влияет на каскад)
+            timestamps_ms (list[int] or None): Временные метки кадров (не влияют на каскад)
+            scale (float): Масштаб, с которым изображения были увеличены относительно оригинала;
+                           координаты рамок делятся на него (по умолчанию 1.0)
+
+        Returns:
+            list[list[dict]]: Для каждого изображения список лиц с ключами
+                              'x', 'y', 'width', 'height' и 'score'
+        """
+        metrics = get_metrics()
+        results = []
+        with self._lock:
+            for image in images:
+                with metrics.timer("detector.detect"):
+                    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+                    # Рамки на уменьшенном изображении переводятся обратно делением на reduce
+                    reduce = min(1.0, CASCADE_MAX_SIDE / max(gray.shape[:2]))
+                    if reduce < 1.0:
+                        gray = cv2.resize(gray, None, fx=reduce, fy=reduce, interpolation=cv2.INTER_AREA)
+                    gray = cv2.equalizeHist(gray)
+                    boxes, neighbors = self._classifier.detectMultiScale2(
+                        gray,
+                        scaleFactor=CASCADE_SCALE_FACTOR,
+                        minNeighbors=CASCADE_MIN_NEIGHBORS,
+                        minSize=(CASCADE_MIN_FACE_SIZE, CASCADE_MIN_FACE_SIZE),
+                    )
+
+                detections = []
+                for (x, y, width, height), count in zip(boxes, neighbors):
+                    # Подтверждения сверх минимума: самая слабая рамка получает 0.5
+                    extra = float(count) - CASCADE_MIN_NEIGHBORS
+                    score = extra / (extra + 1.0)
+                    if score < self.min_detection_confidence:
+                        continue
+                    detections.append({
+                        'x': int(x / (scale * reduce)),
+                        'y': int(y / (scale * reduce)),
+                        'width': int(width / (scale * reduce)),
+                        'height': int(height / (scale * reduce)),
+                        'score': score
+                    })
+                results.append(detections)
+
+        return results
+
+    def close(self):
+        """
+        Закрывает движок (каскад не держит внешних ресурсов, метод оставлен для совместимости).
+        """
@@ -0,0 +1,163 @@
+"""
+Модуль с персистентным кэшем результатов детекции лиц.
+
+Для каждого фото сохраняются все рамки лиц, которые вернул детектор,
+их уверенность и масштаб, на котором они найдены (1.0 или коэффициент
+повторной детекции на увеличенном фото), а также размер фото. Этого
+достаточно, чтобы выбрать лицо при любых min_size, score_threshold
+и отступах без повторного запуска детектора: при подборе порогов
+обрезка только читает кэш и вырезает пиксели.
+
+Кэш устроен так же, как FeatureStore:
+    - detections.f32: строки float32 (x, y, width, height, score, scale)
+      всех фото подряд, дописываются в конец;
+    - индекс (index.csv или index.parquet): хэш содержимого фото ->
+      первая строка, количество рамок, высота и ширина фото;
+    - meta.json: количество строк и параметры детектора.
+
+meta.json записывается последним, поэтому строки, дописанные прерванным
+запуском, игнорируются и перезаписываются следующим запуском.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.Dataset.utils.dataset_io import dataset_output_path, read_dataset, write_dataset
+
+
+# Имена файлов кэша
+DETECTIONS_FILENAME = "detections.f32"
+INDEX_FILENAME = "index.csv"
+INDEX_TMP_FILENAME = "index.tmp.csv"
+META_FILENAME = "meta.json"
+
+# Поля строки с одной рамкой
+DETECTION_FIELDS = ("x", "y", "width", "height", "score", "scale")
+
+
+class DetectionCache:
+    """
+    Кэш рамок лиц с дозаписью и адресацией по хэшу содержимого фото.
+    """
+
+    def __init__(self, cache_dir, params):
+        """
+        Открывает кэш или создает пустой.
+
+        Если параметры детектора отличаются от сохраненных, старые рамки
+        отбрасываются: детектор с другими параметрами находит другие лица.
+
+        Args:
+            cache_dir (str or Path): Папка кэша
+            params (dict): Параметры детектора (сериализуемые в JSON)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.params = params
+        self.rows = 0
+        self._entries = {}
+        self._data = None
+
+        meta_path = self.cache_dir / META_FILENAME
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+            if meta.get("params") == params:
+                self.rows = meta["rows"]
+                index = read_dataset(self.cache_dir / meta["index"])
+                # Индекс мог быть подменен прерванным сохранением уже после meta.json:
+                # фото, рамки которых выходят за сохраненные строки, не считаются закэшированными
+                index = index[index["offset"] + index["count"] <= self.rows]
+                self._entries = {
+                    content_hash: (int(offset), int(count), int(height), int(width))
+                    for content_hash, offset, count, height, width in zip(
+                        index["content_hash"], index["offset"], index["count"], index["height"], index["width"]
+                    )
+                }
+            else:
+                print(f"[WARN] Detector parameters changed, recomputing detections in: {self.cache_dir}")
+
+        # Отбрасываем строки, дописанные после последнего сохранения
+        with open(self.cache_dir / DETECTIONS_FILENAME, "ab") as f:
+            f.truncate(self.rows * len(DETECTION_FIELDS) * 4)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, content_hash):
+        return content_hash in self._entries
+
+    def get(self, content_hash):
+        """
+        Возвращает сохраненные рамки фото.
+
+        Args:
+            content_hash (str): Хэш содержимого фото
+
+        Returns:
+            tuple or None: (список рамок-словарей с ключами DETECTION_FIELDS, (высота, ширина) фото)
+                           или None, если фото нет в кэше
+        """
+        entry = self._entries.get(content_hash)
+        if entry is None:
+            return None
+
+        offset, count, height, width = entry
+        if self._data is None:
+            self._data = np.fromfile(self.cache_dir / DETECTIONS_FILENAME, dtype=np.float32,
+                                     count=self.rows * len(DETECTION_FIELDS)).reshape(-1, len(DETECTION_FIELDS))
+
+        detections = []
+        for x, y, box_width, box_height, score, scale in self._data[offset:offset + count].tolist():
+            detections.append({"x": int(x), "y": int(y), "width": int(box_width), "height": int(box_height),
+                               "score": score, "scale": scale})
+        return detections, (height, width)
+
+    def append(self, content_hash, detections, image_shape):
+        """
+        Дописывает рамки одного фото в конец кэша.
+
+        Args:
+            content_hash (str): Хэш содержимого фото
+            detections (list): Рамки-словари с ключами DETECTION_FIELDS (может быть пустым)
+            image_shape (tuple): (высота, ширина) фото
+        """
+        if content_hash in self._entries:
+            return
+
+        rows = np.array([[d[field] for field in DETECTION_FIELDS] for d in detections],
+                        dtype=np.float32).reshape(-1, len(DETECTION_FIELDS))
+        with open(self.cache_dir / DETECTIONS_FILENAME, "ab") as f:
+            f.write(rows.tobytes())
+
+        self._entries[content_hash] = (self.rows, len(rows), int(image_shape[0]), int(image_shape[1]))
+        self.rows += len(rows)
+        self._data = None
+
+    def save(self):
+        """
+        Сохраняет индекс и meta.json (оба атомарно, meta.json — последним).
+        """
+        entries = np.array(list(self._entries.values()), dtype=np.int64).reshape(-1, 4)
+        index = pd.DataFrame({
+            "content_hash": list(self._entries),
+            "offset": entries[:, 0],
+            "count": entries[:, 1].astype(np.int32),
+            "height": entries[:, 2].astype(np.int32),
+            "width": entries[:, 3].astype(np.int32),
+        })
+        index_path = dataset_output_path(self.cache_dir / INDEX_FILENAME)
+        os.replace(write_dataset(index, self.cache_dir / INDEX_TMP_FILENAME), index_path)
+
+        meta = {"rows": self.rows, "fields": list(DETECTION_FIELDS), "dtype": "float32", "params": self.params,
+                "index": index_path.name}
+        meta_path = self.cache_dir / META_FILENAME
+        tmp_path = meta_path.with_name(meta_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
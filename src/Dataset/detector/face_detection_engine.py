@@ -0,0 +1,305 @@
+"""
+Модуль с общим движком детекции лиц на базе MediaPipe BlazeFace.
+
+Этот модуль загружает модель blaze_face_short_range.tflite один раз на процесс,
+держит по одному детектору на каждый режим работы (IMAGE и VIDEO) и предоставляет
+пакетный метод detect(), которым пользуются кроппер и обработчик видео.
+
+Детектор выбирается бэкендом: кроме MediaPipe (по умолчанию) доступны каскады
+OpenCV Haar и LBP (см. cascade_detection_engine). Все движки возвращают рамки
+в одном формате, а бэкенд по умолчанию берется из конфигурации пайплайна
+(detector_backend), поэтому его можно сменить, не меняя стадии.
+"""
+
+import os
+import threading
+
+import cv2
+import mediapipe as mp
+from mediapipe.tasks.python import BaseOptions
+from mediapipe.tasks.python.vision import FaceDetector, FaceDetectorOptions, RunningMode
+
+from src.Сonfigs.common_paths import CV2_MODELS_DIR
+from src.Dataset.utils.pipeline_metrics import get_metrics
+
+
+# Имя файла модели BlazeFace
+FACE_MODEL_NAME = "blaze_face_short_range.tflite"
+
+# Минимальная уверенность, с которой детектор возвращает лицо
+MIN_DETECTION_CONFIDENCE = 0.5
+
+# Бэкенды детекции лиц: MediaPipe BlazeFace и каскады OpenCV
+DETECTOR_MEDIAPIPE = "mediapipe"
+DETECTOR_HAAR = "haar"
+DETECTOR_LBP = "lbp"
+DETECTOR_BACKENDS = (DETECTOR_MEDIAPIPE, DETECTOR_HAAR, DETECTOR_LBP)
+
+
+class FaceDetectionEngine:
+    """
+    Движок детекции лиц, переиспользующий детекторы MediaPipe.
+
+    Модель читается с диска один раз, а детекторы для режимов IMAGE и VIDEO
+    создаются лениво при первом обращении и живут до вызова close().
+    Для режима VIDEO движок сам поддерживает монотонные временные метки,
+    поэтому один детектор можно использовать для нескольких видео подряд.
+    """
+
+    # Имя бэкенда (см. DETECTOR_BACKENDS)
+    backend = DETECTOR_MEDIAPIPE
+
+    # Повторять ли детекцию на увеличенном фото, если лица не найдены
+    # (BlazeFace работает на входе 128 x 128 и пропускает мелкие лица)
+    upscale_retry = True
+
+    def __init__(self, model_path=None, min_detection_confidence=MIN_DETECTION_CONFIDENCE):
+        """
+        Инициализирует движок и загружает модель в память.
+
+        Args:
+            model_path (str or Path): Путь к модели BlazeFace (по умолчанию CV2_MODELS_DIR / FACE_MODEL_NAME)
+            min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+
+        Raises:
+            FileNotFoundError: Если модель BlazeFace не найдена
+        """
+        if model_path is None:
+            model_path = CV2_MODELS_DIR / FACE_MODEL_NAME
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model not found: {model_path}")
+
+        # Читаем модель один раз и переиспользуем буфер для всех детекторов
+        with open(model_path, "rb") as f:
+            self._model_buffer = f.read()
+
+        self.model_path = model_path
+        self.model_name = os.path.basename(model_path)
+        self.min_detection_confidence = min_detection_confidence
+        self.pid = os.getpid()
+
+        self._detectors = {}
+        self._lock = threading.Lock()
+
+        # Смещение и последняя метка времени для режима VIDEO
+        self._video_ts_offset = 0
+        self._last_video_ts = -1
+
+    def _get_detector(self, running_mode):
+        """
+        Возвращает детектор для указанного режима, создавая его при первом обращении.
+
+        Args:
+            running_mode (RunningMode): Режим работы детектора (IMAGE или VIDEO)
+
+        Returns:
+            FaceDetector: Детектор MediaPipe
+        """
+        detector = self._detectors.get(running_mode)
+        if detector is None:
+            options = FaceDetectorOptions(
+                base_options=BaseOptions(model_asset_buffer=self._model_buffer),
+                running_mode=running_mode,
+                min_detection_confidence=self.min_detection_confidence
+            )
+            detector = FaceDetector.create_from_options(options)
+            self._detectors[running_mode] = detector
+        return detector
+
+    def start_video_stream(self):
+        """
+        Отмечает начало нового видео для детектора в режиме VIDEO.
+
+        MediaPipe требует строго возрастающих временных меток, поэтому метки
+        нового видео сдвигаются так, чтобы начинаться после последней метки предыдущего.
+        """
+        with self._lock:
+            self._video_ts_offset = self._last_video_ts + 1
+
+    def detect(self, images, running_mode=RunningMode.IMAGE, timestamps_ms=None, scale=1.0):
+        """
+        Обнаруживает лица на пакете изображений.
+
+        Args:
+            images (list[np.ndarray]): Список изображений в формате BGR
+            running_mode (RunningMode): Режим работы детектора (по умолчанию IMAGE)
+            timestamps_ms (list[int]): Временные метки кадров внутри видео, обязательны для режима VIDEO
+            scale (float): Масштаб, с которым изображения были увеличены относительно оригинала;
+                           координаты рамок делятся на него (по умолчанию 1.0)
+
+        Returns:
+            list[list[dict]]: Для каждого изображения список лиц с ключами
+                              'x', 'y', 'width', 'height' и 'score'
+
+        Raises:
+            ValueError: Если для режима VIDEO не переданы временные метки
+        """
+        if running_mode == RunningMode.VIDEO:
+            if timestamps_ms is None or len(timestamps_ms) != len(images):
+                raise ValueError("timestamps_ms must be provided for every image in VIDEO mode.")
+
+        metrics = get_metrics()
+        results = []
+        with self._lock:
+            detector = self._get_detector(running_mode)
+
+            for i, image in enumerate(images):
+                with metrics.timer("detector.detect"):
+                    mp_image = mp.Image(
+                        image_format=mp.ImageFormat.SRGB,
+                        data=cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                    )
+
+                    if running_mode == RunningMode.VIDEO:
+                        timestamp_ms = self._video_ts_offset + int(timestamps_ms[i])
+                        result = detector.detect_for_video(mp_image, timestamp_ms)
+                        self._last_video_ts = max(self._last_video_ts, timestamp_ms)
+                    else:
+                        result = detector.detect(mp_image)
+
+                detections = []
+                for d in result.detections:
+                    bbox = d.bounding_box
+                    detections.append({
+                        'x': int(bbox.origin_x / scale),
+                        'y': int(bbox.origin_y / scale),
+                        'width': int(bbox.width / scale),
+                        'height': int(bbox.height / scale),
+                        'score': d.categories[0].score
+                    })
+                results.append(detections)
+
+        return results
+
+    def close(self):
+        """
+        Закрывает все созданные детекторы и освобождает ресурсы MediaPipe.
+        """
+        with self._lock:
+            for detector in self._detectors.values():
+                try:
+                    detector.close()
+                except RuntimeError:
+                    # При завершении интерпретатора исполнитель MediaPipe может
+                    # быть уже остановлен — ресурсы освободит сам процесс
+                    pass
+            self._detectors = {}
+
+
+def get_detector_backend(backend=None):
+    """
+    Возвращает бэкенд детекции лиц с проверкой.
+
+    Args:
+        backend (str or None): Явно заданный бэкенд; None — бэкенд из конфигурации пайплайна
+
+    Returns:
+        str: Бэкенд из DETECTOR_BACKENDS
+
+    Raises:
+        ValueError: Если бэкенд не поддерживается
+    """
+    if backend is None:
+        from src.Сonfigs.pipeline_config import get_config
+        backend = get_config().detector_backend
+
+    if backend not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unsupported detector backend: {backend!r} (expected one of {DETECTOR_BACKENDS})")
+    return backend
+
+
+def get_detector_model_name(backend=None):
+    """
+    Возвращает имя файла модели бэкенда (используется в ключах кэшей и манифеста).
+
+    Args:
+        backend (str or None): Бэкенд детекции (None — из конфигурации пайплайна)
+
+    Returns:
+        str: Имя файла модели
+    """
+    backend = get_detector_backend(backend)
+    if backend == DETECTOR_MEDIAPIPE:
+        return FACE_MODEL_NAME
+
+    from src.Dataset.detector.cascade_detection_engine import CASCADE_MODELS
+    return CASCADE_MODELS[backend]
+
+
+def create_face_detection_engine(backend=None, min_detection_confidence=MIN_DETECTION_CONFIDENCE):
+    """
+    Создает движок детекции лиц для бэкенда.
+
+    Все движки предоставляют одинаковый интерфейс: detect(images, running_mode,
+    timestamps_ms, scale), start_video_stream() и close(), а также атрибуты
+    backend, model_name, upscale_retry, min_detection_confidence и pid.
+
+    Args:
+        backend (str or None): Бэкенд детекции (None — из конфигурации пайплайна)
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+
+    Returns:
+        FaceDetectionEngine or CascadeDetectionEngine: Новый движок
+
+    Raises:
+        ValueError: Если бэкенд не поддерживается
+        FileNotFoundError: Если модель бэкенда не найдена
+    """
+    backend = get_detector_backend(backend)
+    if backend == DETECTOR_MEDIAPIPE:
+        return FaceDetectionEngine(min_detection_confidence=min_detection_confidence)
+
+    from src.Dataset.detector.cascade_detection_engine import CascadeDetectionEngine
+    return CascadeDetectionEngine(backend, min_detection_confidence=min_detection_confidence)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_face_detection_engine(min_detection_confidence=MIN_DETECTION_CONFIDENCE, backend=None):
+    """
+    Возвращает общий для процесса движок детекции лиц.
+
+    Движок создается при первом вызове. Если процесс был порожден через fork,
+    унаследованный от родителя движок не используется и создается новый.
+    Если запрошены другая минимальная уверенность детектора или другой бэкенд,
+    движок пересоздается.
+
+    Args:
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        backend (str or None): Бэкенд детекции (None — из конфигурации пайплайна)
+
+    Returns:
+        FaceDetectionEngine or CascadeDetectionEngine: Движок детекции лиц текущего процесса
+
+    Raises:
+        ValueError: Если бэкенд не поддерживается
+        FileNotFoundError: Если модель бэкенда не найдена
+    """
+    global _engine
+    backend = get_detector_backend(backend)
+    with _engine_lock:
+        if _engine is not None and _engine.pid == os.getpid() \
+                and (_engine.min_detection_confidence != min_detection_confidence or _engine.backend != backend):
+            _engine.close()
+            _engine = None
+        if _engine is None or _engine.pid != os.getpid():
+            _engine = create_face_detection_engine(backend, min_detection_confidence)
+        return _engine
+
+
+def shutdown_face_detection_engine():
+    """
+    Закрывает общий движок детекции лиц, если он был создан в текущем процессе.
+
+    Вызывается явно по окончании работы с детектором (например, в конце запуска
+    пайплайна): при завершении интерпретатора пул потоков, через который
+    MediaPipe выполняет вызовы, уже остановлен, и детекторы нельзя закрыть.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is not None and _engine.pid == os.getpid():
+            _engine.close()
+        _engine = None
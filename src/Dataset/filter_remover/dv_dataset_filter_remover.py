@@ -7,115 +7,221 @@
 записывается в новый CSV-файл.
 """
 
-from pathlib import Path
+from functools import partial
 
 import cv2
-import pandas as pd
 import numpy as np
 
-from src.Сonfigs.common_paths import (
-    DV_PHOTOS_EXTRACTED_DIR,
-    DV_PHOTOS_UNFILTERED_DIR,
-    DV_FRAMES_CSV,
-    DV_FRAMES_UNFILTERED_CSV
+from src.Сonfigs import common_paths
+from src.Dataset.filter_remover.image_normalizer import get_normalizer_params, normalize_image
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.photo_index import (
+    PHOTOS_DIR, PHOTOS_EXTRACTED_DIR, PhotoIndex, group_duplicate_paths, split_filenames,
 )
-from src.Dataset.filter_remover.image_normalizer import remove_artificial_filters_adaptive
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.stage_manifest import STAGE_FILTER_REMOVAL
+from src.Dataset.utils.threaded_io import (
+    IO_QUEUE_DEPTH, IO_THREADS, JPEG_QUALITY, BackgroundWriter, prefetch, write_image,
+)
+
+
+def resolve_frame_paths(image_paths):
+    """
+    Определяет пути к исходным фото для колонки image_path из DV_FRAMES_CSV.
+
+    Префиксы photos/ и photos_extracted/ отрезаются, после чего изображение
+    ищется сначала в <DV_DATASET>/photos/, затем в <DV_DATASET>/photos_extracted/.
+    Папки перечисляются один раз, а вся колонка разрешается векторно.
+
+    Args:
+        image_paths (pd.Series): Колонка image_path (photos/..., photos_extracted/... или без префикса)
+
+    Returns:
+        tuple: (PhotoIndex, pd.DataFrame с колонками "clean_rel_path", "source_dir", "found")
+    """
+    index = PhotoIndex(common_paths.DV_DATASET, (PHOTOS_DIR, PHOTOS_EXTRACTED_DIR))
+    resolved = index.resolve(
+        image_paths,
+        prefixes=(PHOTOS_DIR, PHOTOS_EXTRACTED_DIR),
+        search_order=(PHOTOS_DIR, PHOTOS_EXTRACTED_DIR),
+    )
+    return index, resolved
+
+
+def _read_image(item):
+    """
+    Декодирует фото из задачи стадии (выполняется в потоке чтения).
+
+    Args:
+        item (tuple): (номер уникального фото, путь к исходному фото, путь для сохранения)
+
+    Returns:
+        np.ndarray or None: Фото в BGR или None, если фото не читается
+    """
+    with get_metrics().timer("filter.decode"):
+        return cv2.imread(item[1])
+
+
+def _write_image(dst_path, image, jpeg_quality):
+    """
+    Кодирует и сохраняет нормализованное фото (выполняется в потоке записи).
+    """
+    with get_metrics().timer("filter.encode"):
+        return write_image(dst_path, image, jpeg_quality)
 
 
-def process_dataset_with_filter_removal():
+def _record_written_image(manifest, key, dst_path, future):
+    """
+    Записывает результат в манифест после сохранения фото (вызывается потоком записи).
+
+    Фото, которое не удалось записать, в манифест не попадает и обрабатывается
+    заново при следующем запуске.
+
+    Args:
+        manifest (StageManifest): Манифест стадий
+        key (str): Ключ записи в манифесте
+        dst_path (Path): Путь к нормализованному фото
+        future (Future): Результат _write_image
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    if not future.result():
+        print(f"[WARNING] Failed to write image: {dst_path}")
+        return
+    manifest.record(STAGE_FILTER_REMOVAL, key, True, [dst_path])
+
+
+def process_dataset_with_filter_removal(io_threads=IO_THREADS, io_depth=IO_QUEUE_DEPTH, jpeg_quality=JPEG_QUALITY,
+                                        manifest=None):
     """
     Обрабатывает датасет из DV_FRAMES_CSV с удалением искусственных фильтров.
 
     Обрабатывает датасет из файла DV_FRAMES_CSV:
     - сначала ищет изображения в <DV_DATASET>/photos/,
     - если не найдено — пробует в <DV_DATASET>/photos_extracted/,
-    - применяет remove_artificial_filters_adaptive ТОЛЬКО если фото имеет "дохера засвета",
+    - применяет normalize_image ТОЛЬКО если фото имеет "дохера засвета",
     - сохраняет результат в DV_PHOTOS_UNFILTERED_DIR ТОЛЬКО если обработано,
     - записывает новый CSV в DV_FRAMES_UNFILTERED_CSV, меняя путь только у обработанных фото.
 
     Процесс:
     1. Создает директорию для сохранения обработанных изображений
     2. Читает датасет из CSV-файла
-    3. Для каждого изображения:
-       - определяет правильный путь к файлу
+    3. Определяет пути ко всем изображениям по индексу папок (см. resolve_frame_paths)
+    4. Для каждого уникального найденного изображения (дубликаты обрабатываются один раз):
        - загружает изображение
        - применяет нормализацию фильтров
        - если изображение было изменено, сохраняет его с новым именем
-    4. Сохраняет обновленный датасет в новый CSV-файл
+    5. Сохраняет обновленный датасет в новый CSV-файл
+
+    Если передан манифест стадий, фото с неизменившимся содержимым и константами
+    нормализатора повторно не читаются и не обрабатываются.
+
+    Чтение и запись фото вынесены в потоки (см. threaded_io): следующие io_depth
+    фото декодируются наперед, а нормализованные фото кодируются и записываются
+    в фоне. Результат совпадает с последовательным циклом (io_threads=0).
+
+    Args:
+        io_threads (int): Количество потоков чтения и записи (0 — последовательно)
+        io_depth (int): Максимальное количество фото в очереди чтения и в очереди записи
+        jpeg_quality (int): Качество JPEG нормализованных фото (по умолчанию JPEG_QUALITY)
+        manifest (StageManifest or None): Манифест стадий для инкрементальных перезапусков
     """
     # Создаем директорию для обработанных изображений
-    DV_PHOTOS_UNFILTERED_DIR.mkdir(parents=True, exist_ok=True)
+    common_paths.DV_PHOTOS_UNFILTERED_DIR.mkdir(parents=True, exist_ok=True)
 
     # Читаем исходный датасет
-    df = pd.read_csv(DV_FRAMES_CSV)
+    df = read_dataset(common_paths.DV_FRAMES_CSV)
 
     # Проверяем наличие необходимой колонки
     if "image_path" not in df.columns:
         raise ValueError("CSV must contain 'image_path' column.")
 
-    new_image_paths = []
-    # Определяем директорию с оригинальными фото
-    DV_PHOTOS_DIR = DV_PHOTOS_EXTRACTED_DIR.parent / "photos"
-
-    # Обрабатываем каждую строку датасета
-    for _, row in df.iterrows():
-        rel_path = row["image_path"]
-        clean_rel_path = rel_path
-        
-        # Определяем относительный путь в зависимости от типа изображения
-        if rel_path.startswith("photos/"):
-            clean_rel_path = rel_path[len("photos/"):]
-        elif rel_path.startswith("photos_extracted/"):
-            clean_rel_path = rel_path[len("photos_extracted/"):]
-
-        # Пытаемся найти изображение в оригинальной директории
-        src_path = DV_PHOTOS_DIR / clean_rel_path
-
-        if not src_path.exists():
-            # Если не нашли, пробуем в директории извлеченных фото
-            src_path = DV_PHOTOS_EXTRACTED_DIR / clean_rel_path
-            if not src_path.exists():
-                print(f"[WARNING] Image not found in 'photos' nor 'photos_extracted': {rel_path}")
-                new_image_paths.append(rel_path)
+    metrics = get_metrics()
+    filter_params = {**get_normalizer_params(), "jpeg_quality": jpeg_quality}
+    reused = 0
+
+    # Определяем пути ко всем изображениям сразу
+    index, resolved = resolve_frame_paths(df["image_path"])
+    found_mask = resolved["found"].to_numpy()
+    for rel_path in df["image_path"][~found_mask]:
+        print(f"[WARNING] Image not found in 'photos' nor 'photos_extracted': {rel_path}")
+        metrics.inc("filter.missing")
+
+    # Генерируем новые имена файлов для обработанных изображений
+    found = resolved[found_mask]
+    stems, suffixes = split_filenames(found["clean_rel_path"])
+    new_filenames = (stems + "_unfiltered" + suffixes).to_numpy()
+
+    # Строки с одним и тем же исходным файлом (дубликаты после дедупликации)
+    # обрабатываются один раз, результат копируется на всю группу
+    src_paths = index.source_paths(found)
+    first_positions, groups = group_duplicate_paths(src_paths)
+    metrics.inc("filter.duplicate", len(src_paths) - len(first_positions))
+
+    # Отмечаем уникальные изображения, которые были изменены
+    changed_unique = np.zeros(len(first_positions), dtype=bool)
+
+    # Если фото уже обрабатывалось с теми же константами, берем результат из манифеста
+    keys = [None] * len(first_positions)
+    pending = []
+    for position, i in enumerate(first_positions):
+        dst_path = common_paths.DV_PHOTOS_UNFILTERED_DIR / new_filenames[i]
+        if manifest is not None:
+            keys[position] = manifest.entry_key(src_paths[i], filter_params, dst_path)
+            changed = manifest.lookup(STAGE_FILTER_REMOVAL, keys[position])
+            if changed is not None:
+                changed_unique[position] = changed
+                reused += 1
+                metrics.inc("filter.reused")
                 continue
+        pending.append((position, src_paths[i], dst_path))
+
+    # Следующие фото читаются в потоках, пока текущее нормализуется,
+    # а запись нормализованных фото идет в отдельном пуле потоков
+    with BackgroundWriter(io_threads, io_depth, jpeg_quality) as writer:
+        loaded = prefetch(pending, _read_image, io_threads, io_depth)
+        for (position, src_path, dst_path), image in metrics.time_each(loaded, "filter.image"):
+            key = keys[position]
+            if image is None:
+                print(f"[WARNING] Failed to read image: {src_path}")
+                metrics.inc("filter.unreadable")
+                continue
+
+            try:
+                # Применяем адаптивное удаление фильтров
+                with metrics.timer("filter.normalize"):
+                    normalized_image, changed = normalize_image(image)
 
-        # Загружаем изображение
-        image = cv2.imread(str(src_path))
-        if image is None:
-            print(f"[WARNING] Failed to read image: {src_path}")
-            new_image_paths.append(rel_path)
-            continue
-
-        try:
-            # Применяем адаптивное удаление фильтров
-            normalized_image = remove_artificial_filters_adaptive(image)
-
-        except Exception as e:
-            print(f"[ERROR] Failed to process {src_path}: {e}")
-            new_image_paths.append(rel_path)
-            continue
-
-        # Если изображение не изменилось после обработки, оставляем старый путь
-        if np.array_equal(image, normalized_image):
-            new_image_paths.append(rel_path)
-            continue
-
-        # Генерируем новое имя файла для обработанного изображения
-        filename = Path(clean_rel_path).name
-        stem = Path(filename).stem
-        suffix = Path(filename).suffix
-        new_filename = f"{stem}_unfiltered{suffix}"
-        dst_path = DV_PHOTOS_UNFILTERED_DIR / new_filename
-
-        # Сохраняем обработанное изображение
-        cv2.imwrite(str(dst_path), normalized_image)
-        new_rel_path = f"photos_unfiltered/{new_filename}"
-        new_image_paths.append(new_rel_path)
-
-    # Обновляем пути к изображениям в датафрейме
+            except Exception as e:
+                print(f"[ERROR] Failed to process {src_path}: {e}")
+                metrics.inc("filter.error")
+                continue
+
+            # Если изображение не изменилось после обработки, оставляем старый путь
+            metrics.inc("filter.normalized" if changed else "filter.unchanged")
+            if not changed:
+                if manifest is not None:
+                    manifest.record(STAGE_FILTER_REMOVAL, key, False)
+                continue
+
+            # Сохраняем обработанное изображение в фоне; в манифест оно попадает только после записи
+            future = writer.submit(_write_image, dst_path, normalized_image, jpeg_quality)
+            if manifest is not None:
+                future.add_done_callback(partial(_record_written_image, manifest, key, dst_path))
+            changed_unique[position] = True
+
+    # Раздаем результаты уникальных изображений всем строкам их групп
+    changed_mask = np.zeros(len(df), dtype=bool)
+    changed_mask[found_mask] = changed_unique[groups]
+
+    # Обновляем пути к измененным изображениям в датафрейме
     df_out = df.copy()
-    df_out["image_path"] = new_image_paths
-    df_out.to_csv(DV_FRAMES_UNFILTERED_CSV, index=False)
+    df_out.loc[changed_mask, "image_path"] = "photos_unfiltered/" + new_filenames[changed_mask[found_mask]]
+    output_path = write_dataset(df_out, common_paths.DV_FRAMES_UNFILTERED_CSV)
+
+    print(f"[INFO] Processed dataset saved to: {output_path}")
+    print(f"[INFO] Processed images saved to: {common_paths.DV_PHOTOS_UNFILTERED_DIR}")
 
-    print(f"[INFO] Processed dataset saved to: {DV_FRAMES_UNFILTERED_CSV}")
-    print(f"[INFO] Processed images saved to: {DV_PHOTOS_UNFILTERED_DIR}")
+    if manifest is not None:
+        manifest.save()
+        print(f"[INFO] Reused {reused} filter removal results from manifest")
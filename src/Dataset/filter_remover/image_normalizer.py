@@ -6,88 +6,221 @@
 в социальных сетях и приложениях знакомств.
 """
 
+from functools import lru_cache
+
 import cv2
 import numpy as np
 
 
-def remove_artificial_filters_adaptive(image: np.ndarray) -> np.ndarray:
+# Порог яркости канала L, начиная с которого пиксель считается засвеченным
+BRIGHT_PIXEL_LEVEL = 230
+# Доля засвеченных пикселей, при которой фото обрабатывается
+BRIGHT_RATIO_THRESHOLD = 0.150
+# Средняя яркость канала L, при которой фото обрабатывается
+MEAN_BRIGHTNESS_THRESHOLD = 150
+
+# Параметры CLAHE для канала яркости
+CLAHE_CLIP_LIMIT = 3.0
+CLAHE_TILE_GRID_SIZE = (8, 8)
+
+# Коэффициент насыщенности каналов a и b в LAB
+LAB_SATURATION_FACTOR = 0.5
+# Коэффициент цветовых каналов U и V в YUV
+YUV_CHROMA_FACTOR = 0.7
+# Гамма-коррекция итогового изображения
+GAMMA = 1.4
+
+# Максимальная сторона уменьшенной копии, по которой проверяется засвет
+GATE_MAX_SIDE = 256
+
+
+def get_normalizer_params():
     """
-    Адаптивно убирает искусственные фильтры только если фото имеет большой засвет.
+    Возвращает константы нормализатора, от которых зависит результат обработки.
+
+    Используется как часть ключа в манифесте стадий.
+
+    Returns:
+        dict: Пороговые значения и коэффициенты коррекции
+    """
+    return {
+        "bright_pixel_level": BRIGHT_PIXEL_LEVEL,
+        "bright_ratio_threshold": BRIGHT_RATIO_THRESHOLD,
+        "mean_brightness_threshold": MEAN_BRIGHTNESS_THRESHOLD,
+        "clahe_clip_limit": CLAHE_CLIP_LIMIT,
+        "clahe_tile_grid_size": list(CLAHE_TILE_GRID_SIZE),
+        "lab_saturation_factor": LAB_SATURATION_FACTOR,
+        "yuv_chroma_factor": YUV_CHROMA_FACTOR,
+        "gamma": GAMMA,
+        "gate_max_side": GATE_MAX_SIDE,
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_clahe():
+    """
+    Возвращает объект CLAHE для канала яркости (создается один раз на процесс).
 
-    Функция анализирует яркость изображения и применяет коррекцию только 
-    если содержание ярких участков превышает пороговые значения. 
-    В противном случае возвращает копию исходного изображения.
+    Returns:
+        cv2.CLAHE: Объект CLAHE с параметрами CLAHE_CLIP_LIMIT и CLAHE_TILE_GRID_SIZE
+    """
+    return cv2.createCLAHE(clipLimit=CLAHE_CLIP_LIMIT, tileGridSize=CLAHE_TILE_GRID_SIZE)
+
+
+def _build_chroma_lut(factor):
+    """
+    Строит трехканальную таблицу: первый канал не меняется, два цветовых сжимаются к 128.
+
+    Args:
+        factor (float): Коэффициент цветовых каналов
+
+    Returns:
+        np.ndarray: Таблица формы (1, 256, 3) типа uint8 для cv2.LUT
+    """
+    levels = np.arange(256, dtype=np.float32)
+    chroma = np.clip((levels - 128) * factor + 128, 0, 255).astype(np.uint8)
+    identity = levels.astype(np.uint8)
+    return np.ascontiguousarray(np.stack([identity, chroma, chroma], axis=-1)[np.newaxis])
+
+
+@lru_cache(maxsize=None)
+def _get_lab_lut():
+    """
+    Возвращает таблицу для канала LAB: L не меняется, a и b сжимаются к 128.
+
+    Значения совпадают с поэлементным расчетом во float32 с последующим clip.
+
+    Returns:
+        np.ndarray: Таблица формы (1, 256, 3) типа uint8 для cv2.LUT
+    """
+    return _build_chroma_lut(LAB_SATURATION_FACTOR)
+
+
+@lru_cache(maxsize=None)
+def _get_yuv_lut():
+    """
+    Возвращает таблицу для канала YUV: Y не меняется, U и V сжимаются к 128.
+
+    Значения совпадают с поэлементным расчетом во float32 с последующим clip.
+
+    Returns:
+        np.ndarray: Таблица формы (1, 256, 3) типа uint8 для cv2.LUT
+    """
+    return _build_chroma_lut(YUV_CHROMA_FACTOR)
+
+
+@lru_cache(maxsize=None)
+def _get_gamma_lut():
+    """
+    Возвращает таблицу гамма-коррекции с показателем 1 / GAMMA.
+
+    Returns:
+        np.ndarray: Таблица из 256 значений типа uint8 для cv2.LUT
+    """
+    inv_gamma = 1.0 / GAMMA
+    return ((np.arange(256) / 255.0) ** inv_gamma * 255).astype(np.uint8)
+
+
+def has_extreme_brightness(image, max_side=GATE_MAX_SIDE):
+    """
+    Проверяет, есть ли на фото сильный засвет.
+
+    Доля засвеченных пикселей и средняя яркость считаются по каналу L
+    уменьшенной копии фото (со стороной не больше max_side), а не по
+    полному разрешению.
+
+    Args:
+        image (np.ndarray): Изображение в формате BGR
+        max_side (int or None): Максимальная сторона уменьшенной копии;
+                                None — проверка по полному разрешению
+
+    Returns:
+        bool: True, если фото нужно обрабатывать
+    """
+    h, w = image.shape[:2]
+    scale = 1.0 if max_side is None else max_side / max(h, w)
+    if scale < 1.0:
+        small = cv2.resize(image, (max(1, round(w * scale)), max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    else:
+        small = image
+
+    l = cv2.extractChannel(cv2.cvtColor(small, cv2.COLOR_BGR2LAB), 0)
+
+    # Доля очень ярких пикселей (>=BRIGHT_PIXEL_LEVEL) и средняя яркость
+    bright_ratio = np.count_nonzero(l >= BRIGHT_PIXEL_LEVEL) / l.size
+    mean_brightness = cv2.mean(l)[0]
+
+    return bright_ratio > BRIGHT_RATIO_THRESHOLD or mean_brightness > MEAN_BRIGHTNESS_THRESHOLD
+
+
+def normalize_image(image, gate_max_side=GATE_MAX_SIDE):
+    """
+    Адаптивно убирает искусственные фильтры и сообщает, было ли фото изменено.
+
+    Если засвета нет, возвращается исходный массив без копирования.
+    Иначе коррекция дает тот же результат, что и исходная реализация, но
+    цветовые каналы и гамма корректируются кэшированными таблицами cv2.LUT
+    на месте, без split/merge и временных float32-массивов:
+    1. CLAHE по каналу L и сжатие a, b одной таблицей
+    2. Перевод LAB -> BGR -> YUV и сжатие U, V одной таблицей
+    3. Перевод YUV -> BGR и гамма-коррекция
 
     Args:
         image (np.ndarray): Входное изображение в формате BGR
+        gate_max_side (int or None): Максимальная сторона копии для проверки засвета
+                                     (см. has_extreme_brightness)
 
     Returns:
-        np.ndarray: Обработанное изображение (если требовалась обработка) 
-                   или копия исходного изображения (если обработка не нужна)
+        tuple: (изображение, флаг изменения); при флаге False возвращается сам image
 
     Raises:
         ValueError: Если входное изображение пустое или недействительно
     """
     if image is None or image.size == 0:
         raise ValueError("Input image is empty or invalid.")
-    
-    # Преобразуем изображение в цветовое пространство LAB
+
+    if not has_extreme_brightness(image, gate_max_side):
+        return image, False
+
     lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
-    l, a, b = cv2.split(lab)
-    
-    # Вычисляем гистограмму канала L (яркость)
-    hist, _ = np.histogram(l, bins=256, range=(0, 256))
-    # Подсчитываем количество очень ярких пикселей (>230)
-    bright_pixels = np.sum(hist[230:])
-    total_pixels = l.size
-    bright_ratio = bright_pixels / total_pixels
-
-    # Вычисляем среднюю яркость
-    mean_brightness = np.mean(l)
-    # Проверяем, есть ли чрезмерная яркость
-    has_extreme_bright = (
-        bright_ratio > 0.150 or
-        mean_brightness > 150
-    )
-
-    # Если нет чрезмерной яркости, возвращаем копию исходного изображения
-    if not has_extreme_bright:
-        return image.copy()
-    
-    # Применяем CLAHE (Contrast Limited Adaptive Histogram Equalization) 
-    # для улучшения контраста канала яркости
-    clahe = cv2.createCLAHE(clipLimit=3.0, tileGridSize=(8, 8))
-    l_norm = clahe.apply(l)
-    
-    # Корректируем насыщенность цветов
-    saturation_factor = 0.5
-    a = (a.astype(np.float32) - 128) * saturation_factor + 128
-    b = (b.astype(np.float32) - 128) * saturation_factor + 128
-    a = np.clip(a, 0, 255).astype(np.uint8)
-    b = np.clip(b, 0, 255).astype(np.uint8)
-
-    # Собираем каналы обратно и преобразуем в BGR
-    lab_norm = cv2.merge([l_norm, a, b])
-    result = cv2.cvtColor(lab_norm, cv2.COLOR_LAB2BGR)
-    
-    # Преобразуем в цветовое пространство YUV для дальнейшей коррекции
-    yuv = cv2.cvtColor(result, cv2.COLOR_BGR2YUV)
-    y, u, v = cv2.split(yuv)
+
+    # Применяем CLAHE для улучшения контраста канала яркости
+    l_norm = _get_clahe().apply(cv2.extractChannel(lab, 0))
+
+    # Корректируем насыщенность a и b и возвращаем выровненный канал L
+    lab = cv2.LUT(lab, _get_lab_lut())
+    cv2.insertChannel(l_norm, lab, 0)
+    result = cv2.cvtColor(lab, cv2.COLOR_LAB2BGR)
 
     # Корректируем цветовые каналы U и V
-    u_centered = (u.astype(np.float32) - 128) * 0.7 + 128
-    v_centered = (v.astype(np.float32) - 128) * 0.7 + 128
-    u_centered = np.clip(u_centered, 0, 255).astype(np.uint8)
-    v_centered = np.clip(v_centered, 0, 255).astype(np.uint8)
-
-    # Собираем YUV каналы обратно и преобразуем в BGR
-    yuv_balanced = cv2.merge([y, u_centered, v_centered])
-    result = cv2.cvtColor(yuv_balanced, cv2.COLOR_YUV2BGR)
-    
+    yuv = cv2.cvtColor(result, cv2.COLOR_BGR2YUV)
+    cv2.LUT(yuv, _get_yuv_lut(), dst=yuv)
+    result = cv2.cvtColor(yuv, cv2.COLOR_YUV2BGR)
+
     # Применяем гамма-коррекцию для улучшения яркости
-    gamma = 1.4
-    inv_gamma = 1.0 / gamma
-    table = np.array([((i / 255.0) ** inv_gamma) * 255 for i in np.arange(0, 256)]).astype("uint8")
-    result = cv2.LUT(result, table)
+    cv2.LUT(result, _get_gamma_lut(), dst=result)
+
+    return result, True
+
+
+def remove_artificial_filters_adaptive(image: np.ndarray) -> np.ndarray:
+    """
+    Адаптивно убирает искусственные фильтры только если фото имеет большой засвет.
 
-    return result
+    Обертка над normalize_image для обратной совместимости: если обработка
+    не нужна, возвращает копию исходного изображения. Новому коду лучше
+    вызывать normalize_image и пользоваться флагом изменения.
+
+    Args:
+        image (np.ndarray): Входное изображение в формате BGR
+
+    Returns:
+        np.ndarray: Обработанное изображение (если требовалась обработка)
+                   или копия исходного изображения (если обработка не нужна)
+
+    Raises:
+        ValueError: Если входное изображение пустое или недействительно
+    """
+    result, changed = normalize_image(image)
+    return result if changed else image.copy()
@@ -0,0 +1,2 @@
+# В этом модуле лежит упаковщик, который сохраняет обрезанные лица
+# в шарды фиксированного размера для быстрого чтения при обучении.
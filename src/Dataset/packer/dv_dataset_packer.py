@@ -0,0 +1,116 @@
+"""
+Модуль для упаковки обрезанных лиц датасета в хранилище тензоров.
+
+Этот модуль предоставляет функцию, которая читает датасет с обрезанными
+лицами, приводит каждое лицо к каноническому размеру и записывает их
+в шарды FaceTensorStore вместе с индексом меток. После упаковки обучение
+читает пачки лиц из отображенных в память шардов без декодирования JPEG.
+"""
+
+import cv2
+
+from src.Сonfigs import common_paths
+from src.Dataset.packer.face_tensor_store import FACE_SIZE, SHARD_SIZE, FaceTensorWriter
+from src.Dataset.utils.dataset_io import read_dataset
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.process_pool import run_in_process_pool
+
+
+def resize_face(image, face_size=FACE_SIZE):
+    """
+    Приводит кроп лица к каноническому размеру и порядку каналов.
+
+    Уменьшение выполняется через INTER_AREA, увеличение — через INTER_CUBIC.
+
+    Args:
+        image (np.ndarray): Кроп лица в BGR
+        face_size (int): Сторона лица в пикселях (по умолчанию FACE_SIZE)
+
+    Returns:
+        np.ndarray: Лицо формы (face_size, face_size, 3) в RGB
+    """
+    h, w = image.shape[:2]
+    interpolation = cv2.INTER_AREA if min(h, w) >= face_size else cv2.INTER_CUBIC
+    face = cv2.resize(image, (face_size, face_size), interpolation=interpolation)
+    return cv2.cvtColor(face, cv2.COLOR_BGR2RGB)
+
+
+def load_face(image_path, face_size=FACE_SIZE):
+    """
+    Декодирует кроп лица и приводит его к каноническому размеру (см. resize_face).
+
+    Args:
+        image_path (str): Путь к кропу лица
+        face_size (int): Сторона лица в пикселях (по умолчанию FACE_SIZE)
+
+    Returns:
+        np.ndarray or None: Лицо формы (face_size, face_size, 3) в RGB или None, если фото не читается
+    """
+    metrics = get_metrics()
+
+    with metrics.timer("pack.decode"):
+        image = cv2.imread(image_path)
+    if image is None:
+        return None
+
+    with metrics.timer("pack.resize"):
+        return resize_face(image, face_size)
+
+
+def _load_face_task(task):
+    """
+    Загружает одно лицо (выполняется в воркере).
+
+    Args:
+        task (tuple): (путь к кропу лица, сторона лица)
+
+    Returns:
+        np.ndarray or None: Результат load_face
+    """
+    image_path, face_size = task
+    return load_face(image_path, face_size)
+
+
+def process_dataset_with_face_packing(workers=1, face_size=FACE_SIZE, shard_size=SHARD_SIZE):
+    """
+    Упаковывает обрезанные лица из DV_FRAMES_CROPPED_FILTERED_CSV в хранилище тензоров.
+
+    Процесс:
+    1. Читает датасет с путями к обрезанным лицам
+    2. Декодирует каждое лицо и приводит его к размеру face_size x face_size
+    3. Записывает лица по порядку строк в шарды по shard_size штук
+    4. Сохраняет индекс (шард, смещение, метки) и meta.json в DV_FACE_TENSORS_DIR
+
+    Строки, чьи кропы не читаются, в хранилище не попадают.
+
+    Args:
+        workers (int or None): Количество процессов для декодирования (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        face_size (int): Сторона лица в пикселях (по умолчанию FACE_SIZE)
+        shard_size (int): Количество лиц в шарде (по умолчанию SHARD_SIZE)
+    """
+    df = read_dataset(common_paths.DV_FRAMES_CROPPED_FILTERED_CSV)
+
+    # Проверяем наличие обязательной колонки
+    if "image_path" not in df.columns:
+        raise ValueError("CSV must contain 'image_path' column.")
+
+    metrics = get_metrics()
+    image_paths = [str(common_paths.DV_DATASET / image_path) for image_path in df["image_path"]]
+    tasks = [(image_path, face_size) for image_path in image_paths]
+
+    # Декодируем лица (последовательно или в пуле процессов) и пишем их в шарды по порядку строк
+    with FaceTensorWriter(common_paths.DV_FACE_TENSORS_DIR, face_size, shard_size) as writer:
+        results = run_in_process_pool(_load_face_task, tasks, workers=workers)
+        rows = zip(df["profile_id"], df["image_index"], df["profile_liked"], df["image_path"], image_paths)
+        for (profile_id, image_index, profile_liked, image_path, full_path), face in zip(rows, results):
+            if face is None:
+                print(f"[WARN] Failed to read cropped face: {full_path}")
+                metrics.inc("pack.unreadable")
+                continue
+
+            writer.add(face, profile_id, image_index, profile_liked, image_path)
+            metrics.inc("pack.ok")
+
+    print(f"[INFO] Packed {writer.count} faces out of {len(df)} into {writer.shard_count} shards")
+    print(f"[INFO] Face tensor store saved to: {common_paths.DV_FACE_TENSORS_DIR}")
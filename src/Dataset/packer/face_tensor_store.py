@@ -0,0 +1,297 @@
+"""
+Модуль с хранилищем обрезанных лиц в виде шардов uint8-тензоров.
+
+Лица приводятся к одному каноническому размеру и записываются подряд
+в шарды shard_00000.npy, shard_00001.npy, ... формы (N, H, W, 3). Шарды
+сохраняются в формате .npy и открываются через memory mapping, поэтому
+чтение пачки подряд идущих лиц не декодирует файлы и не копирует данные.
+
+Рядом с шардами лежат:
+    - индекс (index.csv или index.parquet): для каждого лица номер шарда,
+      смещение в нем, profile_id, image_index, profile_liked и image_path;
+    - meta.json: размер лиц, порядок каналов и количество лиц в шардах.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+
+
+# Канонический размер стороны лица в пикселях
+FACE_SIZE = 128
+
+# Количество лиц в одном шарде (при FACE_SIZE=128 это около 100 МБ)
+SHARD_SIZE = 2048
+
+# Порядок каналов в шардах (фото декодируются OpenCV в BGR и переводятся в RGB)
+CHANNEL_ORDER = "RGB"
+
+# Колонки индекса хранилища
+INDEX_COLUMNS = ["shard", "offset", "profile_id", "image_index", "profile_liked", "image_path"]
+
+# Имена служебных файлов хранилища
+META_FILENAME = "meta.json"
+INDEX_FILENAME = "index.csv"
+SHARD_PATTERN = "shard_{:05d}.npy"
+
+
+class FaceTensorWriter:
+    """
+    Последовательная запись лиц в шарды хранилища.
+
+    Лица накапливаются в буфере размером с шард; заполненный буфер
+    сохраняется в .npy целиком, а индекс и meta.json записываются в close(),
+    поэтому незавершенная запись не оставляет хранилище, которое можно открыть.
+    """
+
+    def __init__(self, store_dir, face_size=FACE_SIZE, shard_size=SHARD_SIZE):
+        """
+        Создает папку хранилища и удаляет шарды предыдущей записи.
+
+        Args:
+            store_dir (str or Path): Папка хранилища
+            face_size (int): Сторона лица в пикселях (по умолчанию FACE_SIZE)
+            shard_size (int): Количество лиц в шарде (по умолчанию SHARD_SIZE)
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.face_size = face_size
+        self.shard_size = shard_size
+
+        # Удаляем метаданные и шарды старой записи, чтобы не смешать их с новыми
+        (self.store_dir / META_FILENAME).unlink(missing_ok=True)
+        for old_shard in self.store_dir.glob("shard_*.npy"):
+            old_shard.unlink()
+
+        self._buffer = np.empty((shard_size, face_size, face_size, 3), dtype=np.uint8)
+        self._filled = 0
+        self._shard_lengths = []
+        self._rows = []
+
+    @property
+    def count(self):
+        """
+        int: Количество добавленных лиц.
+        """
+        return len(self._rows)
+
+    @property
+    def shard_count(self):
+        """
+        int: Количество сохраненных шардов.
+        """
+        return len(self._shard_lengths)
+
+    def add(self, face, profile_id, image_index, profile_liked, image_path):
+        """
+        Добавляет лицо и его метки.
+
+        Args:
+            face (np.ndarray): Лицо формы (face_size, face_size, 3) в порядке каналов CHANNEL_ORDER
+            profile_id (int): ID анкеты
+            image_index (int): Номер фото в анкете
+            profile_liked (int): Метка лайка анкеты
+            image_path (str): Путь к исходному кропу (для отладки)
+
+        Raises:
+            ValueError: Если форма лица не совпадает с каноническим размером
+        """
+        if face.shape != self._buffer.shape[1:]:
+            raise ValueError(f"Face shape {face.shape} does not match store shape {self._buffer.shape[1:]}")
+
+        self._buffer[self._filled] = face
+        self._rows.append((len(self._shard_lengths), self._filled, profile_id, image_index,
+                           profile_liked, image_path))
+        self._filled += 1
+
+        if self._filled == self.shard_size:
+            self._flush()
+
+    def _flush(self):
+        """
+        Сохраняет заполненную часть буфера в очередной шард.
+        """
+        if self._filled == 0:
+            return
+
+        shard_path = self.store_dir / SHARD_PATTERN.format(len(self._shard_lengths))
+        tmp_path = shard_path.with_name(shard_path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, self._buffer[:self._filled])
+        os.replace(tmp_path, shard_path)
+
+        self._shard_lengths.append(self._filled)
+        self._filled = 0
+
+    def close(self):
+        """
+        Сохраняет последний шард, индекс и meta.json.
+
+        Returns:
+            int: Количество записанных лиц
+        """
+        self._flush()
+
+        index = pd.DataFrame(self._rows, columns=INDEX_COLUMNS)
+        index_path = write_dataset(index.astype({"shard": "int32", "offset": "int32"}),
+                                   self.store_dir / INDEX_FILENAME)
+
+        meta = {
+            "face_size": self.face_size,
+            "channels": 3,
+            "channel_order": CHANNEL_ORDER,
+            "dtype": "uint8",
+            "shard_lengths": self._shard_lengths,
+            "index": index_path.name,
+        }
+        with open(self.store_dir / META_FILENAME, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+        return len(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # При ошибке хранилище остается без meta.json и не открывается как готовое
+        if exc_type is None:
+            self.close()
+        return False
+
+
+class FaceTensorStore:
+    """
+    Хранилище лиц, открытое для чтения через memory mapping.
+
+    Пачки из iter_batches() — это срезы одного шарда, то есть view
+    отображенного в память файла без копирования и декодирования.
+    """
+
+    def __init__(self, store_dir):
+        """
+        Читает meta.json и индекс хранилища; шарды открываются при первом обращении.
+
+        Args:
+            store_dir (str or Path): Папка хранилища
+
+        Raises:
+            FileNotFoundError: Если в папке нет meta.json (хранилище не записано до конца)
+        """
+        self.store_dir = Path(store_dir)
+        meta_path = self.store_dir / META_FILENAME
+        if not meta_path.exists():
+            raise FileNotFoundError(f"Face tensor store not found: {meta_path}")
+
+        with open(meta_path, encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.index = read_dataset(self.store_dir / self.meta["index"])
+        self.shard_lengths = self.meta["shard_lengths"]
+
+        # Метки в виде numpy-массивов, выровненных с порядком лиц в шардах
+        self.profile_id = self.index["profile_id"].to_numpy()
+        self.image_index = self.index["image_index"].to_numpy()
+        self.profile_liked = self.index["profile_liked"].to_numpy()
+
+        self._shard_starts = np.concatenate([[0], np.cumsum(self.shard_lengths)]).astype(np.int64)
+        self._shards = {}
+
+    def __len__(self):
+        return int(self._shard_starts[-1])
+
+    @property
+    def face_shape(self):
+        """
+        tuple: Форма одного лица (H, W, 3).
+        """
+        size = self.meta["face_size"]
+        return size, size, self.meta["channels"]
+
+    def shard(self, shard_id):
+        """
+        Возвращает шард как массив, отображенный в память.
+
+        Args:
+            shard_id (int): Номер шарда
+
+        Returns:
+            np.memmap: Массив формы (N, H, W, 3) только для чтения
+        """
+        shard = self._shards.get(shard_id)
+        if shard is None:
+            shard_path = self.store_dir / SHARD_PATTERN.format(shard_id)
+            shard = self._shards[shard_id] = np.load(shard_path, mmap_mode="r")
+        return shard
+
+    def __getitem__(self, position):
+        """
+        Возвращает одно лицо по сквозному номеру (view шарда без копирования).
+
+        Args:
+            position (int): Номер лица от 0 до len(store) - 1
+
+        Returns:
+            np.ndarray: Лицо формы (H, W, 3)
+        """
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError(f"Face index out of range: {position}")
+
+        shard_id = int(np.searchsorted(self._shard_starts, position, side="right")) - 1
+        return self.shard(shard_id)[position - self._shard_starts[shard_id]]
+
+    def take(self, positions):
+        """
+        Собирает лица по произвольным сквозным номерам (копирует данные в новый массив).
+
+        Args:
+            positions (array-like): Номера лиц
+
+        Returns:
+            np.ndarray: Массив формы (len(positions), H, W, 3)
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        shard_ids = np.searchsorted(self._shard_starts, positions, side="right") - 1
+
+        batch = np.empty((len(positions), *self.face_shape), dtype=np.uint8)
+        for shard_id in np.unique(shard_ids):
+            mask = shard_ids == shard_id
+            batch[mask] = self.shard(int(shard_id))[positions[mask] - self._shard_starts[shard_id]]
+        return batch
+
+    def iter_batches(self, batch_size=256, shuffle=False, seed=None):
+        """
+        Перебирает хранилище пачками подряд идущих лиц без копирования.
+
+        Пачка не пересекает границу шарда, поэтому последняя пачка шарда может
+        быть короче batch_size. При shuffle=True перемешивается порядок пачек
+        (по всем шардам сразу), а лица внутри пачки остаются подряд — так
+        пачки остаются view и читаются с диска последовательно.
+
+        Args:
+            batch_size (int): Максимальный размер пачки (по умолчанию 256)
+            shuffle (bool): Перемешать порядок пачек (по умолчанию False)
+            seed (int or None): Зерно генератора для перемешивания
+
+        Yields:
+            tuple: (np.ndarray лиц формы (n, H, W, 3), np.ndarray profile_liked,
+                    slice сквозных номеров лиц для доступа к остальным меткам)
+        """
+        batches = [
+            (shard_id, start, min(start + batch_size, length))
+            for shard_id, length in enumerate(self.shard_lengths)
+            for start in range(0, length, batch_size)
+        ]
+        if shuffle:
+            np.random.default_rng(seed).shuffle(batches)
+
+        for shard_id, start, stop in batches:
+            offset = int(self._shard_starts[shard_id])
+            positions = slice(offset + start, offset + stop)
+            yield self.shard(shard_id)[start:stop], self.profile_liked[positions], positions
@@ -0,0 +1,2 @@
+# В этом модуле находятся сквозные режимы пайплайна, объединяющие
+# несколько стадий обработки датасета в один проход.
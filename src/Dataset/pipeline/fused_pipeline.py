@@ -0,0 +1,201 @@
+"""
+Модуль со сквозным режимом удаления фильтров и обрезки лиц.
+
+Этот модуль предоставляет функцию, которая за один проход декодирует каждое
+фото из DV_FRAMES_CSV один раз, в памяти применяет normalize_image
+и обрезку до лица и сохраняет только итоговый кроп. Промежуточные фото
+в photos_unfiltered/ и CSV DV_FRAMES_UNFILTERED_CSV записываются по желанию.
+"""
+
+from functools import partial
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from src.Сonfigs import common_paths
+from src.Dataset.cropper.face_cropper import CROP_MARGIN, SCORE_THRESHOLD, crop_face_from_array, get_crop_params
+from src.Dataset.detector.face_detection_engine import MIN_DETECTION_CONFIDENCE, get_face_detection_engine
+from src.Dataset.filter_remover.dv_dataset_filter_remover import resolve_frame_paths
+from src.Dataset.filter_remover.image_normalizer import normalize_image
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.photo_index import group_duplicate_paths
+from src.Dataset.utils.process_pool import run_in_process_pool
+
+
+def _init_fused_worker(min_detection_confidence, detector_backend):
+    """
+    Инициализирует процесс-воркер: заранее загружает собственный детектор лиц.
+
+    Детектор создается с порогом и бэкендом стадии, иначе первая задача
+    воркера закрыла бы его и загрузила модель заново.
+
+    Args:
+        min_detection_confidence (float): Минимальная уверенность детектора лиц
+        detector_backend (str): Бэкенд детекции лиц
+    """
+    get_face_detection_engine(min_detection_confidence, detector_backend)
+
+
+def _fused_task(task):
+    """
+    Обрабатывает одно фото: декодирует, нормализует и обрезает до лица в памяти.
+
+    Имена файлов совпадают с поэтапным пайплайном: нормализованное фото
+    называется <stem>_unfiltered<suffix>, а кроп — <имя источника кропа>_cropped<suffix>.
+
+    Args:
+        task (tuple): (путь к исходному фото, путь без префикса, сохранять ли промежуточное фото,
+                       параметры обрезки из get_crop_params)
+
+    Returns:
+        tuple: (статус, имя нормализованного фото или None, если нормализатор его не менял,
+                имя файла кропа или None, сообщение),
+               где статус — "ok", "no_face", "unreadable" или "error"
+    """
+    src_path, clean_rel_path, write_intermediate, crop_params = task
+
+    # Декодируем фото один раз
+    image = cv2.imread(src_path)
+    if image is None:
+        return "unreadable", None, None, f"Failed to read image: {src_path}"
+
+    filename = Path(clean_rel_path).name
+    stem = Path(filename).stem
+    suffix = Path(filename).suffix
+
+    message = None
+    try:
+        # Применяем адаптивное удаление фильтров
+        normalized_image, changed = normalize_image(image)
+    except Exception as e:
+        # Как и поэтапный пайплайн, при ошибке нормализации обрезаем исходное фото
+        message = f"Failed to process {src_path}: {e}"
+        normalized_image = image
+        changed = False
+
+    unfiltered_filename = None
+    if changed:
+        stem = f"{stem}_unfiltered"
+        unfiltered_filename = f"{stem}{suffix}"
+        if write_intermediate:
+            cv2.imwrite(str(common_paths.DV_PHOTOS_UNFILTERED_DIR / unfiltered_filename), normalized_image)
+
+    # Обрезаем до лица прямо в памяти, без повторного декодирования
+    cropped = crop_face_from_array(normalized_image, **crop_params)
+    if cropped is None:
+        return ("error" if message else "no_face"), unfiltered_filename, None, message
+
+    cropped_filename = f"{stem}_cropped{suffix}"
+    cv2.imwrite(str(common_paths.DV_CROPPED_FACES_DIR / cropped_filename), cropped)
+    return ("error" if message else "ok"), unfiltered_filename, cropped_filename, message
+
+
+def process_dataset_fused(workers=1, min_size=80, score_threshold=SCORE_THRESHOLD,
+                          min_detection_confidence=MIN_DETECTION_CONFIDENCE, margin=CROP_MARGIN,
+                          write_intermediate=False, detector_backend=None):
+    """
+    Удаляет фильтры и обрезает фото до лиц за один проход по датасету.
+
+    Процесс:
+    1. Читает датасет из DV_FRAMES_CSV
+    2. Для каждого уникального фото (дубликаты обрабатываются один раз):
+       - определяет путь к файлу (photos/ или photos_extracted/)
+       - декодирует фото один раз
+       - применяет нормализацию фильтров в памяти
+       - обрезает результат до лица в памяти и сохраняет кроп в DV_CROPPED_FACES_DIR
+    3. Сохраняет датасет кропов в DV_FRAMES_CROPPED_FILTERED_CSV
+    4. Если write_intermediate=True, дополнительно сохраняет нормализованные фото
+       в DV_PHOTOS_UNFILTERED_DIR и датасет DV_FRAMES_UNFILTERED_CSV
+
+    В отличие от поэтапного запуска, нормализованное фото не проходит через
+    промежуточное JPEG-сжатие, поэтому кроп получается на одно поколение потерь чище.
+
+    Args:
+        workers (int or None): Количество процессов (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        min_size (int): Минимальный размер стороны обрезанного лица (по умолчанию 80)
+        score_threshold (float): Минимальная уверенность лучшего лица (по умолчанию SCORE_THRESHOLD)
+        min_detection_confidence (float): Минимальная уверенность детектора (по умолчанию 0.5)
+        margin (float): Отступ вокруг рамки лица в долях ее размера (по умолчанию CROP_MARGIN)
+        write_intermediate (bool): Сохранять ли промежуточные нормализованные фото и CSV (по умолчанию False)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+    """
+    # Создаем директории для результатов
+    common_paths.DV_CROPPED_FACES_DIR.mkdir(parents=True, exist_ok=True)
+    if write_intermediate:
+        common_paths.DV_PHOTOS_UNFILTERED_DIR.mkdir(parents=True, exist_ok=True)
+
+    # Читаем исходный датасет
+    df = read_dataset(common_paths.DV_FRAMES_CSV)
+
+    # Проверяем наличие необходимой колонки
+    if "image_path" not in df.columns:
+        raise ValueError("CSV must contain 'image_path' column.")
+
+    crop_params = get_crop_params(min_size, score_threshold, min_detection_confidence, margin=margin,
+                                  detector_backend=detector_backend)
+
+    # Определяем пути ко всем исходным фото сразу
+    index, resolved = resolve_frame_paths(df["image_path"])
+    found_mask = resolved["found"].to_numpy()
+    for rel_path in df["image_path"][~found_mask]:
+        print(f"[WARNING] Image not found in 'photos' nor 'photos_extracted': {rel_path}")
+
+    found = resolved[found_mask]
+    src_paths = index.source_paths(found)
+    clean_rel_paths = found["clean_rel_path"].to_numpy()
+
+    # Строки с одним и тем же исходным файлом (дубликаты после дедупликации)
+    # обрабатываются один раз, результат копируется на всю группу
+    first_positions, groups = group_duplicate_paths(src_paths)
+    tasks = [
+        (src_paths[i], clean_rel_paths[i], write_intermediate, crop_params)
+        for i in first_positions
+    ]
+
+    # Обрабатываем уникальные фото (последовательно или в пуле процессов)
+    unique_unfiltered = [None] * len(tasks)
+    unique_cropped = [None] * len(tasks)
+    initializer = partial(_init_fused_worker, crop_params["min_detection_confidence"], crop_params["detector_backend"])
+    results = run_in_process_pool(_fused_task, tasks, workers=workers, initializer=initializer)
+    for i, (status, unfiltered_filename, cropped_filename, message) in enumerate(results):
+        if status == "unreadable":
+            print(f"[WARNING] {message}")
+        elif message is not None:
+            print(f"[ERROR] {message}")
+
+        if unfiltered_filename is not None:
+            unique_unfiltered[i] = f"photos_unfiltered/{unfiltered_filename}"
+
+        if cropped_filename is not None:
+            unique_cropped[i] = f"photos_cropped/{cropped_filename}"
+
+    # Завершаем генератор результатов, чтобы сразу освободить пул процессов
+    results.close()
+
+    # Раздаем результаты уникальных фото всем строкам их групп
+    unfiltered_paths = list(df["image_path"])
+    cropped_paths = [None] * len(df)
+    for position, group in zip(np.flatnonzero(found_mask), groups):
+        if unique_unfiltered[group] is not None:
+            unfiltered_paths[position] = unique_unfiltered[group]
+        cropped_paths[position] = unique_cropped[group]
+
+    # Сохраняем промежуточный датасет, если он нужен
+    if write_intermediate:
+        df_unfiltered = df.copy()
+        df_unfiltered["image_path"] = unfiltered_paths
+        unfiltered_path = write_dataset(df_unfiltered, common_paths.DV_FRAMES_UNFILTERED_CSV)
+        print(f"[INFO] Processed dataset saved to: {unfiltered_path}")
+        print(f"[INFO] Processed images saved to: {common_paths.DV_PHOTOS_UNFILTERED_DIR}")
+
+    # Оставляем только строки, для которых найдено лицо
+    kept_mask = [path is not None for path in cropped_paths]
+    df_out = df[kept_mask].copy()
+    df_out["image_path"] = [path for path in cropped_paths if path is not None]
+    output_path = write_dataset(df_out, common_paths.DV_FRAMES_CROPPED_FILTERED_CSV)
+
+    print(f"[INFO] Filtered dataset saved to: {output_path}")
+    print(f"[INFO] Kept {len(df_out)} rows out of {len(df)}")
+    print(f"[INFO] Cropped faces saved to: {common_paths.DV_CROPPED_FACES_DIR}")
@@ -0,0 +1,265 @@
+"""
+Модуль для чтения и записи датасетов стадий в CSV или Parquet.
+
+Стадии передают друг другу датасеты с колонками profile_id, image_path,
+image_index и profile_liked. Кроме CSV поддерживается колоночный формат
+Parquet с явной компактной схемой: profile_id и image_index хранятся как
+int32, profile_liked — как int8, а image_path — строками со словарным кодированием страниц
+и сжатием zstd. Формат записи берется
+из конфигурации пайплайна (dataset_format), а при чтении определяется
+автоматически: Parquet-файл лежит рядом с CSV с тем же именем и расширением
+.parquet, и читается тот из них, что был записан последним.
+
+Parquet требует пакет pyarrow, который импортируется только при обращении
+к этому формату.
+"""
+
+from pathlib import Path
+
+import pandas as pd
+
+
+# Поддерживаемые форматы датасетов
+FORMAT_CSV = "csv"
+FORMAT_PARQUET = "parquet"
+DATASET_FORMATS = (FORMAT_CSV, FORMAT_PARQUET)
+
+# Компактные типы целочисленных колонок датасета
+# (у анкеты может быть больше 127 фото, поэтому image_index не int8)
+DATASET_DTYPES = {
+    "profile_id": "int32",
+    "image_index": "int32",
+    "profile_liked": "int8",
+}
+
+# Сигнатура файла Parquet (первые и последние 4 байта)
+_PARQUET_MAGIC = b"PAR1"
+
+
+def _import_pyarrow():
+    """
+    Импортирует pyarrow по требованию.
+
+    Returns:
+        tuple: (модуль pyarrow, модуль pyarrow.parquet)
+
+    Raises:
+        ImportError: Если pyarrow не установлен
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Parquet datasets require pyarrow: pip install pyarrow") from e
+    return pa, pq
+
+
+def get_arrow_schema(columns, df=None):
+    """
+    Возвращает явную схему Arrow для колонок датасета.
+
+    Целочисленные колонки получают компактные типы из DATASET_DTYPES,
+    image_path хранится строками (при записи Parquet кодирует их словарем
+    по страницам). Типы прочих колонок берутся из df, если он передан,
+    иначе они тоже хранятся как строки.
+
+    Args:
+        columns (iterable): Имена колонок в порядке записи
+        df (pd.DataFrame or None): Пример данных для вывода типов прочих колонок
+
+    Returns:
+        pyarrow.Schema: Схема таблицы
+    """
+    pa, _ = _import_pyarrow()
+    types = {
+        "profile_id": pa.int32(),
+        "image_path": pa.string(),
+        "image_index": pa.int32(),
+        "profile_liked": pa.int8(),
+    }
+    if df is not None:
+        inferred = pa.Schema.from_pandas(df, preserve_index=False)
+        types = {**{field.name: field.type for field in inferred}, **types}
+    return pa.schema([(column, types.get(column, pa.string())) for column in columns])
+
+
+def get_dataset_format(dataset_format=None):
+    """
+    Определяет формат записи датасетов.
+
+    Args:
+        dataset_format (str or None): Явно заданный формат; None — формат из конфигурации пайплайна
+
+    Returns:
+        str: FORMAT_CSV или FORMAT_PARQUET
+
+    Raises:
+        ValueError: Если формат не поддерживается
+    """
+    if dataset_format is None:
+        from src.Сonfigs.pipeline_config import get_config
+        dataset_format = get_config().dataset_format
+
+    if dataset_format not in DATASET_FORMATS:
+        raise ValueError(f"Unsupported dataset format: {dataset_format!r} (expected one of {DATASET_FORMATS})")
+    return dataset_format
+
+
+def dataset_output_path(path, dataset_format=None):
+    """
+    Возвращает путь файла датасета для заданного формата.
+
+    Args:
+        path (str or Path): Базовый путь датасета (обычно с расширением .csv)
+        dataset_format (str or None): Формат записи (по умолчанию из конфигурации)
+
+    Returns:
+        Path: Путь с расширением .csv или .parquet
+    """
+    dataset_format = get_dataset_format(dataset_format)
+    return Path(path).with_suffix(".parquet" if dataset_format == FORMAT_PARQUET else ".csv")
+
+
+def resolve_dataset_path(path):
+    """
+    Находит файл датасета среди CSV и Parquet с тем же именем.
+
+    Если существуют оба файла, выбирается записанный последним.
+
+    Args:
+        path (str or Path): Путь датасета с любым из расширений
+
+    Returns:
+        Path: Путь к существующему файлу (или исходный путь, если не найден ни один)
+    """
+    path = Path(path)
+    candidates = [p for p in (path.with_suffix(".csv"), path.with_suffix(".parquet")) if p.exists()]
+    if not candidates:
+        return path
+    return max(candidates, key=lambda p: p.stat().st_mtime_ns)
+
+
+def _is_parquet(path):
+    """
+    Проверяет по сигнатуре, является ли файл Parquet.
+
+    Args:
+        path (Path): Путь к файлу
+
+    Returns:
+        bool: True для файла Parquet
+    """
+    with open(path, "rb") as f:
+        return f.read(4) == _PARQUET_MAGIC
+
+
+def read_dataset(path, categorical=False):
+    """
+    Читает датасет стадии, автоматически определяя формат.
+
+    Строковые колонки Parquet читаются как string[pyarrow] без создания
+    Python-объектов для каждой строки, поэтому чтение во много раз быстрее CSV.
+
+    Args:
+        path (str or Path): Путь датасета (CSV или Parquet; см. resolve_dataset_path)
+        categorical (bool): Преобразовать image_path в категориальную колонку
+                            (выгодно, если пути повторяются)
+
+    Returns:
+        pd.DataFrame: Датасет с компактными типами колонок из DATASET_DTYPES
+    """
+    path = resolve_dataset_path(path)
+
+    if _is_parquet(path):
+        pa, pq = _import_pyarrow()
+        string_dtype = pd.StringDtype("pyarrow")
+        df = pq.read_table(path).to_pandas(
+            types_mapper={pa.string(): string_dtype, pa.large_string(): string_dtype}.get
+        )
+    else:
+        df = pd.read_csv(path, dtype=DATASET_DTYPES)
+
+    if categorical and "image_path" in df.columns:
+        df["image_path"] = df["image_path"].astype("category")
+
+    return df
+
+
+def _to_compact_types(df):
+    """
+    Приводит известные колонки датасета к компактным целочисленным типам.
+
+    Args:
+        df (pd.DataFrame): Датасет
+
+    Returns:
+        pd.DataFrame: Датасет с колонками int32/int8
+    """
+    return df.astype({column: dtype for column, dtype in DATASET_DTYPES.items() if column in df.columns})
+
+
+def write_dataset(df, path, dataset_format=None):
+    """
+    Записывает датасет стадии в CSV или Parquet.
+
+    Args:
+        df (pd.DataFrame): Датасет
+        path (str or Path): Базовый путь датасета (расширение заменяется по формату)
+        dataset_format (str or None): Формат записи (по умолчанию из конфигурации)
+
+    Returns:
+        Path: Путь к записанному файлу
+    """
+    output_path = dataset_output_path(path, dataset_format)
+    df = _to_compact_types(df)
+
+    if output_path.suffix == ".parquet":
+        pa, pq = _import_pyarrow()
+        table = pa.Table.from_pandas(df, schema=get_arrow_schema(df.columns, df), preserve_index=False)
+        pq.write_table(table, output_path, compression="zstd")
+    else:
+        df.to_csv(output_path, index=False, encoding="utf-8")
+
+    return output_path
+
+
+class ParquetDatasetWriter:
+    """
+    Потоковая запись датасета в Parquet пачками (по одной группе строк на пачку).
+    """
+
+    def __init__(self, path, columns):
+        """
+        Открывает файл Parquet для записи.
+
+        Args:
+            path (str or Path): Путь к файлу
+            columns (list): Колонки датасета
+        """
+        pa, pq = _import_pyarrow()
+        self._pa = pa
+        self.schema = get_arrow_schema(columns)
+        self._writer = pq.ParquetWriter(str(path), self.schema, compression="zstd")
+
+    def write(self, df):
+        """
+        Записывает очередную пачку строк.
+
+        Args:
+            df (pd.DataFrame): Пачка строк с колонками датасета
+        """
+        table = self._pa.Table.from_pandas(_to_compact_types(df), schema=self.schema, preserve_index=False)
+        self._writer.write_table(table)
+
+    def close(self):
+        """
+        Дописывает метаданные и закрывает файл.
+        """
+        self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
@@ -0,0 +1,99 @@
+"""
+Модуль для декодирования уменьшенных копий фото.
+
+Детектору лиц и перцептивному хэшу не нужно полное разрешение фото
+с телефона: декодер JPEG умеет сразу получать копию в 2, 4 или 8 раз
+меньше (cv2.IMREAD_REDUCED_COLOR_*), пропуская большую часть работы.
+Коэффициент уменьшения выбирается заранее по размеру из заголовка JPEG,
+без декодирования самого фото.
+"""
+
+import struct
+
+import cv2
+
+
+# Коэффициенты уменьшения, которые поддерживает декодер, и соответствующие флаги
+REDUCED_COLOR_FLAGS = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+# Маркеры JPEG с размером кадра (SOF0-SOF15, кроме DHT, JPG и DAC)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_image_size(image_path):
+    """
+    Читает размер JPEG-фото из заголовка, не декодируя фото.
+
+    Args:
+        image_path (str): Путь к фото
+
+    Returns:
+        tuple or None: (высота, ширина) без учета поворота из EXIF или None,
+                       если файл не JPEG или заголовок не читается
+    """
+    try:
+        with open(image_path, "rb") as f:
+            if f.read(2) != b"\xff\xd8":
+                return None
+            while True:
+                marker = f.read(2)
+                if len(marker) < 2 or marker[0] != 0xFF:
+                    return None
+                # Заполняющие байты 0xFF перед маркером
+                while marker[1] == 0xFF:
+                    marker = marker[1:] + f.read(1)
+                length = struct.unpack(">H", f.read(2))[0]
+                if marker[1] in _SOF_MARKERS:
+                    _, height, width = struct.unpack(">BHH", f.read(5))
+                    return height, width
+                f.seek(length - 2, 1)
+    except (OSError, struct.error):
+        return None
+
+
+def choose_reduction(height, width, min_side):
+    """
+    Выбирает наибольшее уменьшение, при котором меньшая сторона копии не меньше min_side.
+
+    Args:
+        height (int): Высота фото
+        width (int): Ширина фото
+        min_side (int): Минимальная меньшая сторона уменьшенной копии
+
+    Returns:
+        int: Коэффициент уменьшения (1, 2, 4 или 8)
+    """
+    for factor in sorted(REDUCED_COLOR_FLAGS, reverse=True):
+        if min(height, width) // factor >= min_side:
+            return factor
+    return 1
+
+
+def read_preview(image_path, min_side):
+    """
+    Декодирует уменьшенную копию фото.
+
+    Args:
+        image_path (str): Путь к фото
+        min_side (int): Минимальная меньшая сторона копии
+
+    Returns:
+        tuple: (копия в BGR или None, если фото не читается,
+                коэффициент уменьшения,
+                (высота, ширина) полного фото с учетом поворота или None, если известен только размер копии)
+    """
+    size = read_image_size(image_path)
+    factor = 1 if size is None else choose_reduction(*size, min_side)
+    if factor == 1:
+        image = cv2.imread(image_path)
+        return image, 1, None if image is None else image.shape[:2]
+
+    preview = cv2.imread(image_path, REDUCED_COLOR_FLAGS[factor])
+    if preview is None:
+        return None, factor, None
+
+    # cv2.imread поворачивает фото по EXIF, а заголовок хранит размер без поворота
+    height, width = size
+    if (preview.shape[0] > preview.shape[1]) != (height > width):
+        height, width = width, height
+    return preview, factor, (height, width)
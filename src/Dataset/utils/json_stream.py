@@ -0,0 +1,146 @@
+"""
+Модуль для потокового чтения больших JSON-файлов экспорта Telegram.
+
+Этот модуль предоставляет генератор, который читает файл кусками и по одному
+разбирает элементы массива верхнего уровня (например, "messages" в result.json),
+не загружая весь документ в память.
+"""
+
+import json
+
+
+class _JsonChunkReader:
+    """
+    Буфер поверх текстового файла, подчитывающий данные по мере разбора.
+    """
+
+    _WHITESPACE = " \t\n\r"
+
+    def __init__(self, f, chunk_size):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _read_more(self):
+        """
+        Дочитывает следующий кусок файла, отбрасывая уже разобранную часть буфера.
+
+        Returns:
+            bool: True, если удалось прочитать новые данные
+        """
+        if self.eof:
+            return False
+
+        chunk = self._file.read(self._chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """
+        Возвращает следующий непробельный символ, не сдвигая позицию.
+
+        Returns:
+            str: Символ или пустая строка, если файл закончился
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in self._WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read_more():
+                return ""
+
+    def expect(self, char):
+        """
+        Проверяет, что следующий непробельный символ равен char, и пропускает его.
+
+        Raises:
+            ValueError: Если встречен другой символ
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' at offset {self.pos}, got '{found}'.")
+        self.pos += 1
+
+    def decode_value(self):
+        """
+        Разбирает одно JSON-значение, начиная с текущей позиции.
+
+        Если значение обрывается на границе куска, дочитывает файл и повторяет разбор.
+
+        Returns:
+            object: Разобранное значение
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self.buffer, self.pos)
+                # Число или литерал на самой границе буфера может быть обрезан
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._read_more()
+
+
+def iter_json_array(path, key="messages", chunk_size=1 << 20):
+    """
+    Потоково перебирает элементы массива key из JSON-объекта верхнего уровня.
+
+    Значения других ключей верхнего уровня разбираются и сразу отбрасываются.
+    В памяти одновременно находится только текущий кусок файла и текущий элемент.
+
+    Args:
+        path (str or Path): Путь к JSON-файлу
+        key (str): Ключ массива в объекте верхнего уровня (по умолчанию "messages")
+        chunk_size (int): Размер читаемого куска в символах (по умолчанию 1 МБ)
+
+    Yields:
+        object: Очередной элемент массива
+
+    Raises:
+        ValueError: Если файл не является JSON-объектом или значение key не массив
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        reader = _JsonChunkReader(f, chunk_size)
+        reader.expect("{")
+
+        while True:
+            char = reader.peek()
+            if char == "}" or char == "":
+                return
+            if char == ",":
+                reader.pos += 1
+                continue
+
+            # Читаем ключ и двоеточие
+            current_key = reader.decode_value()
+            reader.expect(":")
+
+            if current_key != key:
+                # Значение другого ключа нам не нужно
+                reader.decode_value()
+                continue
+
+            reader.expect("[")
+            while True:
+                char = reader.peek()
+                if char == "]":
+                    reader.pos += 1
+                    return
+                if char == ",":
+                    reader.pos += 1
+                    continue
+                if char == "":
+                    raise ValueError(f"Invalid JSON: unterminated array '{key}'.")
+                yield reader.decode_value()
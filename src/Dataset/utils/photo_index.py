@@ -0,0 +1,148 @@
+"""
+Модуль с индексом фото датасета для векторного разрешения путей.
+
+Этот модуль предоставляет класс, который один раз перечисляет файлы в папках
+с фото датасета (photos/, photos_extracted/, photos_unfiltered/) и по этому
+индексу разрешает всю колонку image_path строковыми операциями pandas,
+без iterrows() и без отдельного вызова Path.exists() для каждой строки.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+
+# Папки с фото внутри датасета
+PHOTOS_DIR = "photos"
+PHOTOS_EXTRACTED_DIR = "photos_extracted"
+PHOTOS_UNFILTERED_DIR = "photos_unfiltered"
+PHOTO_DIRS = (PHOTOS_DIR, PHOTOS_EXTRACTED_DIR, PHOTOS_UNFILTERED_DIR)
+
+
+class PhotoIndex:
+    """
+    Индекс файлов в папках с фото датасета.
+
+    Каждая папка перечисляется один раз при создании индекса, поэтому индекс
+    нужно создавать заново после стадий, которые пишут новые фото.
+    """
+
+    def __init__(self, dataset_dir, dir_names=PHOTO_DIRS):
+        """
+        Перечисляет файлы в папках с фото.
+
+        Args:
+            dataset_dir (str or Path): Папка датасета
+            dir_names (iterable): Имена папок с фото внутри датасета
+        """
+        self.dataset_dir = dataset_dir
+        self.files = {dir_name: self._list_files(os.path.join(dataset_dir, dir_name)) for dir_name in dir_names}
+
+    @staticmethod
+    def _list_files(directory):
+        """
+        Рекурсивно перечисляет файлы папки.
+
+        Args:
+            directory (str): Путь к папке
+
+        Returns:
+            set: Относительные пути файлов с разделителем "/" (пустое множество, если папки нет)
+        """
+        files = set()
+        for root, _, names in os.walk(directory):
+            rel_root = os.path.relpath(root, directory).replace(os.sep, "/")
+            prefix = "" if rel_root == "." else rel_root + "/"
+            files.update(prefix + name for name in names)
+        return files
+
+    def resolve(self, image_paths, prefixes, search_order, prefix_selects_dir=False):
+        """
+        Разрешает пути к исходным фото для всей колонки image_path.
+
+        У каждого пути отрезается один из префиксов prefixes ("photos/" и т.д.),
+        после чего фото ищется по индексу в папках search_order по порядку.
+        Если prefix_selects_dir=True, путь с префиксом ищется только в папке
+        этого префикса, а порядок search_order действует для путей без префикса.
+
+        Args:
+            image_paths (pd.Series): Колонка image_path
+            prefixes (iterable): Имена папок, префиксы которых отрезаются
+            search_order (iterable): Имена папок в порядке поиска
+            prefix_selects_dir (bool): Искать ли путь с префиксом только в папке префикса
+
+        Returns:
+            pd.DataFrame: Колонки с тем же индексом, что у image_paths:
+                          "clean_rel_path" — путь без префикса,
+                          "source_dir" — папка, где найдено фото (None, если не найдено),
+                          "found" — найдено ли фото
+        """
+        is_str = image_paths.map(lambda value: isinstance(value, str))
+        paths = image_paths.where(is_str, "").astype(str)
+
+        prefix_pattern = "^(" + "|".join(sorted(map(str, prefixes), key=len, reverse=True)) + ")/"
+        prefix = paths.str.extract(prefix_pattern, expand=False)
+        clean = paths.str.replace(prefix_pattern, "", regex=True)
+
+        source_dir = pd.Series(None, index=image_paths.index, dtype=object)
+        found = pd.Series(False, index=image_paths.index)
+        for dir_name in search_order:
+            candidates = is_str & ~found
+            if prefix_selects_dir:
+                candidates &= prefix.isna() | (prefix == dir_name)
+            hit = candidates & clean.isin(self.files.get(dir_name, ()))
+            source_dir[hit] = dir_name
+            found |= hit
+
+        return pd.DataFrame({"clean_rel_path": clean, "source_dir": source_dir, "found": found})
+
+    def source_paths(self, resolved):
+        """
+        Возвращает полные пути к найденным фото.
+
+        Args:
+            resolved (pd.DataFrame): Результат resolve (только строки с found=True)
+
+        Returns:
+            list: Пути к фото в виде строк
+        """
+        return [
+            os.path.join(self.dataset_dir, source_dir, clean_rel_path)
+            for source_dir, clean_rel_path in zip(resolved["source_dir"], resolved["clean_rel_path"])
+        ]
+
+
+def split_filenames(clean_rel_paths):
+    """
+    Векторно делит пути на основу имени и расширение (как Path.stem и Path.suffix).
+
+    Args:
+        clean_rel_paths (pd.Series): Пути к фото без префикса папки
+
+    Returns:
+        tuple: (pd.Series основ имен, pd.Series расширений с точкой или "")
+    """
+    names = clean_rel_paths.str.rsplit("/", n=1).str[-1]
+    parts = names.str.extract(r"^(.+?)(\.[^.]+)?$")
+    return parts[0], parts[1].fillna("")
+
+
+def group_duplicate_paths(paths):
+    """
+    Группирует одинаковые пути, чтобы каждый файл обрабатывался один раз.
+
+    После стадии дедупликации строки с дубликатами фото указывают на один
+    канонический файл: его достаточно обработать один раз, а результат
+    раздать всем строкам группы.
+
+    Args:
+        paths (list): Пути к фото
+
+    Returns:
+        tuple: (np.ndarray номеров первых вхождений уникальных путей по порядку,
+                np.ndarray номера уникального пути для каждого элемента paths)
+    """
+    codes, _ = pd.factorize(pd.Series(paths, dtype=object))
+    _, first_positions = np.unique(codes, return_index=True)
+    return first_positions, codes
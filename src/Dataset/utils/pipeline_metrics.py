@@ -0,0 +1,406 @@
+"""
+Модуль с инструментированием стадий пайплайна.
+
+Этот модуль предоставляет общий для процесса реестр метрик: время отдельных
+шагов (декодирование, детекция, нормализация, кодирование и т.д.) в виде
+гистограмм, счетчики исходов обработки и пиковое потребление памяти (RSS).
+Метрики воркеров пула процессов передаются родителю вместе с результатами
+задач и суммируются. В конце запуска отчет сохраняется в JSON и в текстовом
+формате Prometheus.
+
+По умолчанию сбор выключен: timer() возвращает общий пустой контекстный
+менеджер, а inc() и observe() сразу возвращаются, поэтому накладные расходы
+сводятся к одной проверке флага. Включенный реестр можно обновлять из
+нескольких потоков (например, из потоков чтения и записи фото).
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    # На Windows модуля resource нет: пиковая память не отслеживается
+    resource = None
+
+
+# Верхние границы корзин гистограмм времени в секундах (как в клиентах Prometheus)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Префикс имен метрик в формате Prometheus
+PROMETHEUS_PREFIX = "daivision"
+
+# Общий пустой контекстный менеджер для выключенного сбора
+_NULL_TIMER = nullcontext()
+
+
+def get_peak_rss_bytes():
+    """
+    Возвращает пиковый размер резидентной памяти текущего процесса.
+
+    Returns:
+        int or None: Пиковый RSS в байтах или None, если платформа его не сообщает
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux сообщает значение в килобайтах, macOS — в байтах
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class _Histogram:
+    """
+    Гистограмма длительностей с фиксированными корзинами LATENCY_BUCKETS.
+    """
+
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def observe(self, seconds):
+        """
+        Добавляет одно наблюдение.
+
+        Args:
+            seconds (float): Длительность в секундах
+        """
+        self.counts[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, data):
+        """
+        Добавляет наблюдения из сериализованной гистограммы (см. to_dict).
+
+        Args:
+            data (dict): Сериализованная гистограмма
+        """
+        self.counts = [a + b for a, b in zip(self.counts, data["counts"])]
+        self.count += data["count"]
+        self.total += data["total"]
+        for name, pick in (("min", min), ("max", max)):
+            if data[name] is not None:
+                current = getattr(self, name)
+                setattr(self, name, data[name] if current is None else pick(current, data[name]))
+
+    def quantile(self, q):
+        """
+        Оценивает квантиль по корзинам (верхняя граница корзины, как histogram_quantile).
+
+        Args:
+            q (float): Квантиль от 0 до 1
+
+        Returns:
+            float or None: Оценка квантиля в секундах или None, если наблюдений нет
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS, self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """
+        Сериализует гистограмму для передачи между процессами.
+
+        Returns:
+            dict: Корзины, количество, сумма, минимум и максимум
+        """
+        return {"counts": list(self.counts), "count": self.count, "total": self.total,
+                "min": self.min, "max": self.max}
+
+
+class _Timer:
+    """
+    Контекстный менеджер, добавляющий длительность блока в гистограмму.
+    """
+
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics, name):
+        self._metrics = metrics
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+        return False
+
+
+class PipelineMetrics:
+    """
+    Реестр метрик пайплайна: гистограммы времени шагов и счетчики исходов.
+
+    Имена шагов и счетчиков имеют вид "<стадия>.<шаг>", например
+    "crop.decode" или "video.no_face".
+    """
+
+    def __init__(self, enabled=False):
+        """
+        Инициализирует пустой реестр.
+
+        Args:
+            enabled (bool): Включен ли сбор метрик (по умолчанию False)
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Очищает все собранные метрики (флаг enabled не меняется).
+        """
+        self.timers = {}
+        self.counters = {}
+        self.worker_peak_rss = None
+
+    def timer(self, name):
+        """
+        Возвращает контекстный менеджер, замеряющий время блока.
+
+        Args:
+            name (str): Имя шага
+
+        Returns:
+            Контекстный менеджер (пустой, если сбор выключен)
+        """
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def time_each(self, iterable, name):
+        """
+        Перебирает элементы и замеряет время обработки каждого из них вызывающим кодом.
+
+        Время отсчитывается от выдачи элемента до запроса следующего, поэтому
+        учитываются и итерации, прерванные через continue.
+
+        Args:
+            iterable (iterable): Элементы для перебора
+            name (str): Имя шага
+
+        Returns:
+            iterable: Исходный iterable, если сбор выключен, иначе генератор с замером времени
+        """
+        if not self.enabled:
+            return iterable
+        return self._time_each(iterable, name)
+
+    def _time_each(self, iterable, name):
+        """
+        Генератор для time_each.
+        """
+        for item in iterable:
+            start = time.perf_counter()
+            yield item
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """
+        Добавляет длительность шага в его гистограмму.
+
+        Args:
+            name (str): Имя шага
+            seconds (float): Длительность в секундах
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = _Histogram()
+            histogram.observe(seconds)
+
+    def inc(self, name, value=1):
+        """
+        Увеличивает счетчик.
+
+        Args:
+            name (str): Имя счетчика
+            value (int): Величина увеличения (по умолчанию 1)
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def snapshot(self):
+        """
+        Сериализует метрики процесса для передачи в родительский процесс.
+
+        Returns:
+            dict: Гистограммы, счетчики и пиковый RSS процесса
+        """
+        return {
+            "timers": {name: histogram.to_dict() for name, histogram in self.timers.items()},
+            "counters": dict(self.counters),
+            "peak_rss_bytes": get_peak_rss_bytes(),
+        }
+
+    def merge(self, snapshot):
+        """
+        Добавляет метрики процесса-воркера.
+
+        Args:
+            snapshot (dict): Результат snapshot() в воркере
+        """
+        for name, data in snapshot["timers"].items():
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = _Histogram()
+            histogram.merge(data)
+
+        for name, value in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + value
+
+        peak = snapshot.get("peak_rss_bytes")
+        if peak is not None:
+            self.worker_peak_rss = max(self.worker_peak_rss or 0, peak)
+
+    def report(self):
+        """
+        Формирует итоговый отчет.
+
+        Returns:
+            dict: Для каждого шага — количество, суммарное время и оценки перцентилей в мс;
+                  счетчики; пиковый RSS основного процесса и самого тяжелого воркера
+        """
+        steps = {}
+        for name, histogram in sorted(self.timers.items()):
+            steps[name] = {
+                "count": histogram.count,
+                "total_s": histogram.total,
+                "mean_ms": 1000 * histogram.total / histogram.count if histogram.count else None,
+                "min_ms": None if histogram.min is None else 1000 * histogram.min,
+                "p50_ms": _to_ms(histogram.quantile(0.5)),
+                "p90_ms": _to_ms(histogram.quantile(0.9)),
+                "p99_ms": _to_ms(histogram.quantile(0.99)),
+                "max_ms": None if histogram.max is None else 1000 * histogram.max,
+                "buckets": dict(zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts)),
+            }
+
+        return {
+            "steps": steps,
+            "counters": dict(sorted(self.counters.items())),
+            "peak_rss_bytes": {"main": get_peak_rss_bytes(), "worker": self.worker_peak_rss},
+        }
+
+    def to_prometheus(self):
+        """
+        Формирует метрики в текстовом формате Prometheus.
+
+        Returns:
+            str: Текст для textfile-коллектора node_exporter
+        """
+        lines = [
+            f"# HELP {PROMETHEUS_PREFIX}_step_seconds Wall time of pipeline sub-steps.",
+            f"# TYPE {PROMETHEUS_PREFIX}_step_seconds histogram",
+        ]
+        for name, histogram in sorted(self.timers.items()):
+            cumulative = 0
+            for bound, bucket_count in zip([*map(str, LATENCY_BUCKETS), "+Inf"], histogram.counts):
+                cumulative += bucket_count
+                lines.append(f'{PROMETHEUS_PREFIX}_step_seconds_bucket{{step="{name}",le="{bound}"}} {cumulative}')
+            lines.append(f'{PROMETHEUS_PREFIX}_step_seconds_sum{{step="{name}"}} {histogram.total}')
+            lines.append(f'{PROMETHEUS_PREFIX}_step_seconds_count{{step="{name}"}} {histogram.count}')
+
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_events_total Outcomes of processed items.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_events_total counter")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{PROMETHEUS_PREFIX}_events_total{{event="{name}"}} {value}')
+
+        lines.append(f"# HELP {PROMETHEUS_PREFIX}_peak_rss_bytes Peak resident set size.")
+        lines.append(f"# TYPE {PROMETHEUS_PREFIX}_peak_rss_bytes gauge")
+        for process, peak in (("main", get_peak_rss_bytes()), ("worker", self.worker_peak_rss)):
+            if peak is not None:
+                lines.append(f'{PROMETHEUS_PREFIX}_peak_rss_bytes{{process="{process}"}} {peak}')
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, json_path, prometheus_path):
+        """
+        Атомарно сохраняет отчет в JSON и метрики в формате Prometheus.
+
+        Args:
+            json_path (str or Path): Путь к JSON-отчету
+            prometheus_path (str or Path): Путь к файлу .prom
+        """
+        for path, text in (
+            (json_path, json.dumps(self.report(), ensure_ascii=False, indent=2)),
+            (prometheus_path, self.to_prometheus()),
+        ):
+            path = Path(path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+
+
+def _to_ms(seconds):
+    """
+    Переводит секунды в миллисекунды с сохранением None.
+    """
+    return None if seconds is None else 1000 * seconds
+
+
+_metrics = PipelineMetrics()
+
+
+def get_metrics():
+    """
+    Возвращает общий для процесса реестр метрик.
+
+    Returns:
+        PipelineMetrics: Реестр метрик (по умолчанию сбор выключен)
+    """
+    return _metrics
+
+
+def enable_metrics(enabled=True):
+    """
+    Включает или выключает сбор метрик в текущем процессе.
+
+    Args:
+        enabled (bool): Включить ли сбор (по умолчанию True)
+
+    Returns:
+        PipelineMetrics: Реестр метрик
+    """
+    _metrics.enabled = enabled
+    return _metrics
+
+
+def call_with_metrics(task):
+    """
+    Выполняет задачу в воркере и возвращает результат вместе с метриками этой задачи.
+
+    Args:
+        task (tuple): (функция задачи, аргумент задачи)
+
+    Returns:
+        tuple: (результат функции, snapshot метрик, собранных во время задачи)
+    """
+    func, arg = task
+    _metrics.reset()
+    result = func(arg)
+    return result, _metrics.snapshot()
@@ -0,0 +1,96 @@
+"""
+Модуль для параллельного выполнения стадий пайплайна в пуле процессов.
+
+Этот модуль предоставляет функции, которые раскладывают независимые задачи
+(обработку отдельных фото или видео) по пулу процессов и возвращают результаты
+в исходном порядке, чтобы итоговые CSV совпадали с последовательным запуском.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from src.Сonfigs.pipeline_config import configure, get_config
+from src.Dataset.utils.pipeline_metrics import call_with_metrics, enable_metrics, get_metrics
+
+
+def resolve_workers(workers):
+    """
+    Определяет фактическое количество процессов-воркеров.
+
+    Args:
+        workers (int or None): Запрошенное количество воркеров; None или 0 означает
+                               "по числу ядер процессора"
+
+    Returns:
+        int: Количество воркеров (не меньше 1)
+    """
+    if not workers:
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def _init_pool_worker(config_overrides, metrics_enabled, initializer):
+    """
+    Инициализирует процесс-воркер: повторяет конфигурацию путей и метрик родителя.
+
+    Args:
+        config_overrides (dict): Явно заданные пути конфигурации родительского процесса
+        metrics_enabled (bool): Включен ли сбор метрик в родительском процессе
+        initializer (callable or None): Дополнительная инициализация стадии
+    """
+    configure(**config_overrides)
+    enable_metrics(metrics_enabled)
+    if initializer is not None:
+        initializer()
+
+
+def run_in_process_pool(func, tasks, workers=None, chunksize=None, initializer=None):
+    """
+    Выполняет функцию над списком задач в пуле процессов.
+
+    Задачи нарезаются на пачки и раздаются воркерам, а результаты отдаются
+    генератором по мере готовности, но строго в порядке исходных задач.
+    Процессы создаются через spawn, чтобы каждый воркер поднимал собственные
+    детекторы MediaPipe, а не наследовал состояние родителя через fork;
+    явно заданные пути конфигурации передаются воркерам при старте.
+    Если включен сбор метрик, каждый воркер возвращает метрики задачи вместе
+    с ее результатом, и они добавляются в реестр родительского процесса.
+    Если воркер всего один, задачи выполняются в текущем процессе без пула.
+
+    Args:
+        func (callable): Функция верхнего уровня модуля, принимающая одну задачу
+        tasks (list): Список задач (должны сериализоваться через pickle)
+        workers (int or None): Количество процессов (по умолчанию по числу ядер)
+        chunksize (int or None): Размер пачки задач на воркер (по умолчанию подбирается автоматически)
+        initializer (callable or None): Функция, вызываемая в каждом воркере при старте
+
+    Yields:
+        Результат func для каждой задачи в исходном порядке
+    """
+    workers = resolve_workers(workers)
+
+    if workers == 1 or len(tasks) <= 1:
+        if initializer is not None:
+            initializer()
+        for task in tasks:
+            yield func(task)
+        return
+
+    if chunksize is None:
+        # Несколько пачек на воркер, чтобы сгладить разную длительность задач
+        chunksize = max(1, len(tasks) // (workers * 4))
+
+    metrics = get_metrics()
+    context = multiprocessing.get_context("spawn")
+    initargs = (get_config().overrides, metrics.enabled, initializer)
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_pool_worker, initargs=initargs) as executor:
+        if not metrics.enabled:
+            yield from executor.map(func, tasks, chunksize=chunksize)
+            return
+
+        wrapped_tasks = [(func, task) for task in tasks]
+        for result, snapshot in executor.map(call_with_metrics, wrapped_tasks, chunksize=chunksize):
+            metrics.merge(snapshot)
+            yield result
@@ -0,0 +1,278 @@
+"""
+Модуль с манифестом стадий пайплайна для инкрементальных перезапусков.
+
+Манифест хранит для каждой стадии результаты обработки отдельных файлов,
+адресуя их по хэшу содержимого исходного файла, параметрам стадии и пути
+результата. При повторном запуске стадия берет результат из манифеста,
+если исходный файл и параметры не изменились, а выходной файл на месте
+и не перезаписан с тех пор (совпадают его размер и время изменения).
+
+Имена выходных файлов не зависят от параметров стадии, поэтому без этой
+проверки запуск с прежними параметрами после запуска с другими взял бы
+из манифеста файл, уже перезаписанный другим результатом.
+
+По той же причине для каждой пары (исходный файл, путь результата) стадия
+хранит только последнюю запись: прежние записи уже не пройдут проверку
+в lookup. Записи и хэши удаленных исходных файлов отбрасываются при загрузке,
+поэтому манифест не растет от запуска к запуску.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+# Имена стадий в манифесте
+STAGE_DATASET_BUILDER = "dataset_builder"
+STAGE_VIDEO_FRAMES = "video_frames"
+STAGE_FILTER_REMOVAL = "filter_removal"
+STAGE_FACE_CROPPING = "face_cropping"
+STAGE_PERCEPTUAL_HASH = "perceptual_hash"
+
+# Версия формата файла манифеста (2 — записи хранят пути исходного файла и результата)
+MANIFEST_VERSION = 2
+
+
+def _digest(data):
+    """
+    Возвращает короткий хэш байтов.
+
+    Args:
+        data (bytes): Данные для хэширования
+
+    Returns:
+        str: Шестнадцатеричный хэш blake2b (128 бит)
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path):
+    """
+    Возвращает хэш содержимого файла (читает файл блоками по 1 МБ).
+
+    Args:
+        path (str or Path): Путь к файлу
+
+    Returns:
+        str: Шестнадцатеричный хэш blake2b (128 бит)
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def params_key(params):
+    """
+    Возвращает хэш параметров стадии.
+
+    Args:
+        params (dict): Параметры стадии (значения должны сериализоваться в JSON)
+
+    Returns:
+        str: Хэш параметров, не зависящий от порядка ключей
+    """
+    return _digest(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+
+
+class StageManifest:
+    """
+    Персистентный манифест, общий для всех стадий пайплайна.
+
+    Хэши содержимого файлов кэшируются по размеру и времени изменения файла,
+    поэтому на неизменившемся датасете файлы повторно не читаются.
+
+    Записывать результаты и сохранять манифест можно из нескольких потоков
+    (например, из потоков фоновой записи фото).
+    """
+
+    def __init__(self, path):
+        """
+        Загружает манифест из файла (если он существует).
+
+        Args:
+            path (str or Path): Путь к JSON-файлу манифеста
+        """
+        self.path = Path(path)
+        self.stages = {}
+        self._file_hashes = {}
+        # Пути (исходный файл, результат) для ключей, выданных entry_key
+        self._key_paths = {}
+        # Последний ключ для каждой пары путей: стадия -> (исходный файл, результат) -> ключ
+        self._slots = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARN] Манифест поврежден и будет пересоздан: {self.path} ({e})")
+                data = {}
+
+            if data.get("version") == MANIFEST_VERSION:
+                self.stages = data.get("stages", {})
+                self._file_hashes = data.get("file_hashes", {})
+                self._prune()
+
+    def _prune(self):
+        """
+        Удаляет записи и хэши исходных файлов, которых больше нет на диске,
+        и запоминает последний ключ для каждой пары путей.
+        """
+        exists = {}
+
+        def source_exists(path):
+            if path not in exists:
+                exists[path] = os.path.exists(path)
+            return exists[path]
+
+        for stage, entries in self.stages.items():
+            slots = self._slots.setdefault(stage, {})
+            for key in list(entries):
+                source, output = entries[key]["source"], entries[key]["output"]
+                if not source_exists(source):
+                    del entries[key]
+                    self._dirty = True
+                    continue
+                slots[(source, output)] = key
+
+        for path in list(self._file_hashes):
+            if not source_exists(path):
+                del self._file_hashes[path]
+                self._dirty = True
+
+    def file_hash(self, path):
+        """
+        Возвращает хэш содержимого файла.
+
+        Если размер и время изменения файла совпадают с сохраненными,
+        используется хэш из манифеста без чтения файла.
+
+        Args:
+            path (str or Path): Путь к файлу
+
+        Returns:
+            str: Хэш содержимого файла
+        """
+        path = str(path)
+        stat = os.stat(path)
+        cached = self._file_hashes.get(path)
+        if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+
+        digest = file_digest(path)
+
+        with self._lock:
+            self._file_hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self._dirty = True
+        return digest
+
+    def entry_key(self, source_path, params, output_path=None):
+        """
+        Возвращает ключ записи: хэш исходного файла, параметров стадии и пути результата.
+
+        Args:
+            source_path (str or Path): Путь к исходному файлу
+            params (dict): Параметры стадии
+            output_path (str or Path or None): Путь к результату обработки
+
+        Returns:
+            str: Ключ записи в манифесте
+        """
+        parts = [self.file_hash(source_path), params_key(params), str(output_path or "")]
+        key = _digest("|".join(parts).encode("utf-8"))
+        with self._lock:
+            self._key_paths[key] = (str(source_path), str(output_path or ""))
+        return key
+
+    def lookup(self, stage, key):
+        """
+        Возвращает сохраненный результат обработки, если он еще актуален.
+
+        Результат считается актуальным, если все выходные файлы записи существуют
+        и их размер и время изменения совпадают с записанными в record.
+
+        Args:
+            stage (str): Имя стадии
+            key (str): Ключ записи (см. entry_key)
+
+        Returns:
+            object or None: Сохраненный результат или None, если нужно пересчитать
+        """
+        entry = self.stages.get(stage, {}).get(key)
+        if entry is None:
+            return None
+        for path, size, mtime_ns in entry["outputs"]:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                return None
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return None
+        return entry["result"]
+
+    def record(self, stage, key, result, outputs=()):
+        """
+        Сохраняет результат обработки файла.
+
+        Выходные файлы должны быть уже записаны: вместе с путем сохраняются
+        их размер и время изменения (см. lookup). Прежняя запись стадии для тех же
+        исходного файла и пути результата (с другими параметрами или содержимым) удаляется.
+
+        Args:
+            stage (str): Имя стадии
+            key (str): Ключ записи, выданный entry_key этого манифеста
+            result (object): Результат, сериализуемый в JSON
+            outputs (iterable): Пути к выходным файлам, которые должны существовать для повторного использования
+        """
+        outputs = [self._output_state(p) for p in outputs]
+        with self._lock:
+            source, output = slot = self._key_paths[key]
+            entries = self.stages.setdefault(stage, {})
+            previous = self._slots.setdefault(stage, {}).get(slot)
+            if previous is not None and previous != key:
+                entries.pop(previous, None)
+            self._slots[stage][slot] = key
+            entries[key] = {"result": result, "outputs": outputs, "source": source, "output": output}
+            self._dirty = True
+
+    @staticmethod
+    def _output_state(path):
+        """
+        Возвращает путь выходного файла с его размером и временем изменения.
+
+        Args:
+            path (str or Path): Путь к выходному файлу
+
+        Returns:
+            list: [путь, размер, время изменения в нс]; для отсутствующего файла размер и время — None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return [str(path), None, None]
+        return [str(path), stat.st_size, stat.st_mtime_ns]
+
+    def save(self):
+        """
+        Атомарно записывает манифест на диск, если в нем были изменения.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"version": MANIFEST_VERSION, "stages": self.stages, "file_hashes": self._file_hashes},
+                    f,
+                    ensure_ascii=False,
+                )
+            os.replace(tmp_path, self.path)
+            self._dirty = False
@@ -0,0 +1,207 @@
+"""
+Модуль с потоковым чтением наперед и отложенной записью фото.
+
+Стадии, обрабатывающие фото по одному, большую часть времени ждут диск:
+cv2.imread и cv2.imwrite блокируют цикл, пока процессор простаивает
+(особенно на сетевых папках). OpenCV отпускает GIL на время
+декодирования и кодирования, поэтому их можно вынести в потоки:
+    - prefetch заранее читает и декодирует следующие фото в пуле потоков
+      и отдает результаты строго в исходном порядке;
+    - BackgroundWriter кодирует и записывает фото в отдельном пуле потоков.
+
+Память ограничена глубиной очередей: prefetch держит не больше depth
+прочитанных фото, а BackgroundWriter блокирует вызов write, пока в
+очереди depth фото. Результаты не зависят от количества потоков и
+совпадают с последовательным циклом.
+"""
+
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from threading import BoundedSemaphore
+
+import cv2
+
+
+# Количество потоков чтения и записи по умолчанию
+IO_THREADS = 4
+
+# Максимальное количество фото в очереди чтения или записи
+IO_QUEUE_DEPTH = 16
+
+# Качество JPEG при записи фото (95 — значение OpenCV по умолчанию)
+JPEG_QUALITY = 95
+
+
+def get_imwrite_params(path, jpeg_quality=JPEG_QUALITY):
+    """
+    Возвращает параметры cv2.imwrite для пути.
+
+    Args:
+        path (str or Path): Путь к сохраняемому фото
+        jpeg_quality (int): Качество JPEG от 0 до 100
+
+    Returns:
+        list: [cv2.IMWRITE_JPEG_QUALITY, качество] для .jpg/.jpeg, иначе пустой список
+    """
+    if Path(path).suffix.lower() in (".jpg", ".jpeg"):
+        return [cv2.IMWRITE_JPEG_QUALITY, int(jpeg_quality)]
+    return []
+
+
+def write_image(path, image, jpeg_quality=JPEG_QUALITY):
+    """
+    Кодирует и сохраняет фото с заданным качеством JPEG.
+
+    Args:
+        path (str or Path): Путь для сохранения
+        image (np.ndarray): Фото в BGR
+        jpeg_quality (int): Качество JPEG от 0 до 100
+
+    Returns:
+        bool: Результат cv2.imwrite
+    """
+    return cv2.imwrite(str(path), image, get_imwrite_params(path, jpeg_quality))
+
+
+def prefetch(items, load, threads=IO_THREADS, depth=IO_QUEUE_DEPTH):
+    """
+    Загружает элементы наперед в пуле потоков и отдает их в исходном порядке.
+
+    Одновременно загружается не больше depth элементов. Исключение из load
+    поднимается в цикле потребителя на том же элементе, что и при
+    последовательной загрузке. При threads < 1 элементы загружаются
+    последовательно в текущем потоке.
+
+    Args:
+        items (iterable): Элементы (например, пути к фото)
+        load (callable): Функция загрузки одного элемента (например, cv2.imread)
+        threads (int): Количество потоков чтения
+        depth (int): Максимальное количество загруженных, но еще не отданных элементов
+
+    Yields:
+        tuple: (элемент, результат load(элемент))
+    """
+    if threads < 1:
+        for item in items:
+            yield item, load(item)
+        return
+
+    items = iter(items)
+    pending = deque()
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="prefetch")
+    try:
+        for item in items:
+            pending.append((item, executor.submit(load, item)))
+            if len(pending) >= max(1, depth):
+                break
+
+        while pending:
+            item, future = pending.popleft()
+            # Освободившееся место в очереди сразу занимаем следующим элементом
+            for next_item in islice(items, 1):
+                pending.append((next_item, executor.submit(load, next_item)))
+            yield item, future.result()
+    finally:
+        # Потребитель мог остановиться раньше: незапущенные загрузки отменяются
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+class BackgroundWriter:
+    """
+    Пул потоков для кодирования и записи фото в фоне.
+
+    Используется как контекстный менеджер: при выходе дожидается записи
+    всех фото и поднимает первую ошибку записи, если она была.
+    """
+
+    def __init__(self, threads=IO_THREADS, depth=IO_QUEUE_DEPTH, jpeg_quality=JPEG_QUALITY):
+        """
+        Args:
+            threads (int): Количество потоков записи (< 1 — запись в текущем потоке)
+            depth (int): Максимальное количество фото (задач), ожидающих записи
+            jpeg_quality (int): Качество JPEG от 0 до 100
+        """
+        self.jpeg_quality = jpeg_quality
+        self._executor = None
+        self._slots = None
+        self._futures = []
+        if threads >= 1:
+            self._executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="writer")
+            self._slots = BoundedSemaphore(max(1, depth))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._executor is not None:
+            # Ошибка уже поднята в цикле: только дожидаемся начатой записи
+            self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, func, args):
+        """
+        Выполняет одну задачу записи и освобождает место в очереди.
+        """
+        try:
+            return func(*args)
+        finally:
+            self._slots.release()
+
+    def submit(self, func, *args):
+        """
+        Ставит в очередь произвольную задачу записи (например, декодирование, обрезку и запись фото).
+
+        Если в очереди уже depth задач, вызов ждет, пока одна из них выполнится.
+        Переданные массивы не должны изменяться после вызова.
+
+        Args:
+            func (callable): Функция, выполняемая в потоке записи
+            *args: Аргументы функции
+
+        Returns:
+            Future: Результат func (при threads < 1 задача выполняется сразу в текущем потоке)
+        """
+        if self._executor is None:
+            # Как в последовательном цикле: ошибка поднимается сразу
+            future = Future()
+            future.set_result(func(*args))
+            return future
+
+        self._slots.acquire()
+        future = self._executor.submit(self._run, func, args)
+        self._futures.append(future)
+        # Забываем успешно выполненные задачи, чтобы список не рос вместе с датасетом
+        if len(self._futures) > 4 * IO_QUEUE_DEPTH:
+            self._futures = [f for f in self._futures if not f.done() or f.exception() is not None]
+        return future
+
+    def write(self, path, image):
+        """
+        Ставит фото в очередь записи.
+
+        Args:
+            path (str or Path): Путь для сохранения
+            image (np.ndarray): Фото в BGR (не должно изменяться после вызова)
+
+        Returns:
+            Future: Результат cv2.imwrite
+        """
+        return self.submit(write_image, path, image, self.jpeg_quality)
+
+    def close(self):
+        """
+        Дожидается выполнения всех задач из очереди.
+
+        Raises:
+            Exception: Первая ошибка, возникшая при записи
+        """
+        if self._executor is None:
+            return
+
+        self._executor.shutdown(wait=True)
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
@@ -7,22 +7,134 @@
 который затем заменяет видео в датасете.
 """
 
+from functools import partial
 from pathlib import Path
 
 import cv2
 import pandas as pd
 
-from src.Сonfigs.common_paths import (
-    DV_VIDEO_DIR,
-    DV_PHOTOS_EXTRACTED_DIR,
-    DV_RAW_CSV,
-    DV_FRAMES_CSV,
+from src.Сonfigs import common_paths
+
+from src.Dataset.detector.face_detection_engine import (
+    DETECTOR_MEDIAPIPE, MIN_DETECTION_CONFIDENCE, get_detector_backend, get_face_detection_engine,
+)
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.process_pool import run_in_process_pool
+from src.Dataset.utils.stage_manifest import STAGE_VIDEO_FRAMES
+from src.Dataset.video_processor.frame_extractor import (
+    FRAME_BUDGET, TOP_K, extract_best_face_frame, extract_top_face_frames,
 )
 
-from src.Dataset.video_processor.frame_extractor import extract_best_face_frame
 
+# Режимы поиска кадров: полный просмотр видео с шагом и поиск от грубого к точному
+FRAME_SEARCH_SCAN = "scan"
+FRAME_SEARCH_COARSE_TO_FINE = "coarse_to_fine"
+FRAME_SEARCH_MODES = (FRAME_SEARCH_SCAN, FRAME_SEARCH_COARSE_TO_FINE)
+
+
+def _init_video_worker(min_detection_confidence, detector_backend):
+    """
+    Инициализирует процесс-воркер: заранее загружает собственный детектор лиц.
+
+    Детектор создается с порогом и бэкендом стадии, иначе первая задача
+    воркера закрыла бы его и загрузила модель заново.
+
+    Args:
+        min_detection_confidence (float): Минимальная уверенность детектора лиц
+        detector_backend (str): Бэкенд детекции лиц
+    """
+    get_face_detection_engine(min_detection_confidence, detector_backend)
+
+
+def frame_photo_name(video_path, rank):
+    """
+    Возвращает имя фото для кадра видео.
+
+    Лучший кадр называется как раньше (<имя видео>.jpg), следующие — <имя видео>_<номер>.jpg.
+
+    Args:
+        video_path (Path): Путь к видеофайлу
+        rank (int): Номер кадра среди выбранных (0 — лучший)
+
+    Returns:
+        str: Имя файла фото
+    """
+    return f"{video_path.stem}.jpg" if rank == 0 else f"{video_path.stem}_{rank}.jpg"
+
+
+def _extract_video_task(task):
+    """
+    Извлекает лучшие кадры из одного видео и сохраняет их (выполняется в воркере).
+
+    Ошибки обработки отдельного видео не пробрасываются наружу, а возвращаются
+    как статус, чтобы не останавливать обработку остальных видео.
+
+    Args:
+        task (tuple): (путь к видеофайлу, шаг между кадрами, минимальная уверенность детектора,
+                       бэкенд детекции лиц, параметры поиска кадров или None для полного просмотра)
+
+    Returns:
+        tuple: (статус, сообщение, количество сохраненных кадров),
+               где статус — "ok", "missing", "no_face" или "error"
+    """
+    video_path, step, min_detection_confidence, detector_backend, search_params = task
+    with get_metrics().timer("video.video"):
+        return _extract_video(video_path, step, min_detection_confidence, detector_backend, search_params)
+
+
+def _extract_video(video_path, step, min_detection_confidence, detector_backend, search_params):
+    """
+    Извлекает лучшие кадры из одного видео и сохраняет их (см. _extract_video_task).
+
+    Args:
+        video_path (Path): Путь к видеофайлу
+        step (int): Шаг между кадрами
+        min_detection_confidence (float): Минимальная уверенность детектора
+        detector_backend (str): Бэкенд детекции лиц
+        search_params (dict or None): Параметры extract_top_face_frames (top_k, frame_budget,
+                                      time_budget) или None для полного просмотра с одним кадром
+
+    Returns:
+        tuple: (статус, сообщение, количество сохраненных кадров),
+               где статус — "ok", "missing", "no_face" или "error"
+    """
+    # Проверяем существование видеофайла
+    if not video_path.exists():
+        return "missing", f"Видео не найдено: {video_path}", 0
+
+    try:
+        # Извлекаем лучшие кадры с лицом из видео
+        if search_params is None:
+            best_frame = extract_best_face_frame(
+                video_path, step=step, min_detection_confidence=min_detection_confidence,
+                detector_backend=detector_backend,
+            )
+            frames = [] if best_frame is None else [best_frame]
+        else:
+            frames = [frame for _, frame in extract_top_face_frames(
+                video_path, step=step, min_detection_confidence=min_detection_confidence,
+                detector_backend=detector_backend, **search_params
+            )]
+
+        # Если лицо не найдено, пропускаем
+        if not frames:
+            return "no_face", f"Лицо не найдено: {video_path}", 0
+
+        # Сохраняем кадры как изображения
+        with get_metrics().timer("video.encode"):
+            for rank, frame in enumerate(frames):
+                cv2.imwrite(str(common_paths.DV_PHOTOS_EXTRACTED_DIR / frame_photo_name(video_path, rank)), frame)
+
+    except Exception as e:
+        return "error", f"Не удалось обработать видео {video_path}: {e}", 0
 
-def process_video_rows():
+    return "ok", None, len(frames)
+
+
+def process_video_rows(workers=1, step=5, min_detection_confidence=MIN_DETECTION_CONFIDENCE,
+                       frame_search=FRAME_SEARCH_SCAN, top_k=None, frame_budget=FRAME_BUDGET, time_budget=None,
+                       detector_backend=None, manifest=None):
     """
     Обрабатывает строки датасета, содержащие видеофайлы.
 
@@ -38,56 +150,139 @@ def process_video_rows():
     4. Сохраняет обновленный датасет в CSV-файл
 
     Заменяет видеофайлы на изображения с лучшим кадром, содержащим лицо.
+
+    При workers > 1 видео декодируются в пуле процессов: каждый воркер сам
+    сохраняет кадр в photos_extracted/, а родительский процесс собирает строки
+    в исходном порядке. Ошибки отдельных видео (нет файла, не найдено лицо)
+    выводятся как предупреждения и не останавливают обработку.
+
+    Если передан манифест стадий, видео с неизменившимся содержимым и параметрами
+    повторно не декодируются: результат (кадр сохранен или лицо не найдено)
+    берется из манифеста.
+
+    В режиме frame_search="coarse_to_fine" видео не просматривается целиком:
+    кадры ищутся от грубого к точному в рамках бюджета (см. extract_top_face_frames),
+    и из видео сохраняется до top_k разнесенных во времени кадров. Каждый кадр
+    становится отдельной строкой датасета с image_index, равным его номеру
+    среди выбранных (0 — лучший кадр, как и в режиме scan).
+
+    Args:
+        workers (int or None): Количество процессов для обработки видео (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        step (int): Интервал между анализируемыми кадрами (по умолчанию 5); в режиме
+                    coarse_to_fine — минимальный шаг уточнения
+        min_detection_confidence (float): Минимальная уверенность детектора лиц (по умолчанию 0.5)
+        frame_search (str): Режим поиска кадров из FRAME_SEARCH_MODES (по умолчанию "scan")
+        top_k (int or None): Максимальное количество кадров на видео (больше 1 — только в режиме coarse_to_fine;
+                             None — TOP_K в режиме coarse_to_fine и 1 в режиме scan)
+        frame_budget (int or None): Максимальное количество оцениваемых кадров на видео (режим coarse_to_fine)
+        time_budget (float or None): Максимальное время поиска на видео в секундах (режим coarse_to_fine)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+        manifest (StageManifest or None): Манифест стадий для инкрементальных перезапусков
+
+    Raises:
+        ValueError: Если режим поиска неизвестен, top_k > 1 в режиме scan или бэкенд детекции не поддерживается
     """
+    if frame_search not in FRAME_SEARCH_MODES:
+        raise ValueError(f"Unknown frame search mode: {frame_search}. Expected one of: {FRAME_SEARCH_MODES}")
+    if top_k is None:
+        top_k = TOP_K if frame_search == FRAME_SEARCH_COARSE_TO_FINE else 1
+    if frame_search == FRAME_SEARCH_SCAN and top_k != 1:
+        raise ValueError("top_k > 1 requires frame_search='coarse_to_fine'.")
+    detector_backend = get_detector_backend(detector_backend)
+
     # Создаем директорию для извлеченных фото
-    DV_PHOTOS_EXTRACTED_DIR.mkdir(exist_ok=True)
+    common_paths.DV_PHOTOS_EXTRACTED_DIR.mkdir(exist_ok=True)
 
     # Читаем исходный датасет
-    df = pd.read_csv(DV_RAW_CSV)
-    new_rows = []
+    df = read_dataset(common_paths.DV_RAW_CSV)
+    video_params = {"step": step, "min_detection_confidence": min_detection_confidence}
+    # Бэкенд по умолчанию не входит в ключ, чтобы манифесты до появления бэкендов оставались актуальными
+    if detector_backend != DETECTOR_MEDIAPIPE:
+        video_params["detector_backend"] = detector_backend
+    search_params = None
+    if frame_search == FRAME_SEARCH_COARSE_TO_FINE:
+        search_params = {"top_k": top_k, "frame_budget": frame_budget, "time_budget": time_budget}
+        video_params.update(frame_search=frame_search, **search_params)
+    tasks = []
+    # Для каждой строки запоминаем путь к видео (или None для фото),
+    # ключ манифеста и сохраненный в манифесте статус
+    row_tasks = []
 
     # Обрабатываем каждую строку датасета
     for _, row in df.iterrows():
         image_path = row["image_path"]
 
-        # Если путь не является видеофайлом, просто добавляем строку в результат
+        # Если путь не является видеофайлом, строка попадает в результат без изменений
         if not isinstance(image_path, str) or not image_path.lower().endswith(".mp4"):
-            new_rows.append(row)
+            row_tasks.append((row, None, None, None))
             continue
 
-        # Формируем путь к видеофайлу
-        video_path = DV_VIDEO_DIR / Path(image_path).name
+        # Формируем путь к видеофайлу и путь для сохранения лучшего кадра
+        video_path = common_paths.DV_VIDEO_DIR / Path(image_path).name
+        photo_path = common_paths.DV_PHOTOS_EXTRACTED_DIR / frame_photo_name(video_path, 0)
 
-        # Проверяем существование видеофайла
-        if not video_path.exists():
-            print(f"[WARN] Видео не найдено: {video_path}")
-            continue
+        # Если видео уже обрабатывалось с теми же параметрами, берем статус из манифеста
+        key = None
+        cached = None
+        if manifest is not None and video_path.exists():
+            key = manifest.entry_key(video_path, video_params, photo_path)
+            cached = manifest.lookup(STAGE_VIDEO_FRAMES, key)
 
-        # Извлекаем лучший кадр с лицом из видео
-        best_frame = extract_best_face_frame(video_path)
+        row_tasks.append((row, video_path, key, cached))
+        if cached is None:
+            tasks.append((video_path, step, min_detection_confidence, detector_backend, search_params))
 
-        # Если лицо не найдено, пропускаем
-        if best_frame is None:
-            print(f"[WARN] Лицо не найдено: {video_path}")
+    # Извлекаем кадры из видео (последовательно или в пуле процессов)
+    results = run_in_process_pool(_extract_video_task, tasks, workers=workers,
+                                  initializer=partial(_init_video_worker, min_detection_confidence, detector_backend))
+
+    metrics = get_metrics()
+    new_rows = []
+    reused = 0
+    for row, video_path, key, cached in row_tasks:
+        if video_path is None:
+            new_rows.append(row)
             continue
 
-        # Генерируем имя и путь для сохранения извлеченного кадра
-        photo_name = video_path.stem + ".jpg"
-        photo_path = DV_PHOTOS_EXTRACTED_DIR / photo_name
+        if cached is None:
+            status, message, saved_frames = next(results)
+            # Отсутствующие видео и ошибки не запоминаем, чтобы повторить их при следующем запуске
+            if key is not None and status in ("ok", "no_face"):
+                outputs = [common_paths.DV_PHOTOS_EXTRACTED_DIR / frame_photo_name(video_path, rank)
+                           for rank in range(saved_frames)]
+                # В режиме scan результат — только статус, как в манифестах до появления top_k
+                result = status if search_params is None else [status, saved_frames]
+                manifest.record(STAGE_VIDEO_FRAMES, key, result, outputs)
+        else:
+            status, saved_frames = (cached, int(cached == "ok")) if search_params is None else cached
+            message = f"Лицо не найдено: {video_path}"
+            reused += 1
+            metrics.inc("video.reused")
+
+        metrics.inc(f"video.{status}")
+
+        # Видео, из которых не удалось извлечь кадр, не попадают в датасет
+        if status == "error":
+            print(f"[ERROR] {message}")
+            continue
+        if status != "ok":
+            print(f"[WARN] {message}")
+            continue
 
-        # Сохраняем кадр как изображение
-        cv2.imwrite(str(photo_path), best_frame)
+        # Для каждого извлеченного кадра создаем строку с путем к изображению
+        for rank in range(saved_frames):
+            new_row = row.copy()
+            new_row["image_path"] = f"photos_extracted/{frame_photo_name(video_path, rank)}"
+            new_row["image_index"] = rank
+            new_rows.append(new_row)
 
-        # Создаем новую строку с обновленным путем к изображению
-        new_row = row.copy()
-        new_row["image_path"] = f"photos_extracted/{photo_name}"
-        new_row["image_index"] = 0
+    # Завершаем генератор результатов, чтобы сразу освободить пул процессов
+    results.close()
 
-        new_rows.append(new_row)
+    # Сохраняем обновленный датасет (CSV или Parquet)
+    write_dataset(pd.DataFrame(new_rows, columns=df.columns), common_paths.DV_FRAMES_CSV)
 
-    # Сохраняем обновленный датасет в CSV-файл
-    pd.DataFrame(new_rows, columns=df.columns).to_csv(
-        DV_FRAMES_CSV,
-        index=False,
-        encoding="utf-8"
-    )
+    if manifest is not None:
+        manifest.save()
+        print(f"[INFO] Reused {reused} video results from manifest")
@@ -2,20 +2,70 @@
 Модуль для извлечения лучшего кадра с лицом из видеофайла.
 
 Этот модуль предоставляет функции для анализа видео и выбора 
-кадра с наиболее выраженным лицом, используя MediaPipe для 
-детекции лиц и расчет остроты изображения.
+кадра с наиболее выраженным лицом, используя детектор лиц
+(по умолчанию MediaPipe BlazeFace) и расчет остроты изображения.
+
+extract_best_face_frame просматривает все видео с фиксированным шагом
+и возвращает один кадр, а extract_top_face_frames ищет несколько
+разнесенных во времени кадров от грубого к точному в рамках бюджета
+кадров и времени на видео.
 """
 
+import heapq
+import math
+import time
+
 import cv2
-import mediapipe as mp
-from mediapipe.tasks.python.core.base_options import BaseOptions
-from mediapipe.tasks.python.vision import FaceDetector, FaceDetectorOptions, RunningMode
-from src.Сonfigs.common_paths import CV2_MODELS_DIR
+import numpy as np
+
+from src.Dataset.detector.face_detection_engine import MIN_DETECTION_CONFIDENCE, RunningMode, get_face_detection_engine
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.video_processor.frame_sampler import iter_sampled_frames, read_frame_at
+from src.Dataset.video_processor.sharpness_calculator import get_sharpness_score, get_sharpness_scores
+
+
+# Количество лучших кадров на видео при поиске от грубого к точному
+TOP_K = 3
+
+# Количество кадров грубого прохода по видео
+COARSE_SAMPLES = 16
+
+# Максимальное количество оцениваемых кадров на видео
+FRAME_BUDGET = 48
+
+# Минимальное расстояние между выбранными кадрами в мс
+MIN_FRAME_GAP_MS = 1000
+
+
+def score_face_frame(frame, detections, sharpness_on_face=False, sharpness_max_side=None):
+    """
+    Оценивает кадр с найденными лицами: площадь лица, умноженная на остроту.
+
+    Args:
+        frame (np.ndarray): Кадр в формате BGR
+        detections (list): Непустой список рамок лиц на кадре
+        sharpness_on_face (bool): Считать остроту только внутри рамки каждого лица, а не по всему кадру
+        sharpness_max_side (int or None): Уменьшать кадр (или область лица) до этого размера стороны
+                                          перед расчетом остроты; None — полное разрешение
+
+    Returns:
+        float: Оценка кадра (больше — лучше)
+    """
+    with get_metrics().timer("video.sharpness"):
+        if sharpness_on_face:
+            # Острота своя для каждого лица: считаем по рамкам одним пакетом
+            sharps = get_sharpness_scores([frame] * len(detections), detections, sharpness_max_side)
+            return max(d['width'] * d['height'] * sharp for d, sharp in zip(detections, sharps))
 
-from src.Dataset.video_processor.sharpness_calculator import get_sharpness_score
+        # Острота кадра одинакова для всех лиц, поэтому считаем ее один раз
+        # и комбинируем с площадью самого крупного лица
+        face_area = max(d['width'] * d['height'] for d in detections)
+        return face_area * get_sharpness_score(frame, max_side=sharpness_max_side)
 
 
-def extract_best_face_frame(video_path, step=5):
+def extract_best_face_frame(video_path, step=5, sample_fps=None, num_samples=None, seek=False,
+                            sharpness_on_face=False, sharpness_max_side=None,
+                            min_detection_confidence=MIN_DETECTION_CONFIDENCE, detector_backend=None):
     """
     Извлекает лучший кадр с лицом из видеофайла.
 
@@ -26,6 +76,15 @@ def extract_best_face_frame(video_path, step=5):
     Args:
         video_path (str or Path): Путь к видеофайлу
         step (int): Интервал между кадрами для анализа (по умолчанию 5)
+        sample_fps (float or None): Сколько кадров анализировать на секунду видео (вместо step)
+        num_samples (int or None): Сколько кадров анализировать на все видео (вместо step)
+        seek (bool): Переходить к кадрам по временным меткам вместо последовательного чтения
+                     (используется вместе с num_samples)
+        sharpness_on_face (bool): Считать остроту только внутри рамки каждого лица, а не по всему кадру
+        sharpness_max_side (int or None): Уменьшать кадр (или область лица) до этого размера стороны
+                                          перед расчетом остроты; None — полное разрешение
+        min_detection_confidence (float): Минимальная уверенность детектора лиц (по умолчанию 0.5)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
 
     Returns:
         numpy.ndarray or None: Кадр с лучшим лицом или None, если лицо не найдено
@@ -35,69 +94,209 @@ def extract_best_face_frame(video_path, step=5):
     """
     # Открываем видеофайл
     cap = cv2.VideoCapture(str(video_path))
-    fps = cap.get(cv2.CAP_PROP_FPS) or 30
-
-    # Проверяем существование модели детекции лиц
-    model_path = CV2_MODELS_DIR / "blaze_face_short_range.tflite"
-    if not model_path.exists():
-        raise FileNotFoundError(
-            f"Default face detection model not found at {model_path}. "
-            "Please ensure 'blaze_face_short_range.tflite' is placed in the 'models' subdirectory."
-        )
-
-    # Создаем опции для детектора лиц
-    options = FaceDetectorOptions(
-        base_options=BaseOptions(model_asset_path=str(model_path)),
-        running_mode=RunningMode.VIDEO,
-        min_detection_confidence=0.5
-    )
+
+    # Общий для процесса движок детекции; отмечаем начало нового видео,
+    # чтобы временные метки детектора оставались монотонными
+    engine = get_face_detection_engine(min_detection_confidence, detector_backend)
+    engine.start_video_stream()
 
     # Переменные для отслеживания лучшего кадра
+    metrics = get_metrics()
     best_score = 0
     best_frame = None
-    frame_idx = 0
 
-    # Создаем детектор лиц и начинаем анализ видео
-    with FaceDetector.create_from_options(options) as detector:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+    # Анализируем только выбранные кадры; пропускаемые кадры не конвертируются в BGR
+    frames = iter_sampled_frames(cap, step, sample_fps, num_samples, seek)
+    while True:
+        # Время чтения кадра учитывается отдельно от детекции и расчета остроты
+        with metrics.timer("video.decode"):
+            sampled = next(frames, None)
+        if sampled is None:
+            break
+
+        _, timestamp_ms, frame = sampled
+        metrics.inc("video.frames_sampled")
+        detections = engine.detect([frame], RunningMode.VIDEO, [timestamp_ms])[0]
+
+        # Пропускаем кадры без обнаруженных лиц
+        if not detections:
+            continue
+
+        score = score_face_frame(frame, detections, sharpness_on_face, sharpness_max_side)
 
-            frame_idx += 1
-            # Пропускаем кадры в соответствии с шагом
-            if frame_idx % step != 0:
-                continue
-
-            # Подготавливаем изображение для детектора
-            mp_image = mp.Image(
-                image_format=mp.ImageFormat.SRGB,
-                data=cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            )
-
-            # Вычисляем временные метки для видео-детекции
-            timestamp_ms = int(frame_idx / fps * 1000)
-            result = detector.detect_for_video(mp_image, timestamp_ms)
-
-            # Пропускаем кадры без обнаруженных лиц
-            if not result.detections:
-                continue
-
-            h, w = frame.shape[:2]
-            # Обрабатываем все обнаруженные лица на кадре
-            for detection in result.detections:
-                bbox = detection.bounding_box
-                # Рассчитываем площадь лица
-                face_area = bbox.width * bbox.height
-                # Рассчитываем остроту кадра
-                sharp = get_sharpness_score(frame)
-                # Комбинируем площадь и остроту в один показатель
-                score = face_area * sharp
-
-                # Обновляем лучший кадр, если текущий лучше
-                if score > best_score:
-                    best_score = score
-                    best_frame = frame.copy()
+        # Обновляем лучший кадр, если текущий лучше
+        if score > best_score:
+            best_score = score
+            best_frame = frame.copy()
 
     cap.release()
     return best_frame
+
+
+def select_distinct_frames(scores, top_k, min_gap):
+    """
+    Выбирает top_k лучших кадров, разнесенных во времени.
+
+    Кадры перебираются по убыванию оценки (при равной оценке — по порядку
+    в видео), и кадр берется, только если он отстоит от всех уже выбранных
+    хотя бы на min_gap кадров.
+
+    Args:
+        scores (dict): Номер кадра -> оценка (0 — лиц нет)
+        top_k (int): Максимальное количество кадров
+        min_gap (int): Минимальное расстояние между выбранными кадрами в кадрах
+
+    Returns:
+        list: Номера выбранных кадров от лучшего к худшему
+    """
+    selected = []
+    for frame_idx in sorted((i for i, score in scores.items() if score > 0), key=lambda i: (-scores[i], i)):
+        if all(abs(frame_idx - other) >= min_gap for other in selected):
+            selected.append(frame_idx)
+            if len(selected) >= top_k:
+                break
+    return selected
+
+
+def extract_top_face_frames(video_path, top_k=TOP_K, step=5, coarse_samples=COARSE_SAMPLES,
+                            frame_budget=FRAME_BUDGET, time_budget=None, min_gap_ms=MIN_FRAME_GAP_MS,
+                            sharpness_on_face=False, sharpness_max_side=None,
+                            min_detection_confidence=MIN_DETECTION_CONFIDENCE, detector_backend=None):
+    """
+    Находит до top_k лучших кадров с лицом, разнесенных во времени, поиском от грубого к точному.
+
+    В отличие от extract_best_face_frame, видео не читается до конца:
+    1. Грубый проход: coarse_samples кадров равномерно по всему видео. Если ни
+       на одном нет лица, проход повторяется по серединам промежутков
+    2. Уточнение: вокруг лучшего из найденных кадров с лицом читаются соседние
+       кадры на расстоянии r (сначала половина шага грубого прохода), после
+       чего r вокруг этого кадра уменьшается вдвое. Уточнение вокруг кадра
+       заканчивается, когда r становится меньше step
+    3. Поиск останавливается, когда исчерпан бюджет кадров или времени
+    4. Из всех оцененных кадров выбираются top_k лучших, отстоящих друг от
+       друга не меньше чем на min_gap_ms
+
+    Стоимость поиска ограничена бюджетом и не растет с длиной видео. Кадры
+    читаются не по порядку, поэтому детектор работает в режиме IMAGE. В памяти
+    держатся только текущие выбранные кадры.
+
+    Args:
+        video_path (str or Path): Путь к видеофайлу
+        top_k (int): Максимальное количество кадров (по умолчанию TOP_K)
+        step (int): Минимальный шаг уточнения в кадрах (по умолчанию 5)
+        coarse_samples (int): Количество кадров грубого прохода (по умолчанию COARSE_SAMPLES)
+        frame_budget (int or None): Максимальное количество оцениваемых кадров на видео
+                                    (по умолчанию FRAME_BUDGET; None — без ограничения)
+        time_budget (float or None): Максимальное время поиска на видео в секундах (None — без ограничения)
+        min_gap_ms (int): Минимальное расстояние между выбранными кадрами в мс (по умолчанию MIN_FRAME_GAP_MS)
+        sharpness_on_face (bool): Считать остроту только внутри рамки каждого лица, а не по всему кадру
+        sharpness_max_side (int or None): Уменьшать кадр (или область лица) до этого размера стороны
+                                          перед расчетом остроты; None — полное разрешение
+        min_detection_confidence (float): Минимальная уверенность детектора лиц (по умолчанию 0.5)
+        detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+    Returns:
+        list: Кортежи (временная метка в мс, кадр в формате BGR) от лучшего кадра к худшему;
+              пустой список, если лицо не найдено
+
+    Raises:
+        FileNotFoundError: Если модель детекции лиц не найдена
+    """
+    cap = cv2.VideoCapture(str(video_path))
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+        engine = get_face_detection_engine(min_detection_confidence, detector_backend)
+        metrics = get_metrics()
+        deadline = None if time_budget is None else time.perf_counter() + time_budget
+        min_gap = max(1, math.ceil(min_gap_ms * fps / 1000))
+        step = max(1, int(step))
+
+        # Оценки всех прочитанных кадров и пиксели только текущих выбранных
+        scores = {}
+        kept = {}
+
+        def has_budget():
+            if frame_budget is not None and len(scores) >= frame_budget:
+                return False
+            return deadline is None or time.perf_counter() < deadline
+
+        def consider(frame_idx, frame):
+            """
+            Оценивает прочитанный кадр и обновляет выбор; возвращает оценку.
+            """
+            metrics.inc("video.frames_sampled")
+            scores[frame_idx] = 0.0
+            if frame is None:
+                return 0.0
+
+            detections = engine.detect([frame])[0]
+            if detections:
+                scores[frame_idx] = score_face_frame(frame, detections, sharpness_on_face, sharpness_max_side)
+                kept[frame_idx] = frame
+                # Пиксели кадров, не попавших в выбор, сразу освобождаются
+                selected = set(select_distinct_frames(scores, top_k, min_gap))
+                for other in [i for i in kept if i not in selected]:
+                    del kept[other]
+            return scores[frame_idx]
+
+        def visit(frame_idx):
+            with metrics.timer("video.decode"):
+                frame = read_frame_at(cap, frame_idx)
+            return consider(frame_idx, frame)
+
+        if frame_count <= 0:
+            # Длина видео неизвестна: переход по кадрам невозможен, читаем подряд с шагом
+            frames = iter_sampled_frames(cap, step)
+            while has_budget():
+                with metrics.timer("video.decode"):
+                    sampled = next(frames, None)
+                if sampled is None:
+                    break
+                frame_idx, _, frame = sampled
+                consider(frame_idx, frame)
+        else:
+            # Грубый проход; пока лиц нет, шаг сетки уменьшается вдвое. Начало сетки не меняется,
+            # поэтому узлы прошлых проходов пропускаются по scores и читаются только середины промежутков
+            spacing = frame_count / max(1, min(coarse_samples, frame_count))
+            origin = spacing / 2
+            while True:
+                for position in np.arange(origin, frame_count, spacing):
+                    frame_idx = int(position)
+                    if frame_idx not in scores and has_budget():
+                        visit(frame_idx)
+                # Шаг уменьшается, только если будет следующий проход: уточнение начинается
+                # с половины шага последнего выполненного прохода
+                if any(scores.values()) or not has_budget() or spacing < 2 * step:
+                    break
+                spacing /= 2
+
+            # Уточнение вокруг лучших кадров: сначала вокруг кадра с наибольшей оценкой
+            heap = [(-score, frame_idx, spacing / 2) for frame_idx, score in scores.items() if score > 0]
+            heapq.heapify(heap)
+            while heap and has_budget():
+                neg_score, frame_idx, radius = heapq.heappop(heap)
+                offset = int(round(radius))
+                if offset < step:
+                    continue
+
+                metrics.inc("video.refine")
+                for neighbour in (frame_idx - offset, frame_idx + offset):
+                    if 0 <= neighbour < frame_count and neighbour not in scores and has_budget():
+                        score = visit(neighbour)
+                        if score > 0:
+                            heapq.heappush(heap, (-score, neighbour, radius / 2))
+                heapq.heappush(heap, (neg_score, frame_idx, radius / 2))
+
+        # Кадры выбора, пиксели которых были освобождены, читаются повторно
+        result = []
+        for frame_idx in select_distinct_frames(scores, top_k, min_gap):
+            frame = kept.get(frame_idx)
+            if frame is None:
+                frame = read_frame_at(cap, frame_idx)
+            if frame is not None:
+                result.append((int(frame_idx / fps * 1000), frame))
+        return result
+    finally:
+        cap.release()
@@ -0,0 +1,153 @@
+"""
+Модуль для выборки кадров из видео без полного чтения пропускаемых кадров.
+
+Этот модуль предоставляет генератор кадров, который для пропускаемых кадров
+вызывает только cap.grab() (без преобразования кадра в BGR и копирования в numpy),
+а для выбранных — cap.retrieve(). Частота выборки задается шагом, числом кадров
+в секунду или фиксированным числом кадров на видео; для последнего режима
+доступен переход по временным меткам через CAP_PROP_POS_MSEC. Переход по времени
+заставляет декодер начинать с ближайшего ключевого кадра, поэтому он выгоден
+только на длинных видео с небольшим числом выбираемых кадров.
+
+Для поиска кадров в произвольном порядке (см. extract_top_face_frames)
+read_frame_at читает кадр по номеру.
+"""
+
+import cv2
+
+
+# Сколько кадров вперед выгоднее пропустить через grab(), чем переходить по номеру кадра
+SEEK_MAX_GRAB = 30
+
+
+def resolve_sampling_step(fps, frame_count, step=5, sample_fps=None, num_samples=None):
+    """
+    Вычисляет шаг между анализируемыми кадрами.
+
+    Приоритет параметров: num_samples, затем sample_fps, затем step.
+
+    Args:
+        fps (float): Частота кадров видео
+        frame_count (int): Количество кадров в видео (0, если неизвестно)
+        step (int): Интервал между кадрами (по умолчанию 5)
+        sample_fps (float or None): Сколько кадров анализировать на секунду видео
+        num_samples (int or None): Сколько кадров анализировать на все видео
+
+    Returns:
+        int: Шаг между анализируемыми кадрами (не меньше 1)
+    """
+    if num_samples and frame_count > 0:
+        return max(1, frame_count // num_samples)
+    if sample_fps:
+        return max(1, round(fps / sample_fps))
+    return max(1, int(step))
+
+
+def iter_sampled_frames(cap, step=5, sample_fps=None, num_samples=None, seek=False):
+    """
+    Перебирает выбранные кадры видео.
+
+    Нумерация кадров совпадает с исходным циклом в extract_best_face_frame:
+    кадры считаются с единицы, выбираются кадры с номером, кратным шагу, а
+    временная метка равна номеру кадра, деленному на fps.
+
+    Args:
+        cap (cv2.VideoCapture): Открытый видеопоток
+        step (int): Интервал между кадрами (по умолчанию 5)
+        sample_fps (float or None): Сколько кадров анализировать на секунду видео
+        num_samples (int or None): Сколько кадров анализировать на все видео
+        seek (bool): Переходить к кадрам по временным меткам (CAP_PROP_POS_MSEC)
+                     вместо последовательного grab(); используется только с num_samples
+
+    Yields:
+        tuple: (номер кадра, временная метка в мс, кадр в формате BGR)
+    """
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+
+    if seek and num_samples and frame_count > 0:
+        yield from _iter_seek_frames(cap, fps, frame_count, num_samples)
+        return
+
+    step = resolve_sampling_step(fps, frame_count, step, sample_fps, num_samples)
+    frame_idx = 0
+    sampled = 0
+
+    while True:
+        # grab() только продвигает поток, не конвертируя кадр в BGR
+        if not cap.grab():
+            break
+
+        frame_idx += 1
+        # Пропускаем кадры в соответствии с шагом
+        if frame_idx % step != 0:
+            continue
+
+        ret, frame = cap.retrieve()
+        if not ret:
+            break
+
+        yield frame_idx, int(frame_idx / fps * 1000), frame
+
+        sampled += 1
+        if num_samples and sampled >= num_samples:
+            break
+
+
+def _iter_seek_frames(cap, fps, frame_count, num_samples):
+    """
+    Перебирает num_samples равномерно распределенных кадров переходом по времени.
+
+    Args:
+        cap (cv2.VideoCapture): Открытый видеопоток
+        fps (float): Частота кадров видео
+        frame_count (int): Количество кадров в видео
+        num_samples (int): Количество кадров для анализа
+
+    Yields:
+        tuple: (номер кадра, временная метка в мс, кадр в формате BGR)
+    """
+    last_frame_idx = 0
+    for i in range(num_samples):
+        # Берем середину каждого из num_samples равных отрезков видео
+        frame_idx = max(1, int((i + 0.5) * frame_count / num_samples))
+        if frame_idx <= last_frame_idx:
+            continue
+
+        timestamp_ms = int(frame_idx / fps * 1000)
+        cap.set(cv2.CAP_PROP_POS_MSEC, timestamp_ms)
+
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        last_frame_idx = frame_idx
+        yield frame_idx, timestamp_ms, frame
+
+
+def read_frame_at(cap, frame_idx, max_grab=SEEK_MAX_GRAB):
+    """
+    Читает кадр с заданным номером (с нуля) в произвольном порядке.
+
+    Если кадр находится недалеко впереди текущей позиции, поток продвигается
+    через grab() — это дешевле перехода, который заставляет декодер начинать
+    с ближайшего ключевого кадра. Иначе выполняется переход по номеру кадра.
+
+    Args:
+        cap (cv2.VideoCapture): Открытый видеопоток
+        frame_idx (int): Номер кадра, начиная с нуля
+        max_grab (int): Максимальное количество кадров, пропускаемых через grab() вместо перехода
+
+    Returns:
+        np.ndarray or None: Кадр в формате BGR или None, если кадр не читается
+    """
+    position = int(cap.get(cv2.CAP_PROP_POS_FRAMES))
+    if 0 <= frame_idx - position <= max_grab:
+        for _ in range(frame_idx - position):
+            if not cap.grab():
+                return None
+    else:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_idx)
+
+    ret, frame = cap.read()
+    return frame if ret else None
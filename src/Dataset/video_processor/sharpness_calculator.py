@@ -3,13 +3,48 @@
 
 Этот модуль предоставляет функции для вычисления
 количественной оценки остроты изображения,
-используя оператор Лапласа.
+используя оператор Лапласа. Оценку можно считать
+по всему кадру или только по области лица, на уменьшенной
+полутоновой копии, а также пакетно для многих кадров сразу.
 """
 
 import cv2
+import numpy as np
 
 
-def get_sharpness_score(image):
+def _prepare_gray(image, bbox=None, max_side=None):
+    """
+    Готовит полутоновую копию изображения для оценки остроты.
+
+    Args:
+        image: Входное изображение (BGR или RGB)
+        bbox (dict or None): Область для оценки с ключами 'x', 'y', 'width', 'height'
+        max_side (int or None): Максимальный размер стороны; большие изображения уменьшаются
+
+    Returns:
+        np.ndarray: Полутоновое изображение uint8
+    """
+    if bbox is not None:
+        h, w = image.shape[:2]
+        x_min = min(max(0, int(bbox['x'])), w - 1)
+        y_min = min(max(0, int(bbox['y'])), h - 1)
+        x_max = max(x_min + 1, min(w, x_min + int(bbox['width'])))
+        y_max = max(y_min + 1, min(h, y_min + int(bbox['height'])))
+        image = image[y_min:y_max, x_min:x_max]
+
+    # Сначала уменьшаем цветное изображение, затем переводим в оттенки серого,
+    # чтобы конвертация шла уже по меньшему числу пикселей
+    if max_side is not None:
+        h, w = image.shape[:2]
+        scale = max_side / max(h, w)
+        if scale < 1.0:
+            new_size = (max(1, round(w * scale)), max(1, round(h * scale)))
+            image = cv2.resize(image, new_size, interpolation=cv2.INTER_AREA)
+
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def get_sharpness_score(image, bbox=None, max_side=None):
     """
     Рассчитывает оценку остроты изображения.
 
@@ -19,12 +54,72 @@ def get_sharpness_score(image):
 
     Args:
         image: Входное изображение (BGR или RGB)
+        bbox (dict or None): Область (например, рамка лица) с ключами 'x', 'y', 'width', 'height';
+                             если не задана, оценивается весь кадр
+        max_side (int or None): Максимальный размер стороны перед расчетом;
+                                если не задан, расчет идет в полном разрешении
 
     Returns:
         float: Значение остроты (дисперсия Лапласиана)
                Чем выше значение, тем острее изображение
     """
     # Преобразуем изображение в оттенки серого
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    gray = _prepare_gray(image, bbox, max_side)
     # Вычисляем дисперсию Лапласиана как меру остроты
     return cv2.Laplacian(gray, cv2.CV_64F).var()
+
+
+def _laplacian_variance_stack(stack):
+    """
+    Векторизованно считает дисперсию Лапласиана для стопки кадров одного размера.
+
+    Использует то же ядро [[0, 1, 0], [1, -4, 1], [0, 1, 0]] и ту же обработку
+    границ (отражение без повтора крайнего пикселя), что и cv2.Laplacian.
+
+    Args:
+        stack (np.ndarray): Массив uint8 формы (N, H, W)
+
+    Returns:
+        np.ndarray: Массив float64 формы (N,) с дисперсией Лапласиана каждого кадра
+    """
+    # Значения Лапласиана для uint8 — целые числа до ±1020, float32 хранит их точно
+    padded = np.pad(stack.astype(np.float32), ((0, 0), (1, 1), (1, 1)), mode="reflect")
+    lap = (
+        padded[:, :-2, 1:-1] + padded[:, 2:, 1:-1]
+        + padded[:, 1:-1, :-2] + padded[:, 1:-1, 2:]
+        - 4.0 * padded[:, 1:-1, 1:-1]
+    )
+    return lap.var(axis=(1, 2), dtype=np.float64)
+
+
+def get_sharpness_scores(images, bboxes=None, max_side=None):
+    """
+    Пакетно рассчитывает оценки остроты для многих изображений.
+
+    Полутоновые копии одинакового размера собираются в один массив,
+    и Лапласиан для них считается одной векторизованной операцией NumPy.
+
+    Args:
+        images (list): Список входных изображений (BGR или RGB)
+        bboxes (list or None): Список областей для каждого изображения (или None для всего кадра)
+        max_side (int or None): Максимальный размер стороны перед расчетом
+
+    Returns:
+        np.ndarray: Массив float64 с оценкой остроты для каждого изображения
+    """
+    if bboxes is None:
+        bboxes = [None] * len(images)
+
+    grays = [_prepare_gray(image, bbox, max_side) for image, bbox in zip(images, bboxes)]
+    scores = np.zeros(len(grays), dtype=np.float64)
+
+    # Группируем кадры по размеру, чтобы считать каждую группу одной стопкой
+    groups = {}
+    for i, gray in enumerate(grays):
+        groups.setdefault(gray.shape, []).append(i)
+
+    for indices in groups.values():
+        stack = np.stack([grays[i] for i in indices])
+        scores[indices] = _laplacian_variance_stack(stack)
+
+    return scores
@@ -0,0 +1,2 @@
+# В этом модуле находятся дескрипторы лиц, которые считаются на CPU,
+# и хранилище признаков, чтобы не пересчитывать их при каждом обучении.
@@ -0,0 +1,170 @@
+"""
+Модуль с CPU-дескрипторами обрезанных лиц.
+
+Этот модуль предоставляет функции, которые превращают лицо канонического
+размера в вектор признаков float32 из трех частей:
+    - HOG по яркости (форма и контуры лица);
+    - нормированные гистограммы каналов HSV (цвет кожи, волос, освещение);
+    - гистограмма равномерных LBP-кодов (текстура кожи).
+"""
+
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+
+# Сторона лица, по которому считаются дескрипторы
+FEATURE_FACE_SIZE = 64
+
+# Параметры HOG: окно, блок, шаг блока, ячейка и количество направлений
+HOG_BLOCK_SIZE = 16
+HOG_BLOCK_STRIDE = 8
+HOG_CELL_SIZE = 8
+HOG_BINS = 9
+
+# Количество корзин гистограмм каналов H, S и V
+HSV_BINS = (16, 8, 8)
+
+# Количество равномерных LBP-кодов для 8 соседей (58) и корзина для остальных кодов
+LBP_BINS = 59
+
+# Версия дескрипторов: увеличивается при изменении способа расчета признаков
+DESCRIPTOR_VERSION = 1
+
+
+def get_descriptor_params(face_size=FEATURE_FACE_SIZE):
+    """
+    Возвращает параметры дескрипторов, от которых зависят значения признаков.
+
+    Используется хранилищем признаков, чтобы не смешивать векторы, посчитанные по-разному.
+
+    Args:
+        face_size (int): Сторона лица в пикселях
+
+    Returns:
+        dict: Параметры дескрипторов
+    """
+    return {
+        "version": DESCRIPTOR_VERSION,
+        "face_size": face_size,
+        "hog": [HOG_BLOCK_SIZE, HOG_BLOCK_STRIDE, HOG_CELL_SIZE, HOG_BINS],
+        "hsv_bins": list(HSV_BINS),
+        "lbp_bins": LBP_BINS,
+    }
+
+
+@lru_cache(maxsize=None)
+def _get_hog(face_size):
+    """
+    Возвращает дескриптор HOG для окна face_size x face_size (создается один раз на процесс).
+    """
+    return cv2.HOGDescriptor(
+        (face_size, face_size),
+        (HOG_BLOCK_SIZE, HOG_BLOCK_SIZE),
+        (HOG_BLOCK_STRIDE, HOG_BLOCK_STRIDE),
+        (HOG_CELL_SIZE, HOG_CELL_SIZE),
+        HOG_BINS,
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_uniform_lbp_lut():
+    """
+    Возвращает таблицу, сопоставляющую 8-битному LBP-коду номер корзины.
+
+    Равномерные коды (не больше двух переходов 0/1 по кругу) получают
+    собственные корзины 0..57, остальные попадают в корзину 58.
+
+    Returns:
+        np.ndarray: Таблица uint8 из 256 элементов
+    """
+    lut = np.full(256, LBP_BINS - 1, dtype=np.uint8)
+    uniform_bin = 0
+    for code in range(256):
+        rotated = ((code << 1) | (code >> 7)) & 0xFF
+        if bin(code ^ rotated).count("1") <= 2:
+            lut[code] = uniform_bin
+            uniform_bin += 1
+    return lut
+
+
+def hog_features(gray):
+    """
+    Считает HOG по яркости лица.
+
+    Args:
+        gray (np.ndarray): Яркость лица (uint8, квадрат стороной face_size)
+
+    Returns:
+        np.ndarray: Вектор float32
+    """
+    return _get_hog(gray.shape[0]).compute(gray).ravel()
+
+
+def color_histogram_features(face_rgb):
+    """
+    Считает нормированные гистограммы каналов H, S и V.
+
+    Args:
+        face_rgb (np.ndarray): Лицо в RGB (uint8)
+
+    Returns:
+        np.ndarray: Вектор float32 длиной sum(HSV_BINS); гистограмма каждого канала в сумме дает 1
+    """
+    hsv = cv2.cvtColor(face_rgb, cv2.COLOR_RGB2HSV)
+    histograms = []
+    for channel, (bins, upper) in enumerate(zip(HSV_BINS, (180, 256, 256))):
+        histogram = cv2.calcHist([hsv], [channel], None, [bins], [0, upper]).ravel()
+        histograms.append(histogram / max(histogram.sum(), 1.0))
+    return np.concatenate(histograms).astype(np.float32)
+
+
+def lbp_features(gray):
+    """
+    Считает нормированную гистограмму равномерных LBP-кодов (8 соседей, радиус 1).
+
+    Args:
+        gray (np.ndarray): Яркость лица (uint8)
+
+    Returns:
+        np.ndarray: Вектор float32 длиной LBP_BINS
+    """
+    center = gray[1:-1, 1:-1]
+    h, w = center.shape
+    codes = np.zeros((h, w), dtype=np.uint8)
+
+    # Соседи по кругу, начиная с левого верхнего
+    neighbours = ((0, 0), (0, 1), (0, 2), (1, 2), (2, 2), (2, 1), (2, 0), (1, 0))
+    for bit, (dy, dx) in enumerate(neighbours):
+        codes |= (gray[dy:dy + h, dx:dx + w] >= center).astype(np.uint8) << bit
+
+    histogram = np.bincount(_get_uniform_lbp_lut()[codes].ravel(), minlength=LBP_BINS).astype(np.float32)
+    return histogram / max(histogram.sum(), 1.0)
+
+
+def get_feature_dim(face_size=FEATURE_FACE_SIZE):
+    """
+    Возвращает длину вектора признаков.
+
+    Args:
+        face_size (int): Сторона лица в пикселях
+
+    Returns:
+        int: Количество признаков
+    """
+    return int(_get_hog(face_size).getDescriptorSize()) + sum(HSV_BINS) + LBP_BINS
+
+
+def extract_features(face_rgb):
+    """
+    Считает полный вектор признаков лица.
+
+    Args:
+        face_rgb (np.ndarray): Лицо в RGB (uint8, квадрат)
+
+    Returns:
+        np.ndarray: Вектор float32: HOG, гистограммы HSV, гистограмма LBP
+    """
+    gray = cv2.cvtColor(face_rgb, cv2.COLOR_RGB2GRAY)
+    return np.concatenate([hog_features(gray), color_histogram_features(face_rgb), lbp_features(gray)])
@@ -0,0 +1,162 @@
+"""
+Модуль со стадией извлечения признаков из обрезанных лиц.
+
+Этот модуль предоставляет функцию, которая для каждого фото из датасета
+с обрезанными лицами считает CPU-дескрипторы (HOG, гистограммы HSV, LBP)
+пачками в пуле процессов и сохраняет их в FeatureStore. Посчитанные ранее
+фото берутся из хранилища по хэшу содержимого, поэтому повторный запуск
+считает признаки только для новых фото. Итоговый датасет DV_FEATURES_CSV
+повторяет строки датасета с лицами и добавляет колонку feature_row —
+номер строки матрицы признаков.
+"""
+
+import numpy as np
+
+from src.Сonfigs import common_paths
+from src.Dataset.packer.dv_dataset_packer import load_face
+from src.Dataset.utils.dataset_io import read_dataset, write_dataset
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.Dataset.utils.process_pool import run_in_process_pool
+from src.Dataset.utils.stage_manifest import file_digest
+from src.ML.features.descriptors import (FEATURE_FACE_SIZE, extract_features, get_descriptor_params,
+                                         get_feature_dim)
+from src.ML.features.feature_store import MISSING_ROW, FeatureStore
+
+
+# Количество фото в одной задаче воркера
+BATCH_SIZE = 256
+
+
+def _extract_batch_task(task):
+    """
+    Считает признаки для пачки фото (выполняется в воркере).
+
+    Args:
+        task (tuple): (список путей к кропам лиц, сторона лица для дескрипторов)
+
+    Returns:
+        tuple: (матрица float32 признаков прочитанных фото, список флагов "фото прочитано")
+    """
+    image_paths, face_size = task
+    metrics = get_metrics()
+
+    features = []
+    ok = []
+    for image_path in image_paths:
+        face = load_face(image_path, face_size)
+        ok.append(face is not None)
+        if face is not None:
+            with metrics.timer("features.extract"):
+                features.append(extract_features(face))
+
+    if not features:
+        return np.empty((0, get_feature_dim(face_size)), dtype=np.float32), ok
+    return np.stack(features), ok
+
+
+def open_feature_store(face_size=FEATURE_FACE_SIZE):
+    """
+    Открывает хранилище признаков пайплайна с текущими параметрами дескрипторов.
+
+    Args:
+        face_size (int): Сторона лица для дескрипторов (по умолчанию FEATURE_FACE_SIZE)
+
+    Returns:
+        FeatureStore: Хранилище в DV_FEATURES_DIR
+    """
+    return FeatureStore(common_paths.DV_FEATURES_DIR, get_feature_dim(face_size), get_descriptor_params(face_size))
+
+
+def process_dataset_with_feature_extraction(workers=1, batch_size=BATCH_SIZE, manifest=None):
+    """
+    Считает признаки для всех лиц из DV_FRAMES_CROPPED_FILTERED_CSV.
+
+    Процесс:
+    1. Читает датасет с путями к обрезанным лицам и считает хэши содержимого фото
+    2. Находит в хранилище признаков уже посчитанные фото
+    3. Оставшиеся (уникальные по содержимому) фото делит на пачки по batch_size
+       и считает признаки последовательно или в пуле процессов
+    4. Дописывает новые признаки в хранилище и сохраняет датасет с колонкой feature_row
+
+    Строки с отсутствующими или нечитаемыми фото получают feature_row = -1.
+
+    Args:
+        workers (int or None): Количество процессов (по умолчанию 1 — последовательно;
+                               None — по числу ядер процессора)
+        batch_size (int): Количество фото в одной задаче воркера (по умолчанию BATCH_SIZE)
+        manifest (StageManifest or None): Манифест стадий; если передан, хэши неизменившихся
+                                          файлов берутся из него без чтения фото
+    """
+    df = read_dataset(common_paths.DV_FRAMES_CROPPED_FILTERED_CSV)
+
+    # Проверяем наличие обязательной колонки
+    if "image_path" not in df.columns:
+        raise ValueError("CSV must contain 'image_path' column.")
+
+    metrics = get_metrics()
+    file_hash = manifest.file_hash if manifest is not None else file_digest
+
+    # Считаем хэши содержимого фото (None — фото нет на диске)
+    image_paths = [str(common_paths.DV_DATASET / image_path) for image_path in df["image_path"]]
+    content_hashes = []
+    for image_path in image_paths:
+        try:
+            content_hashes.append(file_hash(image_path))
+        except OSError:
+            content_hashes.append(None)
+    metrics.inc("features.missing", sum(h is None for h in content_hashes))
+
+    store = open_feature_store()
+
+    # Уникальные по содержимому фото, для которых признаков еще нет
+    stored_rows = store.lookup(content_hashes)
+    reused = int((stored_rows != MISSING_ROW).sum())
+    metrics.inc("features.reused", reused)
+
+    pending = {}
+    for content_hash, row, image_path in zip(content_hashes, stored_rows, image_paths):
+        if content_hash is not None and row == MISSING_ROW:
+            pending.setdefault(content_hash, image_path)
+
+    pending_hashes = list(pending)
+    batches = [pending_hashes[start:start + batch_size] for start in range(0, len(pending_hashes), batch_size)]
+    tasks = [([pending[h] for h in batch], FEATURE_FACE_SIZE) for batch in batches]
+
+    # Считаем признаки пачками и дописываем их в хранилище в исходном порядке
+    results = run_in_process_pool(_extract_batch_task, tasks, workers=workers, chunksize=1)
+    for batch, (features, ok) in zip(batches, results):
+        ok_hashes = [h for h, is_ok in zip(batch, ok) if is_ok]
+        store.append(ok_hashes, features)
+        metrics.inc("features.computed", len(ok_hashes))
+        metrics.inc("features.unreadable", len(batch) - len(ok_hashes))
+
+    store.save()
+
+    # Сохраняем датасет с номерами строк матрицы признаков
+    df_out = df.copy()
+    df_out["feature_row"] = store.lookup(content_hashes)
+    output_path = write_dataset(df_out, common_paths.DV_FEATURES_CSV)
+
+    print(f"[INFO] Features computed for {len(pending_hashes)} new images, reused for {reused} rows")
+    print(f"[INFO] Feature matrix: {len(store)} x {store.dim} in {common_paths.DV_FEATURES_DIR}")
+    print(f"[INFO] Dataset with feature rows saved to: {output_path}")
+
+    if manifest is not None:
+        manifest.save()
+
+
+def load_features(dataset_path=None):
+    """
+    Загружает датасет и выровненную с ним матрицу признаков для обучения.
+
+    Args:
+        dataset_path (str or Path or None): Датасет с колонкой feature_row
+                                            (по умолчанию DV_FEATURES_CSV)
+
+    Returns:
+        tuple: (pd.DataFrame строк с посчитанными признаками,
+                np.ndarray float32 признаков в том же порядке)
+    """
+    df = read_dataset(dataset_path or common_paths.DV_FEATURES_CSV)
+    df = df[df["feature_row"] != MISSING_ROW].reset_index(drop=True)
+    return df, open_feature_store().take(df["feature_row"].to_numpy())
@@ -0,0 +1,163 @@
+"""
+Модуль с персистентным хранилищем векторов признаков.
+
+Признаки хранятся в одной матрице float32 (features.f32, строки подряд),
+которая дописывается в конец и читается через memory mapping. Строка
+матрицы адресуется хэшем содержимого фото, поэтому одинаковые фото
+(в том числе переименованные) считаются один раз, а при повторном запуске
+пересчитываются только новые или изменившиеся фото.
+
+Рядом с матрицей лежат:
+    - индекс (index.csv или index.parquet): хэш содержимого -> номер строки;
+    - meta.json: размерность, количество строк и параметры дескрипторов.
+
+meta.json записывается последним, поэтому строки, дописанные в матрицу
+прерванным запуском, игнорируются и перезаписываются следующим запуском.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.Dataset.utils.dataset_io import dataset_output_path, read_dataset, write_dataset
+
+
+# Имена файлов хранилища
+MATRIX_FILENAME = "features.f32"
+INDEX_FILENAME = "index.csv"
+INDEX_TMP_FILENAME = "index.tmp.csv"
+META_FILENAME = "meta.json"
+
+# Номер строки для фото, признаки которых не посчитаны
+MISSING_ROW = -1
+
+
+class FeatureStore:
+    """
+    Хранилище векторов признаков с дозаписью и адресацией по хэшу содержимого.
+    """
+
+    def __init__(self, store_dir, dim, params):
+        """
+        Открывает хранилище или создает пустое.
+
+        Если параметры дескрипторов или размерность отличаются от сохраненных,
+        старые признаки отбрасываются: их нельзя смешивать с новыми.
+
+        Args:
+            store_dir (str or Path): Папка хранилища
+            dim (int): Длина вектора признаков
+            params (dict): Параметры дескрипторов (сериализуемые в JSON)
+        """
+        self.store_dir = Path(store_dir)
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self.params = params
+        self.rows = 0
+        self._rows_by_hash = {}
+        self._matrix = None
+
+        meta_path = self.store_dir / META_FILENAME
+        if meta_path.exists():
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+
+            if meta.get("dim") == dim and meta.get("params") == params:
+                self.rows = meta["rows"]
+                index = read_dataset(self.store_dir / meta["index"])
+                # Индекс мог быть подменен прерванным сохранением уже после meta.json:
+                # строки за пределами сохраненной матрицы не считаются посчитанными
+                index = index[index["row"] < self.rows]
+                self._rows_by_hash = dict(zip(index["content_hash"], index["row"].astype(int)))
+            else:
+                print(f"[WARN] Feature parameters changed, recomputing features in: {self.store_dir}")
+
+        # Отбрасываем строки, дописанные после последнего сохранения
+        matrix_path = self.store_dir / MATRIX_FILENAME
+        with open(matrix_path, "ab") as f:
+            f.truncate(self.rows * self.dim * 4)
+
+    def __len__(self):
+        return self.rows
+
+    def lookup(self, content_hashes):
+        """
+        Возвращает номера строк для хэшей содержимого фото.
+
+        Args:
+            content_hashes (iterable): Хэши содержимого
+
+        Returns:
+            np.ndarray: Номера строк int64 (MISSING_ROW для отсутствующих)
+        """
+        return np.array([self._rows_by_hash.get(h, MISSING_ROW) for h in content_hashes], dtype=np.int64)
+
+    def append(self, content_hashes, features):
+        """
+        Дописывает векторы признаков в конец матрицы.
+
+        Args:
+            content_hashes (list): Хэши содержимого фото (без повторов и без уже сохраненных)
+            features (np.ndarray): Матрица признаков формы (len(content_hashes), dim)
+
+        Returns:
+            np.ndarray: Номера записанных строк
+        """
+        features = np.ascontiguousarray(features, dtype=np.float32)
+        if features.shape != (len(content_hashes), self.dim):
+            raise ValueError(f"Expected features of shape {(len(content_hashes), self.dim)}, got {features.shape}")
+
+        with open(self.store_dir / MATRIX_FILENAME, "ab") as f:
+            f.write(features.tobytes())
+
+        rows = np.arange(self.rows, self.rows + len(content_hashes), dtype=np.int64)
+        self._rows_by_hash.update(zip(content_hashes, rows.tolist()))
+        self.rows += len(content_hashes)
+        self._matrix = None
+        return rows
+
+    def save(self):
+        """
+        Сохраняет индекс и meta.json (оба атомарно, meta.json — последним).
+        """
+        index = pd.DataFrame({
+            "content_hash": list(self._rows_by_hash),
+            "row": np.fromiter(self._rows_by_hash.values(), dtype=np.int64, count=len(self._rows_by_hash)),
+        })
+        index_path = dataset_output_path(self.store_dir / INDEX_FILENAME)
+        os.replace(write_dataset(index, self.store_dir / INDEX_TMP_FILENAME), index_path)
+
+        meta = {"dim": self.dim, "rows": self.rows, "dtype": "float32", "params": self.params,
+                "index": index_path.name}
+        meta_path = self.store_dir / META_FILENAME
+        tmp_path = meta_path.with_name(meta_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, meta_path)
+
+    @property
+    def matrix(self):
+        """
+        np.memmap: Матрица признаков формы (rows, dim) только для чтения.
+        """
+        if self._matrix is None:
+            if self.rows == 0:
+                return np.empty((0, self.dim), dtype=np.float32)
+            self._matrix = np.memmap(self.store_dir / MATRIX_FILENAME, dtype=np.float32, mode="r",
+                                     shape=(self.rows, self.dim))
+        return self._matrix
+
+    def take(self, rows):
+        """
+        Собирает векторы признаков по номерам строк (копирует их в новый массив).
+
+        Args:
+            rows (array-like): Номера строк (без MISSING_ROW)
+
+        Returns:
+            np.ndarray: Матрица float32 формы (len(rows), dim)
+        """
+        return np.asarray(self.matrix[np.asarray(rows, dtype=np.int64)])
@@ -0,0 +1,2 @@
+# В этом модуле лежат модель вероятности лайка, предиктор с заранее
+# загруженными моделями и локальный HTTP-сервис с микро-батчингом запросов.
@@ -0,0 +1,274 @@
+"""
+Модуль с моделью вероятности лайка по признакам лица.
+
+Модель — L2-регуляризованная логистическая регрессия на стандартизованных
+признаках из FeatureStore, обученная методом Ньютона на numpy (без
+дополнительных зависимостей). Вероятность лайка анкеты — среднее
+вероятностей по лицам анкеты. Веса сохраняются в один .npz-файл вместе
+с параметрами дескрипторов, на которых модель обучена.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from src.Сonfigs import common_paths
+
+
+# Коэффициент L2-регуляризации
+L2_PENALTY = 1.0
+
+# Максимальное количество итераций метода Ньютона
+MAX_ITERATIONS = 25
+
+# Доля анкет, отложенных для валидации
+VALIDATION_FRACTION = 0.2
+
+
+def _sigmoid(z):
+    """
+    Численно устойчивая логистическая функция.
+    """
+    return np.exp(-np.logaddexp(0.0, -z))
+
+
+def roc_auc(labels, scores):
+    """
+    Считает ROC AUC через ранги оценок (с учетом равных оценок).
+
+    Args:
+        labels (np.ndarray): Метки 0/1
+        scores (np.ndarray): Оценки модели
+
+    Returns:
+        float or None: ROC AUC или None, если в метках один класс
+    """
+    labels = np.asarray(labels).astype(bool)
+    positives = int(labels.sum())
+    negatives = len(labels) - positives
+    if positives == 0 or negatives == 0:
+        return None
+
+    order = np.argsort(scores, kind="mergesort")
+    ranks = np.empty(len(scores), dtype=np.float64)
+    ranks[order] = np.arange(1, len(scores) + 1)
+
+    # Равным оценкам назначается средний ранг
+    sorted_scores = np.asarray(scores)[order]
+    _, starts, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    for start, count in zip(starts, counts):
+        if count > 1:
+            ranks[order[start:start + count]] = start + (count + 1) / 2
+
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+class LikeModel:
+    """
+    Логистическая регрессия вероятности лайка по вектору признаков лица.
+    """
+
+    def __init__(self, mean, scale, weights, bias, params=None):
+        """
+        Args:
+            mean (np.ndarray): Среднее признаков обучающей выборки
+            scale (np.ndarray): Стандартное отклонение признаков (нули заменены единицами)
+            weights (np.ndarray): Веса по стандартизованным признакам
+            bias (float): Свободный член
+            params (dict or None): Параметры дескрипторов, на которых обучена модель
+        """
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.params = params or {}
+
+    @property
+    def dim(self):
+        """
+        int: Длина вектора признаков.
+        """
+        return len(self.weights)
+
+    @classmethod
+    def fit(cls, features, labels, l2_penalty=L2_PENALTY, max_iterations=MAX_ITERATIONS, params=None):
+        """
+        Обучает модель методом Ньютона.
+
+        Args:
+            features (np.ndarray): Матрица признаков (n, dim)
+            labels (np.ndarray): Метки 0/1
+            l2_penalty (float): Коэффициент L2-регуляризации весов
+            max_iterations (int): Максимальное количество итераций
+            params (dict or None): Параметры дескрипторов (сохраняются вместе с моделью)
+
+        Returns:
+            LikeModel: Обученная модель
+
+        Raises:
+            ValueError: Если в метках только один класс
+        """
+        labels = np.asarray(labels, dtype=np.float64)
+        if labels.min() == labels.max():
+            raise ValueError("Training labels must contain both liked and not liked profiles.")
+
+        features = np.asarray(features, dtype=np.float64)
+        mean = features.mean(axis=0)
+        scale = features.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        # Добавляем столбец единиц для свободного члена (он не регуляризуется)
+        x = np.hstack([(features - mean) / scale, np.ones((len(features), 1))])
+        penalty = np.full(x.shape[1], l2_penalty)
+        penalty[-1] = 0.0
+
+        theta = np.zeros(x.shape[1])
+        for _ in range(max_iterations):
+            p = _sigmoid(x @ theta)
+            gradient = x.T @ (p - labels) + penalty * theta
+            hessian = (x.T * (p * (1 - p))) @ x + np.diag(penalty + 1e-9)
+            step = np.linalg.solve(hessian, gradient)
+            theta -= step
+            if np.abs(step).max() < 1e-6:
+                break
+
+        return cls(mean, scale, theta[:-1], theta[-1], params)
+
+    def predict_proba(self, features):
+        """
+        Возвращает вероятности лайка для лиц.
+
+        Args:
+            features (np.ndarray): Матрица признаков (n, dim)
+
+        Returns:
+            np.ndarray: Вероятности float32 длиной n
+        """
+        z = ((np.asarray(features, dtype=np.float32) - self.mean) / self.scale) @ self.weights + self.bias
+        return _sigmoid(z).astype(np.float32)
+
+    def save(self, path):
+        """
+        Атомарно сохраняет модель в .npz.
+
+        Args:
+            path (str or Path): Путь к файлу модели
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp_path, mean=self.mean, scale=self.scale, weights=self.weights,
+                 bias=np.float32(self.bias), params=json.dumps(self.params))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Загружает модель из .npz.
+
+        Args:
+            path (str or Path): Путь к файлу модели
+
+        Returns:
+            LikeModel: Модель
+
+        Raises:
+            FileNotFoundError: Если файла модели нет
+        """
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Like model not found: {path}")
+
+        with np.load(path) as data:
+            return cls(data["mean"], data["scale"], data["weights"], float(data["bias"]),
+                       json.loads(str(data["params"])))
+
+
+def _split_units(df):
+    """
+    Возвращает для каждой строки номер неделимой при разбиении единицы.
+
+    Единица — анкета, а если в датасете есть колонка duplicate_group (стадия dedup),
+    то и все анкеты, у которых встречаются дубликаты одного фото: иначе одно и то же
+    фото могло бы попасть и в обучающую, и в валидационную выборку.
+
+    Args:
+        df (pd.DataFrame): Датасет с колонкой profile_id и, возможно, duplicate_group
+
+    Returns:
+        np.ndarray: Номер единицы для каждой строки
+    """
+    profile_codes, profiles = pd.factorize(df["profile_id"])
+    if "duplicate_group" not in df.columns:
+        return profile_codes
+
+    # Система непересекающихся множеств над анкетами
+    parent = np.arange(len(profiles))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    group_profiles = {}
+    for code, group in zip(profile_codes, df["duplicate_group"].to_numpy()):
+        if group < 0:
+            continue
+        root, other = find(code), find(group_profiles.setdefault(group, code))
+        if root != other:
+            parent[max(root, other)] = min(root, other)
+
+    return np.array([find(code) for code in profile_codes], dtype=np.int64)
+
+
+def train_like_model(model_path=None, l2_penalty=L2_PENALTY, validation_fraction=VALIDATION_FRACTION, seed=0):
+    """
+    Обучает модель лайков по признакам из стадии features и сохраняет ее.
+
+    Анкеты делятся на обучающие и валидационные целиком (по profile_id),
+    чтобы фото одной анкеты не попадали в обе части; анкеты с общими
+    дубликатами фото (см. _split_units) попадают в одну часть. После оценки на
+    валидации модель переобучается на всех данных.
+
+    Args:
+        model_path (str or Path or None): Путь для сохранения (по умолчанию DV_LIKE_MODEL)
+        l2_penalty (float): Коэффициент L2-регуляризации
+        validation_fraction (float): Доля анкет для валидации
+        seed (int): Зерно генератора для разбиения анкет
+
+    Returns:
+        LikeModel: Модель, обученная на всех данных
+
+    Raises:
+        ValueError: Если все размеченные лица относятся к одному классу
+    """
+    from src.ML.features.descriptors import get_descriptor_params
+    from src.ML.features.dv_feature_extractor import load_features
+
+    df, features = load_features()
+    labels = df["profile_liked"].to_numpy()
+    params = get_descriptor_params()
+
+    # Валидация на отложенных анкетах
+    units = _split_units(df)
+    unique_units = pd.unique(units)
+    rng = np.random.default_rng(seed)
+    validation_units = rng.choice(unique_units, size=int(len(unique_units) * validation_fraction), replace=False)
+    validation = np.isin(units, validation_units)
+    validation_profiles = df["profile_id"][validation].unique()
+    try:
+        model = LikeModel.fit(features[~validation], labels[~validation], l2_penalty, params=params)
+        auc = roc_auc(labels[validation], model.predict_proba(features[validation]))
+        print(f"[INFO] Validation ROC AUC: {'n/a' if auc is None else f'{auc:.3f}'} "
+              f"({validation.sum()} faces of {len(validation_profiles)} profiles)")
+    except ValueError as e:
+        print(f"[WARN] Validation skipped: {e}")
+
+    model = LikeModel.fit(features, labels, l2_penalty, params=params)
+    model_path = model_path or common_paths.DV_LIKE_MODEL
+    model.save(model_path)
+    print(f"[INFO] Like model trained on {len(df)} faces saved to: {model_path}")
+    return model
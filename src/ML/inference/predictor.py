@@ -0,0 +1,129 @@
+"""
+Модуль с предиктором вероятности лайка анкеты по ее фото.
+
+Предиктор повторяет обработку фото из пайплайна датасета — удаление
+фильтров, обрезку до лица, приведение лица к размеру дескрипторов и расчет
+признаков — и применяет модель лайков. Детектор лиц, модель и таблицы
+нормализатора загружаются один раз при создании предиктора, а признаки
+всех лиц пачки анкет считаются одной матрицей и проходят через модель
+одним умножением.
+"""
+
+import cv2
+import numpy as np
+
+from src.Сonfigs import common_paths
+from src.Dataset.cropper.face_cropper import SCORE_THRESHOLD, crop_face_from_array, get_crop_params
+from src.Dataset.detector.face_detection_engine import MIN_DETECTION_CONFIDENCE, get_face_detection_engine
+from src.Dataset.filter_remover.image_normalizer import normalize_image
+from src.Dataset.packer.dv_dataset_packer import resize_face
+from src.Dataset.utils.pipeline_metrics import get_metrics
+from src.ML.features.descriptors import FEATURE_FACE_SIZE, extract_features, get_descriptor_params
+from src.ML.inference.like_model import LikeModel
+
+
+class LikePredictor:
+    """
+    Предиктор вероятности лайка с заранее загруженными моделями.
+
+    Экземпляр не потокобезопасен: детектор MediaPipe должен вызываться
+    из одного потока (сервис выполняет все пачки в одном потоке).
+    """
+
+    def __init__(self, model_path=None, min_size=80, score_threshold=SCORE_THRESHOLD,
+                 min_detection_confidence=MIN_DETECTION_CONFIDENCE, detector_backend=None):
+        """
+        Загружает модель лайков и прогревает детектор лиц и нормализатор.
+
+        Args:
+            model_path (str or Path or None): Путь к модели (по умолчанию DV_LIKE_MODEL)
+            min_size (int): Минимальный размер стороны лица (как в стадии crop)
+            score_threshold (float): Минимальная уверенность лучшего лица
+            min_detection_confidence (float): Минимальная уверенность детектора
+            detector_backend (str or None): Бэкенд детекции лиц (None — из конфигурации пайплайна)
+
+        Raises:
+            FileNotFoundError: Если модель лайков или модель детектора не найдена
+            ValueError: Если модель обучена на других параметрах дескрипторов
+        """
+        self.model = LikeModel.load(model_path or common_paths.DV_LIKE_MODEL)
+        if self.model.params and self.model.params != get_descriptor_params():
+            raise ValueError("Like model was trained with different feature descriptors; retrain it.")
+
+        self.crop_params = get_crop_params(min_size, score_threshold, min_detection_confidence,
+                                           detector_backend=detector_backend)
+
+        # Прогреваем детектор, нормализатор и дескрипторы на пустом кадре,
+        # чтобы первый запрос не платил за загрузку моделей и построение таблиц
+        get_face_detection_engine(min_detection_confidence, self.crop_params["detector_backend"])
+        warmup = np.zeros((FEATURE_FACE_SIZE * 2, FEATURE_FACE_SIZE * 2, 3), dtype=np.uint8)
+        self._face_features(warmup)
+        extract_features(resize_face(warmup, FEATURE_FACE_SIZE))
+
+    def _face_features(self, image):
+        """
+        Нормализует фото, обрезает его до лица и считает признаки.
+
+        Args:
+            image (np.ndarray): Фото в BGR
+
+        Returns:
+            np.ndarray or None: Вектор признаков или None, если лицо не найдено
+        """
+        metrics = get_metrics()
+
+        with metrics.timer("predict.normalize"):
+            image, _ = normalize_image(image)
+        with metrics.timer("predict.crop"):
+            face = crop_face_from_array(image, **self.crop_params)
+        if face is None:
+            return None
+
+        with metrics.timer("predict.features"):
+            return extract_features(resize_face(face, FEATURE_FACE_SIZE))
+
+    def predict_profiles(self, profiles):
+        """
+        Возвращает вероятности лайка для пачки анкет.
+
+        Args:
+            profiles (list): Анкеты; каждая анкета — список закодированных фото (bytes, JPEG/PNG)
+
+        Returns:
+            list: Для каждой анкеты словарь {"probability": float или None, если лиц нет,
+                  "faces": количество найденных лиц, "photos": количество фото,
+                  "face_probabilities": вероятности по лицам}
+        """
+        metrics = get_metrics()
+        features = []
+        owners = []
+        for position, photos in enumerate(profiles):
+            for photo in photos:
+                with metrics.timer("predict.decode"):
+                    image = cv2.imdecode(np.frombuffer(photo, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if image is None:
+                    metrics.inc("predict.unreadable")
+                    continue
+
+                face_features = self._face_features(image)
+                if face_features is None:
+                    metrics.inc("predict.no_face")
+                    continue
+
+                features.append(face_features)
+                owners.append(position)
+
+        # Все лица пачки проходят через модель одним умножением матриц
+        probabilities = self.model.predict_proba(np.stack(features)) if features else np.empty(0, np.float32)
+        owners = np.asarray(owners, dtype=np.int64)
+
+        results = []
+        for position, photos in enumerate(profiles):
+            face_probabilities = probabilities[owners == position]
+            results.append({
+                "probability": float(face_probabilities.mean()) if len(face_probabilities) else None,
+                "faces": int(len(face_probabilities)),
+                "photos": len(photos),
+                "face_probabilities": [round(float(p), 6) for p in face_probabilities],
+            })
+        return results
@@ -0,0 +1,374 @@
+"""
+Модуль с локальным HTTP-сервисом предсказания лайков.
+
+Сервис написан на asyncio из стандартной библиотеки (HTTP/1.1 с keep-alive)
+и не требует веб-фреймворков. Анкеты из одновременных запросов собираются
+в микро-пачки: пачка отправляется в предиктор, как только набралось
+max_batch_size анкет или с момента прихода первой анкеты прошло
+max_delay_ms. Предиктор выполняется в одном отдельном потоке, поэтому
+цикл событий продолжает принимать запросы, пока считается пачка.
+
+Эндпоинты:
+    POST /predict  {"profiles": [{"id": ..., "photos": ["<base64 JPEG>", ...]}, ...]}
+                   -> {"predictions": [{"id": ..., "probability": ..., "faces": ..., ...}, ...]}
+    GET  /health   -> {"status": "ok"}
+    GET  /stats    -> количество запросов и пачек, средний размер пачки
+
+Запуск из корня проекта:
+    python -m src.ML.inference.server --port 8080 --max-batch-size 16 --max-delay-ms 5
+"""
+
+import argparse
+import asyncio
+import base64
+import binascii
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Параметры микро-батчинга по умолчанию
+MAX_BATCH_SIZE = 16
+MAX_DELAY_MS = 5.0
+
+# Ограничения запроса
+MAX_BODY_BYTES = 64 * 1024 * 1024
+MAX_HEADER_LINES = 100
+
+# Тексты статусов HTTP, которые возвращает сервис
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+class HttpError(Exception):
+    """
+    Ошибка запроса, которая возвращается клиенту с кодом status.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class MicroBatcher:
+    """
+    Собирает элементы из одновременных запросов в пачки для одного вызова модели.
+    """
+
+    def __init__(self, process_batch, max_batch_size=MAX_BATCH_SIZE, max_delay_ms=MAX_DELAY_MS):
+        """
+        Args:
+            process_batch (callable): Функция, принимающая список элементов и возвращающая
+                                      список результатов той же длины (выполняется в отдельном потоке)
+            max_batch_size (int): Максимальный размер пачки
+            max_delay_ms (float): Сколько ждать добора пачки после прихода первого элемента
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.batches = 0
+        self.items = 0
+
+        self._queue = None
+        self._task = None
+        # Один поток: модели держат состояние и вызываются последовательно
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="predictor")
+
+    def start(self):
+        """
+        Запускает цикл сборки пачек в текущем цикле событий.
+        """
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """
+        Останавливает цикл сборки пачек и поток предиктора.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._executor.shutdown(wait=True)
+
+    async def submit(self, item):
+        """
+        Ставит элемент в очередь и ждет его результат.
+
+        Args:
+            item: Элемент для process_batch
+
+        Returns:
+            Результат process_batch для этого элемента
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _collect(self):
+        """
+        Ждет первый элемент и добирает пачку до max_batch_size или до истечения max_delay.
+
+        Returns:
+            list: Пары (элемент, future)
+        """
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_delay
+
+        while len(batch) < self.max_batch_size:
+            # Сначала забираем все, что уже ждет в очереди, без переключения контекста
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        """
+        Бесконечный цикл: собирает пачку, считает ее в потоке предиктора и раздает результаты.
+        """
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.process_batch, items)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            self.batches += 1
+            self.items += len(items)
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+class InferenceServer:
+    """
+    HTTP-сервис предсказания вероятности лайка анкет.
+    """
+
+    def __init__(self, predictor, max_batch_size=MAX_BATCH_SIZE, max_delay_ms=MAX_DELAY_MS):
+        """
+        Args:
+            predictor (LikePredictor): Предиктор с загруженными моделями
+            max_batch_size (int): Максимальное количество анкет в пачке
+            max_delay_ms (float): Максимальная задержка добора пачки в миллисекундах
+        """
+        self.predictor = predictor
+        self.batcher = MicroBatcher(self._predict_batch, max_batch_size, max_delay_ms)
+        self.requests = 0
+        self.started_at = None
+
+    def _predict_batch(self, profiles):
+        """
+        Считает пачку анкет (выполняется в потоке предиктора).
+        """
+        return self.predictor.predict_profiles(profiles)
+
+    async def serve(self, host="127.0.0.1", port=8080):
+        """
+        Запускает сервис и обслуживает запросы до отмены.
+
+        Args:
+            host (str): Адрес для прослушивания
+            port (int): Порт
+        """
+        self.batcher.start()
+        self.started_at = time.monotonic()
+        server = await asyncio.start_server(self._handle_connection, host, port)
+        print(f"[INFO] Inference service listening on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            await self.batcher.stop()
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Обслуживает одно соединение (несколько запросов при keep-alive).
+        """
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    # Границы следующего запроса неизвестны: отвечаем и закрываем соединение
+                    self._write_response(writer, e.status, {"error": str(e)}, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+
+                method, path, headers, body = request
+                try:
+                    status, payload = await self._dispatch(method, path, body)
+                except HttpError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    print(f"[ERROR] Request failed: {e}")
+                    status, payload = 500, {"error": str(e)}
+
+                keep_alive = headers.get("connection", "").lower() != "close"
+                self._write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_request(reader):
+        """
+        Читает один HTTP-запрос.
+
+        Returns:
+            tuple or None: (метод, путь, заголовки в нижнем регистре, тело) или None, если соединение закрыто
+
+        Raises:
+            HttpError: Если запрос некорректен или слишком велик
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HttpError(400, "Malformed request line")
+        method, path, _ = parts
+
+        headers = {}
+        for _ in range(MAX_HEADER_LINES):
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        else:
+            raise HttpError(400, "Too many headers")
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            raise HttpError(400, "Invalid Content-Length header")
+        if length < 0 or length > MAX_BODY_BYTES:
+            raise HttpError(413, f"Request body is larger than {MAX_BODY_BYTES} bytes")
+        body = await reader.readexactly(length) if length else b""
+        return method, path.split("?", 1)[0], headers, body
+
+    async def _dispatch(self, method, path, body):
+        """
+        Выполняет запрос к эндпоинту.
+
+        Returns:
+            tuple: (код статуса, объект для ответа в JSON)
+        """
+        if path == "/health":
+            return 200, {"status": "ok"}
+
+        if path == "/stats":
+            batcher = self.batcher
+            return 200, {
+                "requests": self.requests,
+                "batches": batcher.batches,
+                "profiles": batcher.items,
+                "mean_batch_size": batcher.items / batcher.batches if batcher.batches else None,
+                "uptime_s": time.monotonic() - self.started_at,
+            }
+
+        if path != "/predict":
+            raise HttpError(404, f"Unknown path: {path}")
+        if method != "POST":
+            raise HttpError(405, "Use POST for /predict")
+
+        self.requests += 1
+        profiles = self._parse_profiles(body)
+
+        # Анкеты запроса попадают в общие микро-пачки вместе с анкетами других запросов
+        results = await asyncio.gather(*(self.batcher.submit(photos) for _, photos in profiles))
+        return 200, {"predictions": [{"id": profile_id, **result} for (profile_id, _), result in zip(profiles, results)]}
+
+    @staticmethod
+    def _parse_profiles(body):
+        """
+        Разбирает тело запроса /predict.
+
+        Returns:
+            list: Пары (id анкеты, список фото в bytes)
+
+        Raises:
+            HttpError: Если тело не соответствует формату
+        """
+        try:
+            data = json.loads(body)
+            profiles = data["profiles"]
+            return [
+                (profile.get("id", position), [base64.b64decode(photo, validate=True) for photo in profile["photos"]])
+                for position, profile in enumerate(profiles)
+            ]
+        except (ValueError, KeyError, TypeError, AttributeError, binascii.Error) as e:
+            raise HttpError(400, f"Expected {{\"profiles\": [{{\"id\": ..., \"photos\": [base64, ...]}}]}}: {e}")
+
+    @staticmethod
+    def _write_response(writer, status, payload, keep_alive):
+        """
+        Записывает JSON-ответ в соединение.
+        """
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode("latin-1") + body)
+
+
+def main(argv=None):
+    """
+    Запускает сервис из командной строки.
+
+    Args:
+        argv (list or None): Аргументы командной строки (по умолчанию sys.argv[1:])
+    """
+    parser = argparse.ArgumentParser(description="Локальный сервис предсказания лайков")
+    parser.add_argument("--host", default="127.0.0.1", help="Адрес для прослушивания")
+    parser.add_argument("--port", type=int, default=8080, help="Порт")
+    parser.add_argument("--model", help="Путь к модели лайков (по умолчанию DV_LIKE_MODEL)")
+    parser.add_argument("--processed-dir", help="Папка с результатами пайплайна (где лежит модель)")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE, help="Максимум анкет в пачке")
+    parser.add_argument("--max-delay-ms", type=float, default=MAX_DELAY_MS,
+                        help="Максимальная задержка добора пачки в миллисекундах")
+    args = parser.parse_args(argv)
+
+    from src.Сonfigs.pipeline_config import configure
+    from src.ML.inference.predictor import LikePredictor
+
+    configure(processed_dir=args.processed_dir)
+    start = time.perf_counter()
+    predictor = LikePredictor(args.model)
+    print(f"[INFO] Models loaded in {time.perf_counter() - start:.2f} s")
+
+    server = InferenceServer(predictor, args.max_batch_size, args.max_delay_ms)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Модуль с точкой входа командной строки для пайплайна DaiVision.
+
+Модули стадий (а вместе с ними OpenCV, MediaPipe и pandas) импортируются
+только внутри обработчиков выбранных стадий, поэтому `--help` и `--dry-run`
+не сканируют datasets/ и не загружают тяжелые зависимости.
+
+Примеры:
+    python -m src --help
+    python -m src --stages build video --workers 4
+    python -m src --stages dedup filter crop --dedup-radius 4
+    python -m src --dataset-dir datasets/ChatExport_2024 --stages fused --min-size 100
+    python -m src --stages crop --min-size 100 --score-threshold 0.7 --margin 0.1
+    python -m src --stages pack --face-size 128
+    python -m src --stages features train --workers 4
+"""
+
+import argparse
+import sys
+
+
+# Стадии в порядке выполнения
+STAGES = ("build", "video", "dedup", "filter", "crop", "fused", "pack", "features", "train")
+
+# Стадии по умолчанию (поэтапный пайплайн, как в исходном main.py)
+DEFAULT_STAGES = ("build", "video", "filter", "crop")
+
+# Стадии, использующие детектор лиц (опция --detector)
+DETECTOR_STAGES = ("video", "crop", "fused")
+
+
+def build_parser():
+    """
+    Создает парсер аргументов командной строки.
+
+    Returns:
+        argparse.ArgumentParser: Парсер аргументов
+    """
+    parser = argparse.ArgumentParser(
+        prog="daivision",
+        description="Сборка и обработка датасета анкет из Дайвинчика.",
+    )
+    parser.add_argument(
+        "--stages", nargs="+", choices=STAGES, default=list(DEFAULT_STAGES),
+        help="Стадии для запуска (по умолчанию: %(default)s); выполняются в порядке: " + ", ".join(STAGES),
+    )
+
+    paths = parser.add_argument_group("пути")
+    paths.add_argument("--datasets-dir", help="Папка, в которой ищется экспорт чата ChatExport*")
+    paths.add_argument("--dataset-dir", help="Папка экспорта чата (вместо поиска в datasets/)")
+    paths.add_argument("--results-json", help="Путь к result.json (вместо поиска)")
+    paths.add_argument("--processed-dir", help="Папка для CSV-файлов и манифеста стадий")
+    paths.add_argument("--dataset-format", choices=("csv", "parquet"),
+                       help="Формат датасетов стадий (по умолчанию csv; parquet требует pyarrow)")
+
+    params = parser.add_argument_group("параметры стадий")
+    params.add_argument("--workers", type=int, help="Количество процессов (0 — по числу ядер)")
+    params.add_argument("--step", type=int, help="Интервал между анализируемыми кадрами видео")
+    params.add_argument("--frame-search", choices=("scan", "coarse_to_fine"),
+                        help="Поиск кадров в видео: полный просмотр с шагом (scan, по умолчанию) "
+                             "или от грубого к точному в рамках бюджета (coarse_to_fine)")
+    params.add_argument("--top-k", type=int,
+                        help="Количество разнесенных во времени кадров на видео (стадия video, coarse_to_fine; "
+                             "по умолчанию 3)")
+    params.add_argument("--frame-budget", type=int,
+                        help="Максимальное количество оцениваемых кадров на видео (стадия video, coarse_to_fine)")
+    params.add_argument("--time-budget", type=float,
+                        help="Максимальное время поиска кадров на видео в секундах (стадия video, coarse_to_fine)")
+    params.add_argument("--min-size", type=int, help="Минимальный размер стороны обрезанного лица")
+    params.add_argument("--score-threshold", type=float, help="Минимальная уверенность лучшего лица при обрезке")
+    params.add_argument("--min-detection-confidence", type=float, help="Минимальная уверенность детектора лиц")
+    params.add_argument("--detector", choices=("mediapipe", "haar", "lbp"),
+                        help="Бэкенд детекции лиц для стадий video, crop и fused (по умолчанию mediapipe; "
+                             "каскад lbp нужно положить в resources/models; "
+                             "чтобы выбрать бэкенд для каждой стадии, запустите стадии отдельно)")
+    params.add_argument("--margin", type=float,
+                        help="Отступ вокруг рамки лица при обрезке в долях ее размера (стадии crop и fused)")
+    params.add_argument("--dedup-radius", type=int,
+                        help="Максимальное расстояние Хэмминга между перцептивными хэшами дубликатов (стадия dedup)")
+    params.add_argument("--io-threads", type=int,
+                        help="Потоки чтения наперед и фоновой записи фото (стадии filter и crop; 0 — без потоков)")
+    params.add_argument("--io-depth", type=int,
+                        help="Максимальное количество фото в очереди чтения и записи (стадии filter и crop)")
+    params.add_argument("--jpeg-quality", type=int, help="Качество JPEG сохраняемых фото (стадии filter и crop)")
+    params.add_argument("--face-size", type=int, help="Сторона лица в хранилище тензоров (стадия pack)")
+    params.add_argument("--shard-size", type=int, help="Количество лиц в шарде хранилища тензоров (стадия pack)")
+    params.add_argument("--batch-size", type=int, help="Количество фото в задаче воркера (стадия features)")
+    params.add_argument("--streaming", action=argparse.BooleanOptionalAction, default=True,
+                        help="Потоково разбирать result.json при сборке датасета (по умолчанию; "
+                             "--no-streaming загружает JSON целиком)")
+    params.add_argument("--incremental", action="store_true",
+                        help="Дописывать в датасет только сообщения новее прошлой сборки (стадия build)")
+    params.add_argument("--write-intermediate", action="store_true",
+                        help="В сквозном режиме сохранять промежуточные нормализованные фото")
+
+    parser.add_argument("--metrics", action="store_true",
+                        help="Собирать время шагов, счетчики и пиковую память и сохранить отчет "
+                             "(JSON и Prometheus) в папку с результатами")
+    parser.add_argument("--no-manifest", action="store_true",
+                        help="Не использовать манифест стадий (обработать все файлы заново)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Только вывести план запуска, не выполняя стадии")
+    return parser
+
+
+def _stage_kwargs(args, *names):
+    """
+    Собирает именованные аргументы стадии из явно заданных опций.
+
+    Незаданные опции не передаются, чтобы действовали значения по умолчанию самой стадии.
+
+    Args:
+        args (argparse.Namespace): Разобранные аргументы
+        *names (str): Имена опций, которые принимает стадия
+
+    Returns:
+        dict: Аргументы для вызова функции стадии
+    """
+    return {name: getattr(args, name) for name in names if getattr(args, name) is not None}
+
+
+def _run_build(args, manifest):
+    """
+    Собирает сырой датасет из result.json.
+    """
+    from src.Сonfigs import common_paths
+    from src.Dataset.dataset_builder.dv_dataset_builder import DatasetBuilder
+
+    from src.Dataset.utils.dataset_io import dataset_output_path
+
+    builder = DatasetBuilder(common_paths.DV_RESULTS_JSON_PATH, streaming=args.streaming)
+    output_path = dataset_output_path(common_paths.DV_RAW_CSV)
+    if args.incremental:
+        builder.export_incremental(output_path, common_paths.DV_BUILDER_STATE, common_paths.DV_PROFILES_NPZ,
+                                   manifest=manifest)
+    else:
+        builder.export_with_profiles(output_path, common_paths.DV_PROFILES_NPZ, manifest=manifest)
+
+
+def _run_video(args, manifest):
+    """
+    Извлекает лучшие кадры из видео.
+    """
+    from src.Dataset.video_processor.dv_video_rows_processor import process_video_rows
+
+    process_video_rows(
+        manifest=manifest,
+        **_stage_kwargs(args, "workers", "step", "min_detection_confidence", "frame_search", "top_k",
+                        "frame_budget", "time_budget"),
+    )
+
+
+def _run_dedup(args, manifest):
+    """
+    Находит повторяющиеся фото и связывает их с каноническими.
+    """
+    from src.Dataset.deduplicator.dv_dataset_deduplicator import process_dataset_with_deduplication
+
+    process_dataset_with_deduplication(manifest=manifest, **_stage_kwargs(args, "workers", "dedup_radius"))
+
+
+def _run_filter(args, manifest):
+    """
+    Удаляет искусственные фильтры с фото.
+    """
+    from src.Dataset.filter_remover.dv_dataset_filter_remover import process_dataset_with_filter_removal
+
+    process_dataset_with_filter_removal(
+        manifest=manifest,
+        **_stage_kwargs(args, "io_threads", "io_depth", "jpeg_quality"),
+    )
+
+
+def _run_crop(args, manifest):
+    """
+    Обрезает фото до лиц.
+    """
+    from src.Dataset.cropper.dv_dataset_cropper import process_dataset_with_face_cropping
+
+    process_dataset_with_face_cropping(
+        manifest=manifest,
+        **_stage_kwargs(args, "workers", "min_size", "score_threshold", "min_detection_confidence", "margin",
+                        "io_threads", "io_depth", "jpeg_quality"),
+    )
+
+
+def _run_fused(args, manifest):
+    """
+    Удаляет фильтры и обрезает фото до лиц за один проход.
+    """
+    from src.Dataset.pipeline.fused_pipeline import process_dataset_fused
+
+    process_dataset_fused(
+        write_intermediate=args.write_intermediate,
+        **_stage_kwargs(args, "workers", "min_size", "score_threshold", "min_detection_confidence", "margin"),
+    )
+
+
+def _run_pack(args, manifest):
+    """
+    Упаковывает обрезанные лица в шарды тензоров для обучения.
+    """
+    from src.Dataset.packer.dv_dataset_packer import process_dataset_with_face_packing
+
+    process_dataset_with_face_packing(**_stage_kwargs(args, "workers", "face_size", "shard_size"))
+
+
+def _run_features(args, manifest):
+    """
+    Считает признаки обрезанных лиц и дописывает новые в хранилище признаков.
+    """
+    from src.ML.features.dv_feature_extractor import process_dataset_with_feature_extraction
+
+    process_dataset_with_feature_extraction(manifest=manifest, **_stage_kwargs(args, "workers", "batch_size"))
+
+
+def _run_train(args, manifest):
+    """
+    Обучает модель вероятности лайка по посчитанным признакам.
+
+    Returns:
+        int or None: Код возврата 1, если модель нельзя обучить на имеющихся метках
+    """
+    from src.ML.inference.like_model import train_like_model
+
+    try:
+        train_like_model()
+    except ValueError as e:
+        print(f"[ERROR] Like model was not trained: {e}", file=sys.stderr)
+        return 1
+
+
+def _shutdown_detector():
+    """
+    Закрывает общий движок детекции лиц, если его загружала одна из стадий.
+
+    Модуль детектора (и MediaPipe) не импортируется, если ни одна стадия его не использовала.
+    """
+    engine_module = sys.modules.get("src.Dataset.detector.face_detection_engine")
+    if engine_module is not None:
+        engine_module.shutdown_face_detection_engine()
+
+
+_STAGE_RUNNERS = {
+    "build": _run_build,
+    "video": _run_video,
+    "dedup": _run_dedup,
+    "filter": _run_filter,
+    "crop": _run_crop,
+    "fused": _run_fused,
+    "pack": _run_pack,
+    "features": _run_features,
+    "train": _run_train,
+}
+
+
+def main(argv=None):
+    """
+    Запускает выбранные стадии пайплайна.
+
+    Args:
+        argv (list or None): Аргументы командной строки (по умолчанию sys.argv[1:])
+
+    Returns:
+        int: Код возврата
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    # Несовместимые параметры стадии video проверяем до запуска стадий, а не посреди пайплайна
+    if args.top_k is not None:
+        if args.top_k < 1:
+            parser.error("--top-k must be at least 1")
+        if args.top_k > 1 and args.frame_search != "coarse_to_fine":
+            parser.error("--top-k > 1 requires --frame-search coarse_to_fine")
+
+    # Сквозной режим заменяет стадии filter и crop
+    stages = [stage for stage in STAGES if stage in args.stages]
+    if "fused" in stages and ("filter" in stages or "crop" in stages):
+        print("[ERROR] Stage 'fused' replaces 'filter' and 'crop'; do not combine them.", file=sys.stderr)
+        return 2
+
+    # Файл каскада проверяем до запуска стадий: каскада LBP нет в пакетах opencv-python
+    if args.detector in ("haar", "lbp") and any(stage in DETECTOR_STAGES for stage in stages):
+        from src.Dataset.detector.cascade_detection_engine import CASCADE_MODELS, find_cascade_model
+
+        try:
+            find_cascade_model(CASCADE_MODELS[args.detector])
+        except FileNotFoundError as e:
+            parser.error(f"--detector {args.detector}: {e}")
+
+    from src.Сonfigs.pipeline_config import configure
+
+    config = configure(
+        datasets_dir=args.datasets_dir,
+        dataset_dir=args.dataset_dir,
+        results_json=args.results_json,
+        processed_dir=args.processed_dir,
+        dataset_format=args.dataset_format,
+        detector_backend=args.detector,
+    )
+
+    if args.dry_run:
+        print(f"[INFO] Stages: {', '.join(stages)}")
+        for key, value in sorted(config.overrides.items()):
+            print(f"[INFO] {key}: {value}")
+        return 0
+
+    manifest = None
+    if not args.no_manifest:
+        from src.Сonfigs import common_paths
+        from src.Dataset.utils.stage_manifest import StageManifest
+
+        # Общий манифест стадий: при повторном запуске неизменившиеся файлы не обрабатываются
+        manifest = StageManifest(common_paths.DV_STAGE_MANIFEST)
+
+    from src.Dataset.utils.pipeline_metrics import enable_metrics
+
+    metrics = enable_metrics(args.metrics)
+    try:
+        for stage in stages:
+            print(f"[INFO] Running stage: {stage}")
+            with metrics.timer(f"stage.{stage}"):
+                code = _STAGE_RUNNERS[stage](args, manifest)
+            # Стадия сообщила об ошибке: следующие стадии не запускаем
+            if code:
+                return code
+    finally:
+        _shutdown_detector()
+
+    if args.metrics:
+        from src.Сonfigs import common_paths
+
+        metrics.export(common_paths.DV_METRICS_JSON, common_paths.DV_METRICS_PROM)
+        print(f"[INFO] Metrics saved to: {common_paths.DV_METRICS_JSON}, {common_paths.DV_METRICS_PROM}")
+
+    return 0
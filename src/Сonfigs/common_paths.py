@@ -1,8 +1,5 @@
 from pathlib import Path
 
-from src.Dataset.utils.dv_dataset_finder import find_dv_dataset
-from src.Dataset.utils.dv_json_finder import find_result_json
-
 
 # Корень проекта: DaiVision/
 PROJECT_ROOT = Path(__file__).resolve().parents[2]
@@ -16,24 +13,75 @@ RESOURCES_DIR = PROJECT_ROOT / "resources"
 # Папка с моделями cv2
 CV2_MODELS_DIR = RESOURCES_DIR / "models"
 
-# Датасет из Дайвинчика
-DV_DATASET = find_dv_dataset(DATASETS_DIR)
 
-# results.json из Дайвинчика
-DV_RESULTS_JSON_PATH = find_result_json(DATASETS_DIR)
+# Пути, зависящие от найденного датасета, вычисляются лениво при первом обращении
+# (common_paths.DV_DATASET и т.д.), чтобы импорт модулей не сканировал datasets/
+# и не создавал папки. Сами пути берутся из текущей PipelineConfig.
+_LAZY_PATHS = {
+    # Датасет из Дайвинчика
+    "DV_DATASET": lambda c: c.dataset_dir,
+
+    # results.json из Дайвинчика
+    "DV_RESULTS_JSON_PATH": lambda c: c.results_json,
+
+    # Внутренняя структура DV-датасета
+    "DV_VIDEO_DIR": lambda c: c.dataset_dir / "video_files",
+    "DV_PHOTOS_EXTRACTED_DIR": lambda c: c.dataset_dir / "photos_extracted",
+    "DV_PHOTOS_UNFILTERED_DIR": lambda c: c.dataset_dir / "photos_unfiltered",
+    "DV_CROPPED_FACES_DIR": lambda c: c.dataset_dir / "photos_cropped",
+
+    # Папка для процессинга датасетов
+    "PROCESSED_DIR": lambda c: c.processed_dir,
+
+    # CSV-файлы
+    "DV_RAW_CSV": lambda c: c.processed_dir / "dv_dataset_raw.csv",
+    "DV_FRAMES_CSV": lambda c: c.processed_dir / "dv_dataset_frames.csv",
+    "DV_FRAMES_UNFILTERED_CSV": lambda c: c.processed_dir / "dv_dataset_frames_unfiltered.csv",
+    "DV_FRAMES_CROPPED_CSV": lambda c: c.processed_dir / "dv_dataset_frames_cropped.csv",
+    "DV_FRAMES_CROPPED_FILTERED_CSV": lambda c: c.processed_dir / "dv_dataset_frames_cropped_filtered.csv",
+
+    # Компактный датасет анкет (массивы со смещениями фото каждой анкеты)
+    "DV_PROFILES_NPZ": lambda c: c.processed_dir / "dv_profiles.npz",
+
+    # Состояние инкрементальной сборки датасета (последнее разобранное сообщение)
+    "DV_BUILDER_STATE": lambda c: c.processed_dir / "dv_dataset_builder_state.json",
+
+    # Кэш рамок лиц, найденных детектором на стадии обрезки
+    "DV_DETECTIONS_DIR": lambda c: c.processed_dir / "dv_detections",
+
+    # Хранилище обрезанных лиц в виде шардов uint8-тензоров
+    "DV_FACE_TENSORS_DIR": lambda c: c.processed_dir / "dv_face_tensors",
+
+    # Хранилище признаков лиц и датасет с номерами строк матрицы признаков
+    "DV_FEATURES_DIR": lambda c: c.processed_dir / "dv_features",
+    "DV_FEATURES_CSV": lambda c: c.processed_dir / "dv_dataset_features.csv",
+
+    # Модель вероятности лайка
+    "DV_LIKE_MODEL": lambda c: c.processed_dir / "dv_like_model.npz",
+
+    # Манифест стадий для инкрементальных перезапусков
+    "DV_STAGE_MANIFEST": lambda c: c.processed_dir / "dv_stage_manifest.json",
+
+    # Отчеты о метриках запуска (JSON и текстовый формат Prometheus)
+    "DV_METRICS_JSON": lambda c: c.processed_dir / "dv_pipeline_metrics.json",
+    "DV_METRICS_PROM": lambda c: c.processed_dir / "dv_pipeline_metrics.prom",
+}
+
+
+def __getattr__(name):
+    """
+    Лениво вычисляет пути, зависящие от датасета и папки с результатами.
 
-# Внутренняя структура DV-датасета
-DV_VIDEO_DIR = DV_DATASET / "video_files"
-DV_PHOTOS_EXTRACTED_DIR = DV_DATASET / "photos_extracted"
-DV_PHOTOS_UNFILTERED_DIR = DV_DATASET / "photos_unfiltered"
-DV_CROPPED_FACES_DIR = DV_DATASET / "photos_cropped"
+    Args:
+        name (str): Имя атрибута модуля
 
-# Папка для процессинга датасетов
-PROCESSED_DIR = PROJECT_ROOT / "files" / "processed"
-PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    Returns:
+        Path: Путь из текущей конфигурации пайплайна
 
-# CSV-файлы
-DV_RAW_CSV = PROCESSED_DIR / "dv_dataset_raw.csv"
-DV_FRAMES_CSV = PROCESSED_DIR / "dv_dataset_frames.csv"
-DV_FRAMES_UNFILTERED_CSV = PROCESSED_DIR / "dv_dataset_frames_unfiltered.csv"
-DV_FRAMES_CROPPED_CSV = PROCESSED_DIR / "dv_dataset_frames_cropped.csv"
+    Raises:
+        AttributeError: Если такого пути нет
+    """
+    if name in _LAZY_PATHS:
+        from src.Сonfigs.pipeline_config import get_config
+        return _LAZY_PATHS[name](get_config())
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
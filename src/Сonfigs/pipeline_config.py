@@ -0,0 +1,133 @@
+"""
+Модуль с ленивой конфигурацией путей пайплайна.
+
+Пути к датасету, result.json и папке с результатами вычисляются только при
+первом обращении, а не при импорте модулей. Любой путь можно задать явно
+(например, из аргументов командной строки) через configure().
+"""
+
+from functools import cached_property
+from pathlib import Path
+
+from src.Сonfigs.common_paths import DATASETS_DIR, PROJECT_ROOT
+
+
+class PipelineConfig:
+    """
+    Конфигурация путей пайплайна с ленивым вычислением.
+
+    Явно заданные пути хранятся в overrides (в виде строк, чтобы конфигурацию
+    можно было передать в процессы-воркеры), остальные вычисляются по умолчанию
+    при первом обращении: датасет ищется в datasets/, а папка с результатами
+    создается в files/processed.
+    """
+
+    def __init__(self, datasets_dir=None, dataset_dir=None, results_json=None, processed_dir=None,
+                 dataset_format=None, detector_backend=None):
+        """
+        Инициализирует конфигурацию.
+
+        Args:
+            datasets_dir (str or Path or None): Папка, в которой ищется ChatExport*
+            dataset_dir (str or Path or None): Папка экспорта чата (вместо поиска в datasets_dir)
+            results_json (str or Path or None): Путь к result.json (вместо поиска)
+            processed_dir (str or Path or None): Папка для CSV и манифеста стадий
+            dataset_format (str or None): Формат датасетов стадий: "csv" (по умолчанию) или "parquet"
+            detector_backend (str or None): Бэкенд детекции лиц: "mediapipe" (по умолчанию), "haar" или "lbp"
+        """
+        overrides = {
+            "datasets_dir": datasets_dir,
+            "dataset_dir": dataset_dir,
+            "results_json": results_json,
+            "processed_dir": processed_dir,
+            "dataset_format": dataset_format,
+            "detector_backend": detector_backend,
+        }
+        self.overrides = {key: str(value) for key, value in overrides.items() if value is not None}
+
+    @cached_property
+    def datasets_dir(self):
+        """
+        Path: Папка, в которой ищется экспорт чата ChatExport*.
+        """
+        return Path(self.overrides.get("datasets_dir", DATASETS_DIR))
+
+    @cached_property
+    def dataset_dir(self):
+        """
+        Path: Папка экспорта чата из Дайвинчика.
+        """
+        if "dataset_dir" in self.overrides:
+            return Path(self.overrides["dataset_dir"])
+
+        from src.Dataset.utils.dv_dataset_finder import find_dv_dataset
+        return find_dv_dataset(self.datasets_dir)
+
+    @cached_property
+    def results_json(self):
+        """
+        Path: Файл result.json экспорта чата.
+        """
+        if "results_json" in self.overrides:
+            return Path(self.overrides["results_json"])
+
+        # Если папка экспорта задана явно, result.json лежит в ней
+        if "dataset_dir" in self.overrides:
+            return self.dataset_dir / "result.json"
+
+        from src.Dataset.utils.dv_json_finder import find_result_json
+        return find_result_json(self.datasets_dir)
+
+    @property
+    def dataset_format(self):
+        """
+        str: Формат, в котором стадии записывают датасеты ("csv" или "parquet").
+        """
+        return self.overrides.get("dataset_format", "csv")
+
+    @property
+    def detector_backend(self):
+        """
+        str: Бэкенд детекции лиц по умолчанию для всех стадий ("mediapipe", "haar" или "lbp").
+        """
+        return self.overrides.get("detector_backend", "mediapipe")
+
+    @cached_property
+    def processed_dir(self):
+        """
+        Path: Папка для CSV-файлов и манифеста стадий (создается при первом обращении).
+        """
+        path = Path(self.overrides.get("processed_dir", PROJECT_ROOT / "files" / "processed"))
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+
+_config = None
+
+
+def get_config():
+    """
+    Возвращает текущую конфигурацию пайплайна (по умолчанию — без явных путей).
+
+    Returns:
+        PipelineConfig: Текущая конфигурация
+    """
+    global _config
+    if _config is None:
+        _config = PipelineConfig()
+    return _config
+
+
+def configure(**overrides):
+    """
+    Заменяет текущую конфигурацию пайплайна.
+
+    Args:
+        **overrides: Явно заданные пути (см. PipelineConfig)
+
+    Returns:
+        PipelineConfig: Новая конфигурация
+    """
+    global _config
+    _config = PipelineConfig(**overrides)
+    return _config